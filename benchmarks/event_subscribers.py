@@ -0,0 +1,172 @@
+"""
+How many concurrent list-event subscribers one ASGI worker can hold.
+
+Drives shoppinglist.asgi.application in-process (no sockets, so the
+numbers are the app's own cost, not the kernel's): opens N Server-Sent
+Events streams on one list, publishes events from a worker thread the way
+the services do after commit, and reports connect time, memory per open
+stream and fan-out latency.
+
+    python -m benchmarks.event_subscribers --subscribers 100,1000,5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shoppinglist.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from lists import events  # noqa: E402
+from lists.models import ShoppingList  # noqa: E402
+from shoppinglist.asgi import application  # noqa: E402
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Stream:
+    """One in-memory SSE connection to the ASGI app."""
+
+    def __init__(self, path, cookie, stats):
+        self.path = path
+        self.cookie = cookie
+        self.stats = stats
+        self.disconnect = asyncio.Event()
+        self._sent_request = False
+
+    async def receive(self):
+        if not self._sent_request:
+            self._sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            if message["status"] != 200:
+                self.stats["errors"] += 1
+                self.disconnect.set()
+            return
+        body = message.get("body", b"")
+        if body.startswith(b"retry:"):
+            self.stats["connected"] += 1
+        elif body.startswith(b"id:"):
+            data = json.loads(body.split(b"data: ", 1)[1])
+            self.stats["latencies"].append(time.perf_counter() - data["sent_at"])
+
+    async def run(self):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver"), (b"cookie", self.cookie.encode())],
+            "client": ("127.0.0.1", 40000),
+            "server": ("testserver", 80),
+        }
+        await application(scope, self.receive, self.send)
+
+
+async def measure(subscribers, publishes, path, cookie, list_id):
+    stats = {"connected": 0, "errors": 0, "latencies": []}
+    base_rss = rss_bytes()
+
+    started = time.perf_counter()
+    streams = [Stream(path, cookie, stats) for _ in range(subscribers)]
+    tasks = [asyncio.create_task(stream.run()) for stream in streams]
+    while stats["connected"] + stats["errors"] < subscribers:
+        await asyncio.sleep(0.01)
+    connect_seconds = time.perf_counter() - started
+    per_stream = (rss_bytes() - base_rss) / subscribers
+
+    broker = events.get_broker()
+
+    def publish():
+        for version in range(1, publishes + 1):
+            event = {"type": "item.updated", "version": version}
+            broker.publish(list_id, {**event, "sent_at": time.perf_counter()})
+            time.sleep(0.05)
+
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    expected = stats["connected"] * publishes
+    deadline = time.perf_counter() + 30 + publishes * 0.05
+    while len(stats["latencies"]) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    publisher.join()
+
+    for stream in streams:
+        stream.disconnect.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = sorted(stats["latencies"]) or [0.0]
+    return {
+        "subscribers": subscribers,
+        "connected": stats["connected"],
+        "errors": stats["errors"],
+        "connect_seconds": round(connect_seconds, 3),
+        "rss_kib_per_stream": round(per_stream / 1024, 1),
+        "delivered": len(stats["latencies"]),
+        "expected": expected,
+        "fanout_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "fanout_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "fanout_max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", default="100,1000,5000")
+    parser.add_argument("--publishes", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    owner = User.objects.create_user(username="bench-owner")
+    shopping_list = ShoppingList.objects.create(author=owner, name="Bench")
+    client = Client()
+    client.force_login(owner)
+    cookie = f"sessionid={client.cookies['sessionid'].value}"
+    path = f"/lists/{shopping_list.id}/events/"
+
+    results = []
+    for count in [int(n) for n in args.subscribers.split(",")]:
+        results.append(
+            asyncio.run(
+                measure(count, args.publishes, path, cookie, shopping_list.id)
+            )
+        )
+        if not args.json:
+            print(results[-1])
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Load test of a local server with realistic collaboration scenarios.
+
+Every virtual user signs up and logs in through the HTML forms (session
+cookie plus CSRF token, like a browser), then replays weighted scenarios
+until time runs out:
+
+- owner: creates a list from the form, adds items, finds another user
+  through the invite typeahead and invites them
+- invitee: opens the invites dashboard and accepts pending invites
+- collaborator: reads its lists from the API, toggles item statuses with
+  PATCH /api/items/<id>/, then opens the list page
+
+Reports throughput and p50/p95/p99 latency per route (ids replaced by
+<id>). Without --url, starts the Procfile's web command (gunicorn with
+uvicorn workers) on a fresh SQLite database; --url must point at this
+machine.
+Redirects are not followed.
+
+    python -m benchmarks.load_test --workers 4 --users 16 --seconds 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --mix owner=1,invitee=1,collaborator=8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from benchmarks.db_throughput import free_port, server_command, wait_until_up
+
+LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1"}
+STATUS_CYCLE = {"need": "will_buy", "will_buy": "bought", "bought": "need"}
+PRODUCTS = "Milk Eggs Bread Butter Apples Coffee Rice Pasta Cheese Tea".split()
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+USER_RESULT = re.compile(r'name="user_id" value="(\d+)"')
+ACCEPT_URL = re.compile(r'action="(/lists/invites/\d+/accept/)"')
+ID_SEGMENT = re.compile(r"/\d+(?=/)")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, elapsed, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(route, []).append(elapsed)
+            else:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, seconds):
+        routes = {}
+        for route in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(route, [])) or [0.0]
+            count = len(self.latencies.get(route, []))
+
+            def pct(p):
+                return round(latencies[max(int(len(latencies) * p) - 1, 0)] * 1000, 2)
+
+            routes[route] = {
+                "requests": count,
+                "errors": self.errors.get(route, 0),
+                "req_per_s": round(count / seconds, 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 2),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "seconds": seconds,
+            "requests": total,
+            "errors": sum(route["errors"] for route in routes.values()),
+            "req_per_s": round(total / seconds, 1),
+            "routes": routes,
+        }
+
+
+class Browser:
+    """One user's cookie jar; every request is a new connection."""
+
+    def __init__(self, host, port, stats):
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.cookies = {}
+
+    def request(self, method, path, form=None, json_body=None, ok=(200, 302)):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif json_body is not None:
+            body = json.dumps(json_body)
+            headers["Content-Type"] = "application/json"
+        if method != "GET":
+            # what the JS client sends; form posts also carry the hidden input
+            headers["X-CSRFToken"] = self.cookies.get("csrftoken", "")
+
+        route = f"{method} {ID_SEGMENT.sub('/<id>', path.split('?')[0])}"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read().decode()
+        except OSError:
+            self.stats.record(route, 0, False)
+            raise
+        finally:
+            conn.close()
+        self.stats.record(route, time.perf_counter() - started, response.status in ok)
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0":
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+        return response.status, content
+
+    def submit(self, page, path, fields):
+        """GET a page with a form, then POST it with the form's CSRF token."""
+        _, content = self.request("GET", page)
+        match = CSRF_INPUT.search(content)
+        token = match.group(1) if match else self.cookies.get("csrftoken", "")
+        return self.request("POST", path, form={**fields, "csrfmiddlewaretoken": token})
+
+
+class VirtualUser:
+    def __init__(self, number, run, host, port, stats, rng):
+        self.username = f"load{run}u{number}"
+        self.password = secrets.token_urlsafe(16)
+        self.browser = Browser(host, port, stats)
+        self.rng = rng
+        self.peers = []
+
+    def sign_up_and_log_in(self):
+        self.browser.submit(
+            "/signup/",
+            "/signup/",
+            {
+                "username": self.username,
+                "first_name": "Load",
+                "last_name": "Tester",
+                "email": f"{self.username}@example.com",
+                "password1": self.password,
+                "password2": self.password,
+            },
+        )
+        # start over as a returning visitor: a real login with a new session
+        self.browser.cookies.clear()
+        status, _ = self.browser.submit(
+            "/login/",
+            "/login/",
+            {"username": self.username, "password": self.password},
+        )
+        if status != 302:
+            raise RuntimeError(f"{self.username} could not log in")
+
+    def owner(self):
+        browser, rng = self.browser, self.rng
+        browser.request("GET", "/lists/")
+        name = f"{rng.choice(['Groceries', 'Party', 'BBQ'])} {secrets.token_hex(3)}"
+        browser.submit("/lists/new/", "/lists/new/", {"name": name})
+        _, content = browser.request(
+            "GET", "/api/shoppinglists/?fields=id,name&page_size=10"
+        )
+        found = [r["id"] for r in json.loads(content)["results"] if r["name"] == name]
+        if not found:
+            return
+        list_id = found[0]
+        for product in rng.sample(PRODUCTS, rng.randint(2, 5)):
+            browser.submit(
+                f"/lists/{list_id}/add/",
+                f"/lists/{list_id}/add/",
+                {"name": product, "status": "need"},
+            )
+
+        peer = rng.choice(self.peers)
+        _, content = browser.request(
+            "GET", f"/lists/search_users/?{urlencode({'q': peer, 'list': list_id})}"
+        )
+        match = USER_RESULT.search(content)
+        if match:
+            browser.submit(
+                f"/lists/{list_id}/invite/",
+                f"/lists/{list_id}/invite/",
+                {"invitee_id": match.group(1)},
+            )
+
+    def invitee(self):
+        _, content = self.browser.request("GET", "/lists/invites/")
+        for path in ACCEPT_URL.findall(content)[:3]:
+            self.browser.request("POST", path, form={})
+
+    def collaborator(self):
+        browser, rng = self.browser, self.rng
+        _, content = browser.request("GET", "/api/shoppinglists/?page_size=10")
+        lists = [r for r in json.loads(content)["results"] if r["items"]]
+        if not lists:
+            return
+        shopping_list = rng.choice(lists)
+        items = shopping_list["items"]
+        for item in rng.sample(items, min(len(items), 5)):
+            browser.request(
+                "PATCH",
+                f"/api/items/{item['id']}/",
+                json_body={"status": STATUS_CYCLE[item["status"]]},
+            )
+        browser.request("GET", f"/lists/{shopping_list['id']}/")
+
+
+def run(args, host, port):
+    run_id = secrets.token_hex(3)
+    setup_stats, stats = Stats(), Stats()
+    rng = random.Random(args.seed)
+    users = [
+        VirtualUser(n, run_id, host, port, setup_stats, random.Random(rng.random()))
+        for n in range(args.users)
+    ]
+    usernames = [user.username for user in users]
+    for user in users:
+        user.peers = [name for name in usernames if name != user.username]
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=user.sign_up_and_log_in) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    setup = setup_stats.report(time.perf_counter() - started)
+
+    mix = dict(part.split("=") for part in args.mix.split(","))
+    scenarios, weights = list(mix), [float(w) for w in mix.values()]
+    deadline = time.monotonic() + args.seconds
+
+    def loop(user):
+        user.browser.stats = stats
+        while time.monotonic() < deadline:
+            scenario = user.rng.choices(scenarios, weights)[0]
+            try:
+                getattr(user, scenario)()
+            except (OSError, ValueError):
+                pass  # already recorded as an error; carry on like a user would
+            if args.think_ms:
+                time.sleep(user.rng.expovariate(1000 / args.think_ms))
+
+    threads = [threading.Thread(target=loop, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"setup": setup, "run": stats.report(args.seconds)}
+
+
+def start_server(args, tmp):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp}/load.sqlite3",
+        # one log line per request would drown the report
+        "REQUEST_LOG_LEVEL": "WARNING",
+    }
+    subprocess.run(
+        [sys.executable, "manage.py", "migrate", "-v", "0"], env=env, check=True
+    )
+    port = free_port()
+    server = subprocess.Popen(
+        server_command(port, args.workers), env=env, stdout=subprocess.DEVNULL
+    )
+    wait_until_up(port)
+    return server, port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="a server already running on this machine")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--users", type=int, default=16, help="virtual users")
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--mix", default="owner=1,invitee=1,collaborator=6")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2: owners invite other users")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            url = urlsplit(args.url)
+            if url.hostname not in LOCAL_HOSTS:
+                parser.error("--url must point at this machine")
+            host, port = url.hostname, url.port or 80
+        else:
+            server, port = start_server(args, tmp)
+            host = "127.0.0.1"
+        try:
+            report = run(args, host, port)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for phase in ("setup", "run"):
+        result = report[phase]
+        print(
+            f"{phase}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['req_per_s']} req/s over {result['seconds']:.1f}s"
+        )
+        for route, stats in result["routes"].items():
+            print(f"  {route:>36}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Service and HTTP latency at small, medium and large dataset sizes.
+
+For every size, builds a throwaway test database in which one requester
+owns `lists` lists of `items` items, with `collaborators` members on the
+first list and `users` users in the search index. Then it times:
+
+- the main HTTP paths through the test client: index, list detail,
+  /api/shoppinglists/, /api/items/ and the invite typeahead
+- the core services, each on its own objects: send_invite, accept_invite,
+  add_item, update_item, delete_item and archive_list
+
+Results are JSON. With --baseline, each benchmark's median is compared
+against a stored run, and the command exits with status 1 when any median
+is more than --threshold slower (and at least --min-delta-ms slower, so
+sub-millisecond noise doesn't count).
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sizes small --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shoppinglist.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from lists import services  # noqa: E402
+from lists.models import Item  # noqa: E402
+from lists.ranks import spread_ranks  # noqa: E402
+from lists.search import index_users, search_cache  # noqa: E402
+
+SIZES = {
+    "small": {"users": 200, "lists": 5, "items": 10, "collaborators": 3},
+    "medium": {"users": 5_000, "lists": 50, "items": 40, "collaborators": 20},
+    "large": {"users": 50_000, "lists": 200, "items": 90, "collaborators": 45},
+}
+NAMES = (
+    "james mary john patricia robert jennifer michael linda william elizabeth "
+    "david barbara richard susan joseph jessica thomas sarah charles karen"
+).split()
+BATCH_SIZE = 5000
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "runs": len(timings),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000, 3),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def seed(size, rng):
+    """Build one size's dataset; returns (requester, lists, spare users)."""
+    users = []
+    for offset in range(0, size["users"], BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + BATCH_SIZE, size["users"])):
+            first, last = rng.choice(NAMES), rng.choice(NAMES)
+            batch.append(
+                User(
+                    username=f"{first}{i}",
+                    first_name=first.title(),
+                    last_name=last.title(),
+                    email=f"{first}.{last}{i}@example.com",
+                    password="!",
+                )
+            )
+        batch = User.objects.bulk_create(batch)
+        # bulk_create skips the post_save signal, so index explicitly
+        index_users(batch, batch_size=BATCH_SIZE)
+        users += batch
+    requester = User.objects.create_user(username="bench-requester")
+
+    lists = [services.create_list(requester, f"List {i}") for i in range(size["lists"])]
+    ranks = spread_ranks(size["items"])
+    Item.objects.bulk_create(
+        (
+            Item(
+                shopping_list=shopping_list,
+                name=f"Item {i}",
+                name_key=f"item {i}",
+                rank=ranks[i],
+                status=rng.choice(["need", "will_buy", "bought"]),
+                added_by=requester,
+            )
+            for shopping_list in lists
+            for i in range(size["items"])
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    # bulk inserts bypass the services, so bring the counters up to date
+    call_command("reconcile_list_counters", stdout=io.StringIO())
+    for user in users[: size["collaborators"]]:
+        invite = services.send_invite(lists[0], requester, user)
+        services.accept_invite(invite, user)
+    for shopping_list in lists:
+        shopping_list.refresh_from_db()
+    return requester, lists, users[size["collaborators"] :]
+
+
+def bench_http(requester, lists, repeat, rng):
+    client = Client(HTTP_HOST="127.0.0.1")  # testserver is not in ALLOWED_HOSTS
+    client.force_login(requester)
+    main = lists[0]
+    paths = {
+        "http.index": lambda: "/lists/",
+        "http.list_detail": lambda: f"/lists/{main.id}/",
+        "http.api_shoppinglists": lambda: "/api/shoppinglists/",
+        "http.api_items": lambda: "/api/items/",
+        "http.search_users": lambda: (
+            f"/lists/search_users/?q={rng.choice(NAMES)[:rng.randint(2, 4)]}"
+            f"&list={main.id}"
+        ),
+    }
+    results = {}
+    for name, path in paths.items():
+        client.get(path())  # warm up: first request builds per-process state
+        timings = []
+        for _ in range(repeat):
+            elapsed, response = timed(client.get, path())
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+            timings.append(elapsed)
+        results[name] = summarize(timings)
+    return results
+
+
+def bench_services(requester, lists, invitees, repeat):
+    timings = {
+        name: []
+        for name in (
+            "services.send_invite",
+            "services.accept_invite",
+            "services.add_item",
+            "services.update_item",
+            "services.delete_item",
+            "services.archive_list",
+        )
+    }
+    # spread writes over the lists other than the first, which holds the
+    # collaborators, so no list reaches its member or item cap
+    targets = lists[1:] or lists
+
+    invites = []
+    for i, invitee in enumerate(invitees[:repeat]):
+        elapsed, invite = timed(
+            services.send_invite, targets[i % len(targets)], requester, invitee
+        )
+        timings["services.send_invite"].append(elapsed)
+        invites.append(invite)
+    for invite in invites:
+        elapsed, _ = timed(services.accept_invite, invite, invite.invitee)
+        timings["services.accept_invite"].append(elapsed)
+
+    items = []
+    for i in range(repeat):
+        elapsed, item = timed(
+            services.add_item, targets[i % len(targets)], requester, f"Bench {i}"
+        )
+        timings["services.add_item"].append(elapsed)
+        items.append(item)
+    for item in items:
+        elapsed, _ = timed(services.update_item, item, requester, status="bought")
+        timings["services.update_item"].append(elapsed)
+    for item in items:
+        elapsed, _ = timed(services.delete_item, requester, item)
+        timings["services.delete_item"].append(elapsed)
+
+    for i in range(repeat):
+        shopping_list = services.create_list(requester, f"Archive {i}")
+        elapsed, _ = timed(services.archive_list, shopping_list, requester)
+        timings["services.archive_list"].append(elapsed)
+
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def run_size(name, repeat, seed_value):
+    size = SIZES[name]
+    if size["users"] < size["collaborators"] + repeat:
+        raise SystemExit(f"{name}: needs at least {repeat} users beyond collaborators")
+    rng = random.Random(seed_value)
+    # ids repeat between sizes, so nothing cached may carry over
+    cache.clear()
+    search_cache.clear()
+    database_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        requester, lists, invitees = seed(size, rng)
+        results = bench_http(requester, lists, repeat, rng)
+        results.update(bench_services(requester, lists, invitees, repeat))
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return [(size, benchmark, baseline p50, current p50)] for regressions."""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            slower = stats["p50_ms"] - before["p50_ms"]
+            if (
+                stats["p50_ms"] > before["p50_ms"] * (1 + threshold)
+                and slower >= min_delta_ms
+            ):
+                regressions.append((size, name, before["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results JSON to this file")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # one log line per request would drown the report
+    logging.getLogger("shoppinglist.requests").setLevel(logging.WARNING)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "sizes": {name: SIZES[name] for name in args.sizes.split(",")},
+        },
+        "results": {},
+    }
+    for name in args.sizes.split(","):
+        report["results"][name] = run_size(name, args.repeat, args.seed)
+        if not args.json:
+            for benchmark, stats in report["results"][name].items():
+                print(f"{name:>6} {benchmark:>26}: {stats}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if not args.baseline:
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    comparable = {}
+    for size, results in report["results"].items():
+        if baseline["meta"]["sizes"].get(size) != report["meta"]["sizes"][size]:
+            print(f"skipping {size}: the baseline used other data", file=sys.stderr)
+            continue
+        comparable[size] = results
+    regressions = compare(
+        comparable, baseline["results"], args.threshold, args.min_delta_ms
+    )
+    for size, benchmark, before, after in regressions:
+        print(
+            f"REGRESSION {size} {benchmark}: p50 {before} ms -> {after} ms",
+            file=sys.stderr,
+        )
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
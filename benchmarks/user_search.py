@@ -0,0 +1,180 @@
+"""
+Invite typeahead latency against a large user table.
+
+Builds a throwaway test database with N synthetic users (bulk-inserted,
+then indexed the way rebuild_user_search_index does), puts the requester
+on a list with 49 collaborators to exclude, and times lists.search
+.search_users for short, medium and two-word prefixes with the prefix
+cache cleared before every query (the index on its own), then replays
+typed-out names keystroke by keystroke to report the cache's hit rate.
+
+    python -m benchmarks.user_search --users 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shoppinglist.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from lists import services  # noqa: E402
+from lists.models import ListMembership, ShoppingList, UserSearchToken  # noqa: E402
+from lists.search import (  # noqa: E402
+    _prefix_filter,
+    index_users,
+    search_cache,
+    search_users,
+)
+
+FIRST_NAMES = (
+    "james mary john patricia robert jennifer michael linda william elizabeth "
+    "david barbara richard susan joseph jessica thomas sarah charles karen "
+    "christopher lisa daniel nancy matthew betty anthony margaret mark sandra "
+    "donald ashley steven kimberly paul emily andrew donna joshua michelle "
+    "kenneth carol kevin amanda brian dorothy george melissa timothy deborah "
+    "jose maria juan ana luis carmen carlos rosa jorge sofia wei li hiro yuki"
+).split()
+LAST_NAMES = (
+    "smith johnson williams brown jones garcia miller davis rodriguez martinez "
+    "hernandez lopez gonzalez wilson anderson thomas taylor moore jackson martin "
+    "lee perez thompson white harris sanchez clark ramirez lewis robinson walker "
+    "young allen king wright scott torres nguyen hill flores green adams nelson "
+    "baker hall rivera campbell mitchell carter roberts tanaka kim chen wang"
+).split()
+BATCH_SIZE = 5000
+
+
+def build_users(count, seed):
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for offset in range(0, count, BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + BATCH_SIZE, count)):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            batch.append(
+                User(
+                    username=f"{first[0]}{last}{i}",
+                    first_name=first.title(),
+                    last_name=last.title(),
+                    email=f"{first}.{last}{i}@example.com",
+                    password="!",
+                )
+            )
+        # bulk_create skips the post_save signal, so index explicitly
+        index_users(User.objects.bulk_create(batch), batch_size=BATCH_SIZE)
+    return time.perf_counter() - started
+
+
+def query_plan(prefix):
+    rows = (
+        UserSearchToken.objects.filter(**_prefix_filter(prefix), rank=0)
+        .order_by("token", "user_id")
+        .values_list("user_id", flat=True)[:40]
+    )
+    return rows.explain()
+
+
+def time_queries(queries, requester, shopping_list, repeat, cold=True):
+    timings = []
+    for _ in range(repeat):
+        for query in queries:
+            if cold:
+                search_cache.clear()
+            started = time.perf_counter()
+            search_users(query, requester, shopping_list)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "queries": len(timings),
+        "p50_ms": round(statistics.median(timings) * 1000, 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1] * 1000, 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99) - 1] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print JSON only")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    build_seconds = build_users(args.users, args.seed)
+
+    requester, *collaborators = User.objects.order_by("id")[:50]
+    shopping_list = services.create_list(requester, "Bench")
+    ListMembership.objects.bulk_create(
+        ListMembership(
+            user=user,
+            shopping_list=shopping_list,
+            role="member",
+            created_at=shopping_list.created_at,
+        )
+        for user in collaborators
+    )
+    ShoppingList.objects.filter(pk=shopping_list.pk).update(member_count=49)
+
+    rng = random.Random(args.seed)
+    names = FIRST_NAMES + LAST_NAMES
+    workloads = {
+        "two_chars": [name[:2] for name in rng.sample(names, 20)],
+        "three_chars": [name[:3] for name in rng.sample(names, 20)],
+        "full_word": rng.sample(names, 20),
+        "two_words": [
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:2]}" for _ in range(20)
+        ],
+        "no_match": ["zq", "xxv", "qqqq"],
+    }
+    # every user types a name out one keystroke at a time
+    typed = [
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"[:length]
+        for length in range(2, 12)
+        for _ in range(20)
+    ]
+    typed.sort(key=lambda query: (query.split()[0], len(query)))
+    result = {
+        "users": args.users,
+        "tokens": UserSearchToken.objects.count(),
+        "build_seconds": round(build_seconds, 1),
+        "plan": query_plan("jo"),
+        "latency": {
+            name: time_queries(queries, requester, shopping_list, args.repeat)
+            for name, queries in workloads.items()
+        },
+    }
+    search_cache.clear()
+    search_cache.reset_stats()
+    result["typeahead"] = time_queries(
+        typed, requester, shopping_list, args.repeat, cold=False
+    )
+    result["typeahead"]["cache"] = search_cache.as_dict()
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        if key == "typeahead":
+            print(f"typeahead (cached): {value}")
+        elif key == "latency":
+            for name, stats in value.items():
+                print(f"{name:>12}: {stats}")
+        else:
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
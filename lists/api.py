@@ -1,17 +1,46 @@
 # lists/api.py
-from django.db.models import Q
+from django.db.models import Prefetch
 from django.contrib.auth.models import User
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import ValidationError as APIValidationError
+from django.core.exceptions import ValidationError
 
-from .models import ShoppingList, Item, ListInvite
-from .serializers import ShoppingListSerializer, ItemSerializer, InviteSerializer
-from .permissions import get_lists_user_can_view, IsOwnerOrShared
-from .services import archive_list, update_item, send_invite
+from .models import Item
+from .serializers import (
+    ShoppingListSerializer,
+    ItemSerializer,
+    InviteSerializer,
+    BulkItemSerializer,
+    BulkInviteSerializer,
+    MoveItemSerializer,
+    RemoveCollaboratorSerializer,
+    SyncSerializer,
+)
+from .pagination import ItemCursorPagination, ListCursorPagination
+from .permissions import (
+    get_lists_user_can_view,
+    get_invites_user_can_view,
+)
+from .services import (
+    create_list,
+    delete_list,
+    remove_collaborator,
+    archive_list,
+    rename_list,
+    add_item,
+    update_item,
+    move_item,
+    delete_item,
+    send_invite,
+    send_invites,
+    apply_item_operations,
+    apply_client_mutations,
+    get_changes_since,
+)
 
 
 class ShoppingListViewSet(viewsets.ModelViewSet):
@@ -23,16 +52,42 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     - auto-set the author on create
     - allow CRUD operations via DRF Router
     - add custom actions like archive
+    - prefetch items in one query unless ?fields= leaves them out
+    - delta sync via changes, offline uploads via sync
     """
 
     serializer_class = ShoppingListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ListCursorPagination
 
     def get_queryset(self):
-        return get_lists_user_can_view(self.request.user)
+        qs = get_lists_user_can_view(self.request.user)
+        if self.action not in ("list", "retrieve"):
+            return qs
+        selected = ShoppingListSerializer.requested_fields(self.request)
+        if selected is None or "items" in selected:
+            qs = qs.prefetch_related(
+                Prefetch("items", queryset=Item.objects.order_by("rank", "id"))
+            )
+        return qs
 
     def perform_create(self, serializer):
-        serializer.save()
+        serializer.instance = create_list(
+            self.request.user, serializer.validated_data["name"]
+        )
+
+    def perform_update(self, serializer):
+        # name is the only writable field
+        name = serializer.validated_data.get("name", serializer.instance.name)
+        try:
+            serializer.instance = rename_list(
+                serializer.instance, self.request.user, name
+            )
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+    def perform_destroy(self, instance):
+        delete_list(instance, self.request.user)
 
     @action(detail=True, methods=["post"])
     def archive(self, request, pk=None):
@@ -41,36 +96,170 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         archive_list(sl, request.user)
         return Response(ShoppingListSerializer(sl).data)
 
+    @action(detail=True, methods=["post"], url_path="remove-collaborator")
+    def remove_collaborator(self, request, pk=None):
+        """
+        Custom action: remove a collaborator, or leave the list yourself
+        (POST /shoppinglists/{id}/remove-collaborator/ {"user": <id>})
+        """
+        sl = self.get_object()
+        payload = RemoveCollaboratorSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        user = get_object_or_404(User, pk=payload.validated_data["user"])
+        try:
+            remove_collaborator(sl, request.user, user)
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+        return Response(status=204)
+
+    @action(detail=True, methods=["post"], url_path="items/bulk")
+    def bulk_items(self, request, pk=None):
+        """
+        Custom action: apply many item creates, status changes and deletes
+        in one transaction (POST /shoppinglists/{id}/items/bulk/)
+        """
+        sl = self.get_object()
+        payload = BulkItemSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            results = apply_item_operations(
+                sl, request.user, payload.validated_data["operations"]
+            )
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+        for result in results:
+            if result.get("item") is not None:
+                result["item"] = ItemSerializer(result["item"]).data
+            else:
+                result.pop("item", None)
+        return Response({"results": results})
+
+    @action(detail=True, methods=["get"])
+    def changes(self, request, pk=None):
+        """
+        Custom action: items changed after ?since=<version>
+        (GET /shoppinglists/{id}/changes/?since=12)
+        """
+        sl = self.get_object()
+        try:
+            since = int(request.query_params.get("since", 0))
+        except ValueError:
+            raise APIValidationError({"since": "Must be an integer version."})
+
+        items, deleted = get_changes_since(sl, since)
+        return Response(
+            {
+                "version": sl.version,
+                "name": sl.name,
+                "is_archived": sl.is_archived,
+                "items": ItemSerializer(items, many=True).data,
+                "deleted": deleted,
+            }
+        )
+
+    @action(detail=True, methods=["post"])
+    def sync(self, request, pk=None):
+        """
+        Custom action: replay a queued offline mutation log in one
+        transaction and return the results plus everything changed since
+        the oldest base_version (POST /shoppinglists/{id}/sync/)
+        """
+        sl = self.get_object()
+        payload = SyncSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        mutations = payload.validated_data["mutations"]
+        try:
+            results = apply_client_mutations(sl, request.user, mutations)
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+        for result in results:
+            if "item" in result:
+                item = result["item"]
+                result["item"] = item and ItemSerializer(item).data
+            if "invite" in result:
+                invite = result["invite"]
+                result["invite"] = invite and InviteSerializer(invite).data
+        since = min(mutation["base_version"] for mutation in mutations)
+        items, deleted = get_changes_since(sl, since)
+        return Response(
+            {
+                "version": sl.version,
+                "results": results,
+                "items": ItemSerializer(items, many=True).data,
+                "deleted": deleted,
+            }
+        )
+
 
 class ItemViewSet(viewsets.ModelViewSet):
     """
     ViewSet for items
     - Expose CRUD endpoints for items /api/items
+    - reorder with the move action
     - enforce permissions
     - hook into service layer
     """
 
     serializer_class = ItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ItemCursorPagination
 
     def get_queryset(self):
-        visible = get_lists_user_can_view(self.request.user)
+        # joined to the user's active memberships, so access is as of now
         return Item.objects.select_related("shopping_list").filter(
-            shopping_list__in=visible
+            shopping_list__memberships__user_id=self.request.user.id,
+            shopping_list__memberships__is_archived=False,
         )
 
     def perform_create(self, serializer):
         sl = serializer.validated_data["shopping_list"]
-
-        if not get_lists_user_can_view(self.request.user).filter(pk=sl.pk).exists():
-            raise PermissionDenied("Not allowed on this list")
-        serializer.save()
+        # add_item refuses non-members with PermissionDenied (a 403)
+        validated = serializer.validated_data
+        try:
+            serializer.instance = add_item(
+                sl,
+                self.request.user,
+                validated["name"],
+                status=validated.get("status", "need"),
+            )
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
 
     def perform_update(self, serializer):
         item = self.get_object()
         user = self.request.user
         validated = serializer.validated_data
-        update_item(item, user, **validated)
+        try:
+            serializer.instance = update_item(item, user, **validated)
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+    def perform_destroy(self, instance):
+        try:
+            delete_item(self.request.user, instance)
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+    @action(detail=True, methods=["post"])
+    def move(self, request, pk=None):
+        """
+        Custom action: move this item to just after another item on its list,
+        or to the top with null (POST /items/{id}/move/ {"after": <id> | null})
+        """
+        item = self.get_object()
+        payload = MoveItemSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        after_id = payload.validated_data["after"]
+        after = None
+        if after_id is not None:
+            after = get_object_or_404(self.get_queryset(), pk=after_id)
+        try:
+            move_item(item, request.user, after)
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+        return Response(ItemSerializer(item).data)
 
 
 class InviteViewSet(viewsets.ModelViewSet):
@@ -85,26 +274,47 @@ class InviteViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        list_invites = ListInvite.objects.filter(
-            Q(invitee=self.request.user) | Q(inviter=self.request.user)
-        )
-        return list_invites
+        return get_invites_user_can_view(self.request.user, pending_only=False)
 
     def perform_create(self, serializer):
         request = self.request
-        list_id = serializer.validated_data["shopping_list"].id
+        # the serializer already loaded the list; no need to fetch it again
+        sl = serializer.validated_data["shopping_list"]
         invitee = serializer.validated_data["invitee"]
 
-        sl = ShoppingList.objects.get(pk=list_id)
-
-        invite = send_invite(
-            shopping_list=sl,
-            inviter=request.user,
-            invitee=invitee,
-        )
+        try:
+            invite = send_invite(
+                shopping_list=sl,
+                inviter=request.user,
+                invitee=invitee,
+            )
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
 
         serializer.instance = invite
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Custom action: invite many users to one list
+        (POST /invites/bulk/ {"shopping_list": <id>, "invitees": [<id>, ...]})
+        """
+        payload = BulkInviteSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            results = send_invites(
+                payload.validated_data["shopping_list"],
+                request.user,
+                payload.validated_data["invitees"],
+            )
+        except ValidationError as e:
+            raise APIValidationError(e.messages)
+
+        for result in results:
+            if result["ok"]:
+                result["invite"] = InviteSerializer(result["invite"]).data
+        return Response({"results": results})
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -116,7 +326,7 @@ class InviteViewSet(viewsets.ModelViewSet):
             invite_obj = serializer.instance
             return render(
                 request,
-                "lists/_invite_success.html",
+                "invites/_invite_success.html",
                 {"username": invite_obj.invitee.username},
             )
 
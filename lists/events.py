@@ -0,0 +1,140 @@
+# lists/events.py
+"""
+Per-list event fan-out for live updates.
+
+Services call publish_on_commit() and the event is handed to the broker
+once the surrounding transaction commits. The list_events view subscribes
+to one list and streams what the broker delivers as Server-Sent Events.
+
+The broker class comes from settings.LIST_EVENTS_BROKER (a dotted path).
+The default InProcessBroker only reaches subscribers in the same process.
+When running more than one worker, swap it for a backend that shares
+events between processes (Redis pub/sub, Postgres LISTEN/NOTIFY, ...).
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One subscriber's queue, bound to the event loop that reads it."""
+
+    def __init__(self, broker, list_id, loop, max_queue_size):
+        self.broker = broker
+        self.list_id = list_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+
+    def deliver(self, event):
+        """Thread-safe: hand event to the subscriber's loop."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # loop already closed: the client is gone
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # slow consumer: drop rather than grow without bound; the client
+            # can catch up through the changes endpoint
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """Interface for pub/sub backends used by list events."""
+
+    def subscribe(self, list_id):
+        """Return a Subscription; must be called from the reading event loop."""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def publish(self, list_id, event):
+        """Deliver event to every subscriber of list_id; callable from any thread."""
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, list_id):
+        subscription = Subscription(
+            self, list_id, asyncio.get_running_loop(), self.max_queue_size
+        )
+        with self._lock:
+            self._subscribers[list_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.list_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.list_id]
+
+    def publish(self, list_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(list_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscriber_count(self, list_id=None):
+        with self._lock:
+            if list_id is not None:
+                return len(self._subscribers.get(list_id, ()))
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(
+                    getattr(
+                        settings, "LIST_EVENTS_BROKER", "lists.events.InProcessBroker"
+                    )
+                )
+                _broker = broker_class()
+    return _broker
+
+
+def item_payload(item):
+    return {
+        "id": item.id,
+        "name": item.name,
+        "status": item.status,
+        "added_by": item.added_by_id,
+        "version": item.version,
+        "rank": item.rank,
+    }
+
+
+def publish_on_commit(list_id, event_type, version, **data):
+    """Publish {"type", "list", "version", ...} after the current transaction commits."""
+    event = {"type": event_type, "list": list_id, "version": version, **data}
+    transaction.on_commit(lambda: get_broker().publish(list_id, event))
@@ -1,5 +1,5 @@
 from django import forms
-from .models import ShoppingList, Item, ListInvite
+from .models import ShoppingList, Item, ListInvite, normalize_item_name
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
@@ -56,7 +56,7 @@ class AddItemForm(forms.ModelForm):
     def clean_name(self):
         name = self.cleaned_data.get("name")
         shopping_list = self.instance.shopping_list
-        if shopping_list.items.filter(name__iexact=name).exists():
+        if shopping_list.items.filter(name_key=normalize_item_name(name)).exists():
             raise ValidationError("This item already exists in the shopping list.")
         return name
 
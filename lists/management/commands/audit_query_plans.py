@@ -0,0 +1,284 @@
+import logging
+import re
+import secrets
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.query import QuerySet
+from django.test import Client
+
+from lists import permissions, services
+
+# SQLite: "SCAN lists_item" or "SCAN U0 USING INDEX ...", but not
+# "SCAN CONSTANT ROW" or a scan of a materialized subquery
+SQLITE_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(?!\()(\w+)")
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+ID_SEGMENT = re.compile(r"/\d+(?=/)")
+
+
+def workload(step):
+    """
+    Exercise every queryset built in lists/permissions.py, lists/services.py
+    and lists/api.py once, each call under its own label.
+    """
+    tag = secrets.token_hex(4)
+    owner, member, guest, outsider = (
+        User.objects.create_user(username=f"audit-{tag}-{role}")
+        for role in ("owner", "member", "guest", "outsider")
+    )
+
+    shopping_list = step("services.create_list", services.create_list, owner, "Audit")
+    other = step("services.create_list", services.create_list, owner, "Audit 2")
+    milk = step("services.add_item", services.add_item, shopping_list, owner, "Milk")
+    eggs = step("services.add_item", services.add_item, shopping_list, owner, "Eggs")
+    invite = step(
+        "services.send_invite", services.send_invite, shopping_list, owner, member
+    )
+    step("services.accept_invite", services.accept_invite, invite, member)
+    invite = step(
+        "services.send_invite", services.send_invite, shopping_list, owner, guest
+    )
+    step("services.decline_invite", services.decline_invite, invite, guest)
+    invite = step(
+        "services.send_invite", services.send_invite, shopping_list, owner, guest
+    )
+    step("services.cancel_invite", services.cancel_invite, invite, owner)
+    step(
+        "services.send_invites",
+        services.send_invites,
+        other,
+        owner,
+        [member.id, guest.id],
+    )
+    step("services.update_item", services.update_item, milk, member, status="bought")
+    bread = step(
+        "services.apply_item_operations",
+        services.apply_item_operations,
+        shopping_list,
+        owner,
+        [
+            {"op": "create", "name": "Bread"},
+            {"op": "update", "id": eggs.id, "status": "will_buy"},
+            {"op": "delete", "id": milk.id},
+        ],
+    )[0]["item"]
+    step("services.move_item", services.move_item, bread, owner)
+    step("services.move_item", services.move_item, bread, owner, eggs)
+    step(
+        "services.rebalance_item_ranks",
+        services.rebalance_item_ranks,
+        shopping_list.id,
+    )
+    step(
+        "services.apply_client_mutations",
+        services.apply_client_mutations,
+        shopping_list,
+        member,
+        [
+            {"client_id": f"{tag}-1", "base_version": 0, "op": "create", "name": "Jam"},
+            {
+                "client_id": f"{tag}-2",
+                "base_version": 0,
+                "op": "delete",
+                "ref": f"{tag}-1",
+            },
+        ],
+    )
+    step("services.get_changes_since", services.get_changes_since, shopping_list, 0)
+    step("services.get_changes_since", services.get_changes_since, shopping_list, 1)
+    step(
+        "services.get_item_user_can_edit",
+        services.get_item_user_can_edit,
+        member,
+        eggs.id,
+    )
+
+    for user, include_archived in ((owner, False), (member, True)):
+        step(
+            "permissions.get_lists_user_can_view",
+            permissions.get_lists_user_can_view,
+            user,
+            include_archived,
+        )
+        step(
+            "permissions.get_list_summaries_user_can_view",
+            permissions.get_list_summaries_user_can_view,
+            user,
+            include_archived,
+        )
+    step(
+        "permissions.user_can_access_list",
+        permissions.user_can_access_list,
+        outsider,
+        shopping_list,
+    )
+    for user, pending_only in ((owner, True), (guest, False)):
+        invites = permissions.get_invites_user_can_view(user, pending_only)
+        step("permissions.get_invites_user_can_view", list, invites)
+        # the invites dashboard splits them into received and sent
+        step(
+            "permissions.get_invites_user_can_view", list, invites.filter(invitee=user)
+        )
+        step(
+            "permissions.get_invites_user_can_view", list, invites.filter(inviter=user)
+        )
+
+    client = Client(HTTP_HOST="127.0.0.1")  # testserver is not in ALLOWED_HOSTS
+    client.force_login(owner)
+    list_id, item_id = shopping_list.id, bread.id
+    for method, path, data in (
+        ("get", "/api/shoppinglists/", None),
+        ("get", "/api/shoppinglists/?fields=id,name", None),
+        ("get", f"/api/shoppinglists/{list_id}/", None),
+        ("patch", f"/api/shoppinglists/{list_id}/", {"name": "Audited"}),
+        ("get", f"/api/shoppinglists/{list_id}/changes/?since=1", None),
+        (
+            "post",
+            f"/api/shoppinglists/{list_id}/sync/",
+            {
+                "mutations": [
+                    {
+                        "client_id": f"{tag}-3",
+                        "base_version": 0,
+                        "op": "update",
+                        "id": item_id,
+                        "status": "will_buy",
+                    }
+                ]
+            },
+        ),
+        (
+            "post",
+            f"/api/shoppinglists/{list_id}/items/bulk/",
+            {"operations": [{"op": "update", "id": item_id, "status": "bought"}]},
+        ),
+        ("get", "/api/items/", None),
+        ("post", "/api/items/", {"shopping_list": list_id, "name": "Tea"}),
+        ("get", f"/api/items/{item_id}/", None),
+        ("patch", f"/api/items/{item_id}/", {"status": "need"}),
+        ("post", f"/api/items/{item_id}/move/", {"after": None}),
+        ("get", "/api/invites/", None),
+        ("post", "/api/invites/", {"shopping_list": list_id, "invitee": guest.id}),
+        (
+            "post",
+            "/api/invites/bulk/",
+            {"shopping_list": list_id, "invitees": [outsider.id]},
+        ),
+        ("delete", f"/api/items/{item_id}/", None),
+    ):
+        label = f"api {method.upper()} {ID_SEGMENT.sub('/<id>', path)}"
+        response = step(
+            label,
+            getattr(client, method),
+            path,
+            data,
+            content_type="application/json",
+        )
+        if response.status_code >= 400:
+            raise CommandError(f"{label}: HTTP {response.status_code}")
+
+    step("services.delete_item", services.delete_item, owner, eggs)
+    step(
+        "services.remove_collaborator",
+        services.remove_collaborator,
+        shopping_list,
+        owner,
+        member,
+    )
+    step("services.archive_list", services.archive_list, other, owner)
+    step("services.delete_list", services.delete_list, shopping_list, owner)
+
+
+def explain(sql, params):
+    """Return the plan as a list of lines."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    pattern = SQLITE_SCAN if connection.vendor == "sqlite" else POSTGRES_SCAN
+    return [match.group(1) for line in plan if (match := pattern.search(line.strip()))]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every query the lists permissions, services and API run on "
+        "a throwaway workload, and fail if any of them scans a whole table."
+    )
+
+    def handle(self, *args, verbosity, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"Unsupported database: {connection.vendor}")
+
+        captured = {}
+        label = None
+
+        def capture(execute, sql, params, many, context):
+            if (
+                label
+                and not many
+                and sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+            ):
+                captured.setdefault((label, sql), params)
+            return execute(sql, params, many, context)
+
+        def step(name, fn, *args, **kwargs):
+            nonlocal label
+            label = name
+            try:
+                result = fn(*args, **kwargs)
+                if isinstance(result, QuerySet):
+                    list(result)
+                elif isinstance(result, tuple) and isinstance(result[0], QuerySet):
+                    list(result[0])
+                return result
+            finally:
+                label = None
+
+        requests_logger = logging.getLogger("shoppinglist.requests")
+        log_level = requests_logger.level
+        # one log line per API call would drown the report
+        requests_logger.setLevel(logging.WARNING)
+        try:
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    # tiny tables make a seq scan the cheapest plan; only
+                    # report it when no index could serve the query
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                with connection.execute_wrapper(capture):
+                    workload(step)
+                plans = {
+                    key: explain(key[1], params) for key, params in captured.items()
+                }
+                transaction.set_rollback(True)
+        finally:
+            requests_logger.setLevel(log_level)
+
+        problems = 0
+        for (name, sql), plan in plans.items():
+            tables = full_scans(plan)
+            if tables:
+                problems += 1
+                self.stdout.write(
+                    self.style.ERROR(f"{name}: full scan of {', '.join(tables)}")
+                )
+            elif verbosity >= 2:
+                self.stdout.write(name)
+            if tables or verbosity >= 2:
+                self.stdout.write(f"  {sql}")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+
+        if problems:
+            raise CommandError(
+                f"{problems} of {len(plans)} queries scan a whole table."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {len(plans)} queries. No full table scans.")
+        )
@@ -0,0 +1,349 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from lists.models import (
+    Item,
+    ListInvite,
+    ListMembership,
+    ShoppingList,
+    normalize_item_name,
+)
+from lists.ranks import spread_ranks
+from lists.search import index_users
+
+# the services refuse more than this many items and collaborators per list
+MAX_ITEMS = 99
+MAX_MEMBERS = 49
+
+FIRST_NAMES = (
+    "james mary john patricia robert jennifer michael linda william elizabeth "
+    "david barbara richard susan joseph jessica thomas sarah charles karen "
+    "jose maria juan ana luis carmen wei li hiro yuki amara kofi"
+).split()
+LAST_NAMES = (
+    "smith johnson williams brown jones garcia miller davis rodriguez martinez "
+    "lopez gonzalez wilson anderson thomas taylor moore jackson martin lee "
+    "nguyen kim chen wang tanaka okafor mensah"
+).split()
+LIST_NAMES = (
+    "Groceries, Weekly shop, Party, BBQ, Camping trip, Costco run, Pharmacy, "
+    "Hardware store, Birthday, Holiday dinner, Office snacks, Baby stuff"
+).split(", ")
+# case-insensitively distinct and more than MAX_ITEMS of them, so sampling
+# a list's names can never trip unique_item_name_key_per_list
+PRODUCTS = (
+    "Milk, Eggs, Bread, Butter, Cheese, Yogurt, Cream, Apples, Bananas, "
+    "Oranges, Lemons, Limes, Grapes, Strawberries, Blueberries, Avocados, "
+    "Tomatoes, Potatoes, Onions, Garlic, Carrots, Celery, Lettuce, Spinach, "
+    "Kale, Broccoli, Cauliflower, Peppers, Cucumbers, Zucchini, Mushrooms, "
+    "Corn, Peas, Beans, Lentils, Rice, Pasta, Flour, Sugar, Salt, Black pepper, "
+    "Oats, Cereal, Granola, Honey, Jam, Peanut butter, Coffee, Tea, Juice, "
+    "Sparkling water, Soda, Beer, Wine, Chicken, Beef, Pork, Bacon, Sausages, "
+    "Ham, Turkey, Salmon, Tuna, Shrimp, Tofu, Hummus, Salsa, Chips, Crackers, "
+    "Cookies, Chocolate, Ice cream, Frozen pizza, Tortillas, Bagels, Muffins, "
+    "Olive oil, Vinegar, Ketchup, Mustard, Mayonnaise, Soy sauce, Basil, "
+    "Parsley, Cilantro, Ginger, Cinnamon, Vanilla, Baking soda, Yeast, "
+    "Almonds, Raisins, Popcorn, Soup, Stock, Candles, Napkins, Foil, "
+    "Batteries, Soap, Shampoo, Toothpaste, Detergent, Sponges, Paper towels, "
+    "Toilet paper, Trash bags, Light bulbs, Tape"
+).split(", ")
+STATUSES = ["need", "will_buy", "bought"]
+STATUS_WEIGHTS = [55, 15, 30]
+OPEN_INVITE_STATUSES = ["pending", "declined", "canceled"]
+OPEN_INVITE_WEIGHTS = [50, 25, 25]
+
+
+def spread(rng, total, count, mean, cap):
+    """
+    `count` random sizes in [0, cap] averaging `mean`, skewed like real
+    data (most lists are small, a few are full); when `total` is given
+    they are adjusted to add up to exactly that.
+    """
+    sizes = [
+        min(cap, int(rng.expovariate(1 / mean))) if mean else 0 for _ in range(count)
+    ]
+    if total is not None:
+        diff = total - sum(sizes)
+        step = 1 if diff > 0 else -1
+        while diff:
+            i = rng.randrange(count)
+            if 0 <= sizes[i] + step <= cap:
+                sizes[i] += step
+                diff -= step
+    return sizes
+
+
+def insert_rows(model, rows, batch_size):
+    """
+    INSERT rows (dicts of attname -> database-ready value) with executemany;
+    columns a row leaves out get the field's default.
+
+    bulk_create spends most of its time preparing every value of every row
+    through the field API, which dominates at millions of rows.
+    """
+    fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+    defaults = {
+        f.attname: f.get_db_prep_save(f.get_default(), connection) for f in fields
+    }
+    qn = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        qn(model._meta.db_table),
+        ", ".join(qn(f.column) for f in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(
+                sql,
+                [
+                    tuple(row.get(f.attname, defaults[f.attname]) for f in fields)
+                    for row in rows[offset : offset + batch_size]
+                ],
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate realistic users, lists, memberships, items and invites in "
+        "bulk, for trying the app at production scale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--lists", type=int, default=2000)
+        parser.add_argument(
+            "--items", type=int, default=40000, help="Total items, at most 99 per list."
+        )
+        parser.add_argument(
+            "--members",
+            type=float,
+            default=2.0,
+            help="Average collaborators per list (at most 49).",
+        )
+        parser.add_argument(
+            "--open-invites",
+            type=float,
+            default=1.0,
+            help="Average pending, declined and canceled invites per list.",
+        )
+        parser.add_argument(
+            "--archived", type=float, default=0.1, help="Share of archived lists."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--skip-search-index",
+            action="store_true",
+            help="Don't index the new users for the invite typeahead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2:
+            raise CommandError("Need at least 2 users: lists are shared with others.")
+        if options["items"] > options["lists"] * MAX_ITEMS:
+            raise CommandError(f"At most {MAX_ITEMS} items per list fit on a list.")
+        self.verbosity = options["verbosity"]
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.created = dict.fromkeys(
+            ["users", "lists", "memberships", "items", "invites"], 0
+        )
+        started = time.monotonic()
+
+        user_ids = self.create_users(options["users"], options["skip_search_index"])
+        item_counts = spread(
+            self.rng,
+            options["items"],
+            options["lists"],
+            options["items"] / max(options["lists"], 1),
+            MAX_ITEMS,
+        )
+        member_counts = spread(
+            self.rng,
+            None,
+            options["lists"],
+            options["members"],
+            min(MAX_MEMBERS, len(user_ids) - 1),
+        )
+        # a list's rows go in together, in chunks of about batch_size items
+        chunk = []
+        chunk_items = 0
+        for i in range(options["lists"]):
+            chunk.append(i)
+            chunk_items += item_counts[i]
+            if chunk_items >= self.batch_size or len(chunk) >= self.batch_size:
+                self.create_lists(chunk, user_ids, item_counts, member_counts, options)
+                chunk, chunk_items = [], 0
+        if chunk:
+            self.create_lists(chunk, user_ids, item_counts, member_counts, options)
+
+        elapsed = time.monotonic() - started
+        rows = sum(self.created.values())
+        summary = ", ".join(f"{n} {name}" for name, n in self.created.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {summary} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)."
+            )
+        )
+
+    def create_users(self, count, skip_search_index):
+        # unique per run, so the command can be run again on the same database
+        run = uuid.uuid4().hex[:6]
+        user_ids = []
+        for offset in range(0, count, self.batch_size):
+            batch = []
+            for i in range(offset, min(offset + self.batch_size, count)):
+                first = self.rng.choice(FIRST_NAMES)
+                last = self.rng.choice(LAST_NAMES)
+                batch.append(
+                    User(
+                        username=f"{first}.{last}.{run}{i}",
+                        first_name=first.title(),
+                        last_name=last.title(),
+                        email=f"{first}.{last}.{run}{i}@example.com",
+                        password="!",  # unusable: generated users can't log in
+                    )
+                )
+            with transaction.atomic():
+                batch = User.objects.bulk_create(batch, batch_size=self.batch_size)
+                # bulk_create skips the post_save signal that indexes users
+                if not skip_search_index:
+                    index_users(batch, batch_size=self.batch_size)
+            user_ids += [user.id for user in batch]
+            self.created["users"] += len(batch)
+            self.progress()
+        return user_ids
+
+    def create_lists(self, chunk, user_ids, item_counts, member_counts, options):
+        rng = self.rng
+        now = timezone.now()
+        plans = []
+        for i in chunk:
+            # skewed, so a few users own many lists like in real data
+            author = user_ids[int(len(user_ids) * rng.random() ** 2)]
+            open_invites = options["open_invites"]
+            open_count = int(rng.expovariate(1 / open_invites)) if open_invites else 0
+            # distinct users other than the author: members first, then one
+            # open invite each, so pending invites never collide on
+            # unique_pending_invite and nobody invites themselves
+            wanted = min(len(user_ids), member_counts[i] + open_count + 1)
+            others = [u for u in rng.sample(user_ids, wanted) if u != author]
+            members = others[: member_counts[i]]
+            invitees = others[member_counts[i] :][:open_count]
+            statuses = rng.choices(STATUSES, STATUS_WEIGHTS, k=item_counts[i])
+            plans.append((author, members, invitees, statuses))
+
+        lists = [
+            ShoppingList(
+                author_id=author,
+                name=rng.choice(LIST_NAMES),
+                is_archived=rng.random() < options["archived"],
+                # every item add and every accepted invite bumped it once
+                version=len(statuses) + len(members),
+                item_count=len(statuses),
+                need_count=statuses.count("need"),
+                will_buy_count=statuses.count("will_buy"),
+                bought_count=statuses.count("bought"),
+                member_count=len(members),
+                last_activity_at=now - timedelta(minutes=rng.randrange(60 * 24 * 90)),
+            )
+            for author, members, _, statuses in plans
+        ]
+
+        updated_at = Item._meta.get_field("updated_at").get_db_prep_save(
+            now, connection
+        )
+        with transaction.atomic():
+            lists = ShoppingList.objects.bulk_create(lists, batch_size=self.batch_size)
+            memberships, shares, invites, items = [], [], [], []
+            for sl, (author, members, invitees, statuses) in zip(lists, plans):
+                memberships.append(
+                    ListMembership(
+                        user_id=author,
+                        shopping_list_id=sl.id,
+                        role="owner",
+                        is_archived=sl.is_archived,
+                        created_at=sl.created_at,
+                    )
+                )
+                for user_id in members:
+                    memberships.append(
+                        ListMembership(
+                            user_id=user_id,
+                            shopping_list_id=sl.id,
+                            role="member",
+                            is_archived=sl.is_archived,
+                            created_at=sl.created_at,
+                        )
+                    )
+                    shares.append(
+                        ShoppingList.shared_with.through(
+                            shoppinglist_id=sl.id, user_id=user_id
+                        )
+                    )
+                    # every collaborator joined through an accepted invite
+                    invites.append(
+                        ListInvite(
+                            inviter_id=author,
+                            invitee_id=user_id,
+                            shopping_list_id=sl.id,
+                            status="accepted",
+                            accepted_at=sl.created_at,
+                        )
+                    )
+                open_statuses = rng.choices(
+                    OPEN_INVITE_STATUSES, OPEN_INVITE_WEIGHTS, k=len(invitees)
+                )
+                for user_id, status in zip(invitees, open_statuses):
+                    invites.append(
+                        ListInvite(
+                            inviter_id=author,
+                            invitee_id=user_id,
+                            shopping_list_id=sl.id,
+                            status=status,
+                        )
+                    )
+                names = rng.sample(PRODUCTS, len(statuses))
+                ranks = spread_ranks(len(names))
+                for version, (name, status, rank) in enumerate(
+                    zip(names, statuses, ranks), 1
+                ):
+                    items.append(
+                        {
+                            "shopping_list_id": sl.id,
+                            "name": name,
+                            "name_key": normalize_item_name(name),
+                            "rank": rank,
+                            "status": status,
+                            "added_by_id": rng.choice(members or [author]),
+                            "updated_at": updated_at,
+                            "version": version,
+                        }
+                    )
+
+            ListMembership.objects.bulk_create(memberships, batch_size=self.batch_size)
+            ShoppingList.shared_with.through.objects.bulk_create(
+                shares, batch_size=self.batch_size
+            )
+            ListInvite.objects.bulk_create(invites, batch_size=self.batch_size)
+            # items are most of the rows: skip per-value ORM preparation
+            insert_rows(Item, items, self.batch_size)
+
+        self.created["lists"] += len(lists)
+        self.created["memberships"] += len(memberships)
+        self.created["invites"] += len(invites)
+        self.created["items"] += len(items)
+        self.progress()
+
+    def progress(self):
+        if self.verbosity >= 2:
+            self.stdout.write(
+                ", ".join(f"{n} {name}" for name, n in self.created.items())
+            )
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lists.models import ClientMutation
+
+
+class Command(BaseCommand):
+    help = "Delete offline sync results older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.CLIENT_MUTATION_RETENTION_DAYS,
+            help="Keep mutations applied within this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count rows without deleting."
+        )
+
+    def handle(self, *args, days, batch_size, dry_run, **options):
+        # range scan on the created_at index, one batch per statement
+        expired = ClientMutation.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=days)
+        )
+        if dry_run:
+            count = expired.count()
+        else:
+            count = 0
+            while True:
+                ids = list(expired.values_list("id", flat=True)[:batch_size])
+                if not ids:
+                    break
+                count += ClientMutation.objects.filter(id__in=ids).delete()[0]
+
+        verb = "Found" if dry_run else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {count} mutations older than {days} days.")
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.db.models.functions import Length
+
+from lists.models import Item
+from lists.ranks import REBALANCE_LENGTH
+from lists.services import rebalance_item_ranks
+
+
+def lists_needing_rebalance():
+    """
+    Ids of lists with an item rank longer than REBALANCE_LENGTH, an empty
+    rank, or two items sharing a rank (rows written outside the services).
+    """
+    long_or_empty = (
+        Item.objects.annotate(rank_length=Length("rank"))
+        .filter(Q(rank_length__gt=REBALANCE_LENGTH) | Q(rank=""))
+        .values_list("shopping_list_id", flat=True)
+    )
+    tied = (
+        Item.objects.values("shopping_list_id", "rank")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("shopping_list_id", flat=True)
+    )
+    return sorted(set(long_or_empty) | set(tied))
+
+
+class Command(BaseCommand):
+    help = "Respace item ranks on lists whose keys grew long or collided."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report lists without fixing them."
+        )
+
+    def handle(self, *args, dry_run, verbosity, **options):
+        list_ids = lists_needing_rebalance()
+        for list_id in list_ids:
+            if verbosity >= 2:
+                self.stdout.write(f"List {list_id}")
+            if not dry_run:
+                rebalance_item_ranks(list_id)
+
+        verb = "Found" if dry_run else "Rebalanced"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(list_ids)} lists."))
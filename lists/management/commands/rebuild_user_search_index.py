@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from lists.search import index_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the invite typeahead's user search tokens, e.g. after users "
+        "were bulk-imported without signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        indexed = 0
+        last_id = 0
+        while True:
+            users = list(
+                User.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .only("username", "first_name", "last_name", "email")[:batch_size]
+            )
+            if not users:
+                break
+            index_users(users, batch_size=batch_size)
+            indexed += len(users)
+            last_id = users[-1].id
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} users."))
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from lists.models import ShoppingList, Item
+
+COUNTER_FIELDS = [
+    "item_count",
+    "need_count",
+    "will_buy_count",
+    "bought_count",
+    "member_count",
+]
+
+
+def expected_counters(list_ids):
+    """Return {list_id: {counter: value}} computed from items and shares."""
+    expected = {list_id: dict.fromkeys(COUNTER_FIELDS, 0) for list_id in list_ids}
+    item_counts = (
+        Item.objects.filter(shopping_list_id__in=list_ids)
+        .values_list("shopping_list_id", "status")
+        .annotate(n=Count("id"))
+    )
+    for list_id, status, n in item_counts:
+        expected[list_id]["item_count"] += n
+        expected[list_id][f"{status}_count"] = n
+    member_counts = (
+        ShoppingList.shared_with.through.objects.filter(shoppinglist_id__in=list_ids)
+        .values_list("shoppinglist_id")
+        .annotate(n=Count("id"))
+    )
+    for list_id, n in member_counts:
+        expected[list_id]["member_count"] = n
+    return expected
+
+
+class Command(BaseCommand):
+    help = "Recompute ShoppingList item, status and member counters and fix drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report drift without fixing it."
+        )
+
+    def handle(self, *args, batch_size, dry_run, verbosity, **options):
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                lists = list(
+                    ShoppingList.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by("id")
+                    .only("id", *COUNTER_FIELDS)[:batch_size]
+                )
+                if not lists:
+                    break
+                expected = expected_counters([sl.id for sl in lists])
+                drifted = []
+                for sl in lists:
+                    values = expected[sl.id]
+                    current = {field: getattr(sl, field) for field in COUNTER_FIELDS}
+                    if current == values:
+                        continue
+                    if verbosity >= 2:
+                        self.stdout.write(f"List {sl.id}: {current} -> {values}")
+                    for field, value in values.items():
+                        setattr(sl, field, value)
+                    drifted.append(sl)
+                if drifted and not dry_run:
+                    ShoppingList.objects.bulk_update(drifted, COUNTER_FIELDS)
+            checked += len(lists)
+            fixed += len(drifted)
+            last_id = lists[-1].id
+
+        verb = "Found" if dry_run else "Fixed"
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} lists. {verb} {fixed} with drift.")
+        )
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over each SQLite replica, to stand "
+        "in for replication when trying DATABASE_REPLICA_URLS locally."
+    )
+
+    def handle(self, *args, **options):
+        primary = connections["default"]
+        if primary.vendor != "sqlite":
+            raise CommandError("The primary database is not SQLite.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured (DATABASE_REPLICA_URLS).")
+
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            if replica.vendor != "sqlite":
+                raise CommandError(f"Replica {alias} is not SQLite.")
+            replica.close()
+            target = sqlite3.connect(replica.settings_dict["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"Copied default to {alias}."))
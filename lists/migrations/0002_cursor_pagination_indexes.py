@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='listinvite',
+            index=models.Index(fields=['-created_at', 'id'], name='invite_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['-created_at', 'id'], name='list_created_id_idx'),
+        ),
+    ]
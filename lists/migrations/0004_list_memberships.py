@@ -0,0 +1,120 @@
+# Generated by Django 5.2.1 on 2026-10-17 21:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_memberships(apps, schema_editor):
+    """Create owner and member rows for existing lists, BATCH_SIZE lists at a time."""
+    ShoppingList = apps.get_model("lists", "ShoppingList")
+    ListMembership = apps.get_model("lists", "ListMembership")
+    SharedWith = ShoppingList.shared_with.through
+
+    last_id = 0
+    while True:
+        lists = list(
+            ShoppingList.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", "author_id", "is_archived", "created_at")[:BATCH_SIZE]
+        )
+        if not lists:
+            break
+        by_id = {row["id"]: row for row in lists}
+        rows = [
+            ListMembership(
+                user_id=row["author_id"],
+                shopping_list_id=row["id"],
+                role="owner",
+                is_archived=row["is_archived"],
+                created_at=row["created_at"],
+            )
+            for row in lists
+        ]
+        shares = SharedWith.objects.filter(shoppinglist_id__in=by_id).values_list(
+            "shoppinglist_id", "user_id"
+        )
+        for list_id, user_id in shares:
+            row = by_id[list_id]
+            if user_id == row["author_id"]:
+                continue
+            rows.append(
+                ListMembership(
+                    user_id=user_id,
+                    shopping_list_id=list_id,
+                    role="member",
+                    is_archived=row["is_archived"],
+                    created_at=row["created_at"],
+                )
+            )
+        ListMembership.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        last_id = lists[-1]["id"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0003_item_versions_and_tombstones"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ListMembership",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[("owner", "Owner"), ("member", "Member")],
+                        default="member",
+                        max_length=10,
+                    ),
+                ),
+                ("is_archived", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "shopping_list",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="memberships",
+                        to="lists.shoppinglist",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="list_memberships",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "is_archived", "-created_at", "shopping_list"],
+                        name="membership_user_visible_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "shopping_list"), name="unique_list_membership"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_counters(apps, schema_editor):
+    """Fill the new counter columns from items and shares, BATCH_SIZE lists at a time."""
+    ShoppingList = apps.get_model("lists", "ShoppingList")
+    Item = apps.get_model("lists", "Item")
+    SharedWith = ShoppingList.shared_with.through
+
+    last_id = 0
+    while True:
+        lists = list(
+            ShoppingList.objects.filter(id__gt=last_id).order_by("id")[:BATCH_SIZE]
+        )
+        if not lists:
+            break
+        by_id = {sl.id: sl for sl in lists}
+        item_counts = (
+            Item.objects.filter(shopping_list_id__in=by_id)
+            .values_list("shopping_list_id", "status")
+            .annotate(n=Count("id"))
+        )
+        for list_id, status, n in item_counts:
+            sl = by_id[list_id]
+            sl.item_count += n
+            setattr(sl, f"{status}_count", n)
+        member_counts = (
+            SharedWith.objects.filter(shoppinglist_id__in=by_id)
+            .values_list("shoppinglist_id")
+            .annotate(n=Count("id"))
+        )
+        for list_id, n in member_counts:
+            by_id[list_id].member_count = n
+        ShoppingList.objects.bulk_update(
+            lists,
+            [
+                "item_count",
+                "need_count",
+                "will_buy_count",
+                "bought_count",
+                "member_count",
+            ],
+        )
+        last_id = lists[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0004_list_memberships"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="bought_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="member_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="need_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="will_buy_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:05
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+TOKEN_LENGTH = 32
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    # frozen copy of lists.search.normalize
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [word[:TOKEN_LENGTH] for word in _WORD.findall(text.lower())]
+
+
+def user_tokens(user):
+    # frozen copy of lists.search.user_tokens
+    tokens = {}
+    local_part = (user.email or "").split("@")[0]
+    for field in (user.username, user.first_name, user.last_name, local_part):
+        for position, word in enumerate(normalize(field)):
+            rank = 0 if position == 0 else 1
+            if rank < tokens.get(word, 2):
+                tokens[word] = rank
+    return tokens
+
+
+def backfill_search_tokens(apps, schema_editor):
+    """Index existing users, BATCH_SIZE at a time."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserSearchToken = apps.get_model("lists", "UserSearchToken")
+
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("username", "first_name", "last_name", "email")[:BATCH_SIZE]
+        )
+        if not users:
+            break
+        UserSearchToken.objects.bulk_create(
+            [
+                UserSearchToken(user_id=user.id, token=token, rank=rank)
+                for user in users
+                for token, rank in user_tokens(user).items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        last_id = users[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0005_list_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=32)),
+                ("rank", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["rank", "token", "user"], name="search_token_prefix_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "token"), name="unique_user_search_token"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_search_tokens, migrations.RunPython.noop),
+    ]
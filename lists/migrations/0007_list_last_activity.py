@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:14
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+BATCH_SIZE = 1000
+
+
+def backfill_last_activity(apps, schema_editor):
+    """
+    Set last_activity_at to the latest of created_at, item updates and item
+    deletes, BATCH_SIZE lists at a time.
+    """
+    ShoppingList = apps.get_model("lists", "ShoppingList")
+    Item = apps.get_model("lists", "Item")
+    ItemTombstone = apps.get_model("lists", "ItemTombstone")
+
+    last_id = 0
+    while True:
+        lists = list(
+            ShoppingList.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "created_at")[:BATCH_SIZE]
+        )
+        if not lists:
+            break
+        by_id = {sl.id: sl for sl in lists}
+        for sl in lists:
+            sl.last_activity_at = sl.created_at
+        for model, field in ((Item, "updated_at"), (ItemTombstone, "deleted_at")):
+            latest = (
+                model.objects.filter(shopping_list_id__in=by_id)
+                .values_list("shopping_list_id")
+                .annotate(at=Max(field))
+            )
+            for list_id, at in latest:
+                sl = by_id[list_id]
+                sl.last_activity_at = max(sl.last_activity_at, at)
+        ShoppingList.objects.bulk_update(lists, ["last_activity_at"])
+        last_id = lists[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0006_user_search_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shoppinglist",
+            name="last_activity_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+    ]
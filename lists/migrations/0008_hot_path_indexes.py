@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0007_list_last_activity"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["shopping_list", "status"], name="item_list_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listinvite",
+            index=models.Index(
+                fields=["invitee", "status", "-created_at"],
+                name="invite_invitee_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="listinvite",
+            index=models.Index(
+                fields=["inviter", "status", "-created_at"],
+                name="invite_inviter_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shoppinglist",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["author", "-created_at"],
+                name="list_author_active_idx",
+            ),
+        ),
+    ]
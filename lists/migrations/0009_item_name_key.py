@@ -0,0 +1,72 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:58
+
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def normalize_item_name(name):
+    # frozen copy of lists.models.normalize_item_name
+    return unicodedata.normalize("NFKC", name).strip().casefold()
+
+
+def backfill_name_keys(apps, schema_editor):
+    """
+    Fill Item.name_key, BATCH_SIZE lists at a time. This is the first
+    uniqueness rule on item names, so a list can already hold names the
+    normalization merges (e.g. "Milk" and "milk ", compatibility
+    characters); they keep their rows: later ones get the item id appended
+    to their key.
+    """
+    ShoppingList = apps.get_model("lists", "ShoppingList")
+    Item = apps.get_model("lists", "Item")
+
+    last_id = 0
+    while True:
+        list_ids = list(
+            ShoppingList.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not list_ids:
+            break
+        items = list(
+            Item.objects.filter(shopping_list_id__in=list_ids)
+            .order_by("id")
+            .only("id", "shopping_list_id", "name")
+        )
+        seen = set()
+        for item in items:
+            key = normalize_item_name(item.name)
+            if (item.shopping_list_id, key) in seen:
+                key = f"{key}#{item.id}"
+            seen.add((item.shopping_list_id, key))
+            item.name_key = key
+        Item.objects.bulk_update(items, ["name_key"], batch_size=BATCH_SIZE)
+        last_id = list_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0008_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="name_key",
+            field=models.TextField(default="", editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_name_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="item",
+            constraint=models.UniqueConstraint(
+                fields=("shopping_list", "name_key"),
+                name="unique_item_name_key_per_list",
+            ),
+        ),
+    ]
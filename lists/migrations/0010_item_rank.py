@@ -0,0 +1,80 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def spread_ranks(count):
+    # frozen copy of lists.ranks.spread_ranks
+    width = 1
+    while len(DIGITS) ** width <= count:
+        width += 1
+    slots = len(DIGITS) ** width
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * slots // (count + 1)
+        digits = ""
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits = DIGITS[digit] + digits
+        ranks.append(digits.rstrip("0"))
+    return ranks
+
+
+def backfill_ranks(apps, schema_editor):
+    """
+    Rank each list's items in id order (the order clients sorted by),
+    BATCH_SIZE lists at a time.
+    """
+    ShoppingList = apps.get_model("lists", "ShoppingList")
+    Item = apps.get_model("lists", "Item")
+
+    last_id = 0
+    while True:
+        list_ids = list(
+            ShoppingList.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:BATCH_SIZE]
+        )
+        if not list_ids:
+            break
+        by_list = {}
+        for item in (
+            Item.objects.filter(shopping_list_id__in=list_ids)
+            .order_by("id")
+            .only("id", "shopping_list_id")
+        ):
+            by_list.setdefault(item.shopping_list_id, []).append(item)
+        items = []
+        for list_items in by_list.values():
+            for item, rank in zip(list_items, spread_ranks(len(list_items))):
+                item.rank = rank
+                items.append(item)
+        Item.objects.bulk_update(items, ["rank"], batch_size=BATCH_SIZE)
+        last_id = list_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0009_item_name_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="rank",
+            field=models.CharField(default="", editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                fields=["shopping_list", "rank", "id"], name="item_list_rank_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:28
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+TOKEN_LENGTH = 32
+_WORD = re.compile(r"[^\W_]+")
+_ACCENTS = re.compile("[\u0300-\u036f]")
+_FOLD = str.maketrans(
+    {"ø": "o", "đ": "d", "ð": "d", "ł": "l", "ħ": "h", "æ": "ae", "œ": "oe", "þ": "th"}
+)
+
+
+def normalize(text):
+    # frozen copy of lists.search.normalize
+    text = _ACCENTS.sub("", unicodedata.normalize("NFKD", text or ""))
+    text = unicodedata.normalize("NFC", text.casefold().translate(_FOLD))
+    return [word[:TOKEN_LENGTH] for word in _WORD.findall(text)]
+
+
+def user_tokens(user):
+    # frozen copy of lists.search.user_tokens
+    tokens = {}
+    local_part = (user.email or "").split("@")[0]
+    for field in (user.username, user.first_name, user.last_name, local_part):
+        for position, word in enumerate(normalize(field)):
+            rank = 0 if position == 0 else 1
+            if rank < tokens.get(word, 2):
+                tokens[word] = rank
+    return tokens
+
+
+def reindex_search_tokens(apps, schema_editor):
+    """
+    Re-tokenize every user, BATCH_SIZE at a time: names outside a-z used to
+    be dropped or split, e.g. "Влад" had no token and "Søren" was "s", "ren".
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserSearchToken = apps.get_model("lists", "UserSearchToken")
+
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("username", "first_name", "last_name", "email")[:BATCH_SIZE]
+        )
+        if not users:
+            break
+        UserSearchToken.objects.filter(user_id__in=[u.id for u in users]).delete()
+        UserSearchToken.objects.bulk_create(
+            [
+                UserSearchToken(user_id=user.id, token=token, rank=rank)
+                for user in users
+                for token, rank in user_tokens(user).items()
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        last_id = users[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0011_client_mutations"),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_search_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_list_ids(apps, schema_editor):
+    """
+    Find the list of each stored mutation from the item or invite it
+    recorded. Rows whose item or invite is gone can't be placed; they are
+    dropped, and a retry of one of them is applied again.
+    """
+    ClientMutation = apps.get_model("lists", "ClientMutation")
+    Item = apps.get_model("lists", "Item")
+    ListInvite = apps.get_model("lists", "ListInvite")
+
+    last_id = 0
+    while True:
+        rows = list(
+            ClientMutation.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "result")[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        item_lists = dict(
+            Item.objects.filter(
+                id__in=[r.result["item_id"] for r in rows if r.result.get("item_id")]
+            ).values_list("id", "shopping_list_id")
+        )
+        invite_lists = dict(
+            ListInvite.objects.filter(
+                id__in=[
+                    r.result["invite_id"] for r in rows if r.result.get("invite_id")
+                ]
+            ).values_list("id", "shopping_list_id")
+        )
+        placed, orphans = [], []
+        for row in rows:
+            list_id = item_lists.get(row.result.get("item_id")) or invite_lists.get(
+                row.result.get("invite_id")
+            )
+            if list_id is None:
+                orphans.append(row.id)
+            else:
+                row.shopping_list_id = list_id
+                placed.append(row)
+        ClientMutation.objects.bulk_update(placed, ["shopping_list_id"])
+        ClientMutation.objects.filter(id__in=orphans).delete()
+        last_id = rows[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0012_reindex_user_search"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="clientmutation",
+            name="unique_client_mutation",
+        ),
+        migrations.AddField(
+            model_name="clientmutation",
+            name="shopping_list_id",
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_list_ids, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="clientmutation",
+            index=models.Index(
+                fields=["created_at"], name="client_mutation_created_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="clientmutation",
+            constraint=models.UniqueConstraint(
+                fields=("user", "shopping_list_id", "client_id"),
+                name="unique_client_mutation",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 23:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lists", "0013_client_mutation_list"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="listinvite",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("accepted", "Accepted"),
+                    ("canceled", "Canceled"),
+                    ("declined", "Declined"),
+                ],
+                default="pending",
+                max_length=12,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="shoppinglist",
+            name="author",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="owned_lists",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
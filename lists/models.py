@@ -1,7 +1,14 @@
+import unicodedata
+
 from django.db import models
-from django.db.models.functions import Lower
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+
+
+def normalize_item_name(name):
+    """Item.name_key for a name: Unicode-normalized, trimmed and case-folded."""
+    return unicodedata.normalize("NFKC", name).strip().casefold()
 
 
 # Create your models here.
@@ -17,6 +24,30 @@ class ShoppingList(models.Model):
         settings.AUTH_USER_MODEL, related_name="shared_lists", blank=True
     )
     is_archived = models.BooleanField(default=False, db_index=True)
+    # bumped by every service that changes items or membership
+    version = models.PositiveBigIntegerField(default=0)
+    # denormalized counters, maintained by lists/services.py with F()
+    # expressions; `manage.py reconcile_list_counters` repairs drift
+    item_count = models.PositiveIntegerField(default=0)
+    need_count = models.PositiveIntegerField(default=0)
+    will_buy_count = models.PositiveIntegerField(default=0)
+    bought_count = models.PositiveIntegerField(default=0)
+    member_count = models.PositiveIntegerField(default=0)
+    # moved forward with every version bump, for the index pages
+    last_activity_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # backs the (-created_at, id) keyset used by cursor pagination
+            models.Index(fields=["-created_at", "id"], name="list_created_id_idx"),
+            # a user's own active lists, newest first; archived lists are
+            # rarely read, so they stay out of the index
+            models.Index(
+                fields=["author", "-created_at"],
+                condition=models.Q(is_archived=False),
+                name="list_author_active_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -25,6 +56,47 @@ class ShoppingList(models.Model):
         return reverse("lists:shoppinglist-detail", kwargs={"list_id": self.id})
 
 
+class ListMembership(models.Model):
+    """
+    One row per (user, list) the user can access, including the owner.
+
+    Denormalizes ShoppingList.author and shared_with so visibility is a
+    single index range scan instead of an OR across a join plus DISTINCT.
+    is_archived and created_at mirror the list. Kept in sync by
+    lists/services.py.
+    """
+
+    ROLE_CHOICES = [("owner", "Owner"), ("member", "Member")]
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="list_memberships",
+    )
+    shopping_list = models.ForeignKey(
+        ShoppingList, on_delete=models.CASCADE, related_name="memberships"
+    )
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, default="member")
+    is_archived = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "shopping_list"], name="unique_list_membership"
+            ),
+        ]
+        indexes = [
+            # covering: visibility queries never touch the table
+            models.Index(
+                fields=["user", "is_archived", "-created_at", "shopping_list"],
+                name="membership_user_visible_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.role} of {self.shopping_list}"
+
+
 class Item(models.Model):
     STATUS_CHOICES = [("need", "Need"), ("will_buy", "Will Buy"), ("bought", "Bought")]
     shopping_list = models.ForeignKey(
@@ -38,19 +110,103 @@ class Item(models.Model):
         null=True,
         related_name="items_added",
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # list version at the item's last change
+    version = models.PositiveBigIntegerField(default=0)
+    # normalize_item_name(name), so duplicate names are one index probe;
+    # set by save(), bulk inserts must fill it in themselves
+    name_key = models.TextField(editable=False)
+    # position in the list, see lists/ranks.py; maintained by the services
+    rank = models.CharField(max_length=64, default="", editable=False)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                Lower("name"),
-                "shopping_list",
-                name="unique_item_name_per_list_case_insensitive",
+                fields=["shopping_list", "name_key"],
+                name="unique_item_name_key_per_list",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["shopping_list", "version"], name="item_list_version_idx"
+            ),
+            # per-status lookups and the per-list status counts, index-only
+            models.Index(
+                fields=["shopping_list", "status"], name="item_list_status_idx"
+            ),
+            # a list's items in display order, and its neighbours for a move
+            models.Index(
+                fields=["shopping_list", "rank", "id"], name="item_list_rank_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_item_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_key"}
+        super().save(*args, **kwargs)
+
+
+class ItemTombstone(models.Model):
+    """Records a deleted item so delta sync can tell clients to drop it."""
+
+    shopping_list = models.ForeignKey(
+        ShoppingList, on_delete=models.CASCADE, related_name="tombstones"
+    )
+    item_id = models.BigIntegerField()
+    version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["shopping_list", "version"], name="tombstone_list_version_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Deleted item {self.item_id} (v{self.version})"
+
+
+class ClientMutation(models.Model):
+    """
+    An offline mutation already applied by sync, keyed by the list and the
+    id the client generated for it, so a retried upload is answered from
+    `result` instead of being applied twice. Kept for
+    CLIENT_MUTATION_RETENTION_DAYS, see `manage.py prune_client_mutations`.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="client_mutations",
+    )
+    # not a foreign key, so deleting a list doesn't cascade here; rows of
+    # deleted lists are pruned with the rest
+    shopping_list_id = models.BigIntegerField()
+    client_id = models.CharField(max_length=64)
+    # {"op", "ok"} plus "error", "conflict", "version", "item_id", "invite_id"
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "shopping_list_id", "client_id"],
+                name="unique_client_mutation",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="client_mutation_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.result['op']} {self.client_id}"
+
 
 class ListInvite(models.Model):
     inviter = models.ForeignKey(
@@ -88,3 +244,49 @@ class ListInvite(models.Model):
                 name="unique_pending_invite",
             ),
         ]
+        indexes = [
+            models.Index(fields=["-created_at", "id"], name="invite_created_id_idx"),
+            # received and sent invites by status, newest first (invites
+            # dashboard, /api/invites/)
+            models.Index(
+                fields=["invitee", "status", "-created_at"],
+                name="invite_invitee_status_idx",
+            ),
+            models.Index(
+                fields=["inviter", "status", "-created_at"],
+                name="invite_inviter_status_idx",
+            ),
+        ]
+
+
+class UserSearchToken(models.Model):
+    """
+    One normalized word from a user's username, names or email local part,
+    used by the invite typeahead (see lists/search.py).
+    rank 0 = the word starts its field, 1 = a later word.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="search_tokens",
+    )
+    token = models.CharField(max_length=32)
+    rank = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "token"], name="unique_user_search_token"
+            ),
+        ]
+        indexes = [
+            # prefix lookups are range scans on token, one rank at a time,
+            # already in result order
+            models.Index(
+                fields=["rank", "token", "user"], name="search_token_prefix_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.token} ({self.user_id})"
@@ -0,0 +1,33 @@
+# lists/pagination.py
+from rest_framework.pagination import CursorPagination
+
+from .permissions import MEMBERSHIP_ORDERING
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (-created_at, id).
+
+    Matches the ordering used by get_invites_user_can_view, so every page is an index range scan
+    instead of an OFFSET that grows with the page number.
+    """
+
+    ordering = ("-created_at", "id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class ItemCursorPagination(CreatedAtCursorPagination):
+    """Items have no created_at; the primary key gives the same stable order."""
+
+    ordering = ("id",)
+
+
+class ListCursorPagination(CreatedAtCursorPagination):
+    """
+    Keyset pagination over the user's memberships, whose created_at mirrors
+    the list's, in the order get_lists_user_can_view already returns.
+    """
+
+    ordering = MEMBERSHIP_ORDERING
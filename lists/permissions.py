@@ -1,30 +1,66 @@
-from django.db.models import Q
-from .models import ShoppingList, ListInvite
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Q
+from .models import ShoppingList, ListInvite, ListMembership
 from rest_framework import permissions
 
+# newest first, in the order of membership_user_visible_idx
+MEMBERSHIP_ORDERING = ("-membership_created_at", "memberships__shopping_list_id")
+
 
 def get_lists_user_can_view(user, include_archived: bool = False):
-    qs = ShoppingList.objects.filter(
-        Q(author_id=user.id) | Q(shared_with=user)
-    ).distinct()
+    # one range scan on the (user, is_archived, -created_at, shopping_list)
+    # membership index, already in result order; both conditions go in a
+    # single filter() so they share one join
+    membership = {"memberships__user_id": user.id}
     if not include_archived:
-        qs = qs.filter(is_archived=False)
-    # Nice for your index page (author, created_at)
-    return qs.select_related("author").order_by("-created_at", "id")
+        # "is_archived IN (false)": SQLite only uses the index column for an
+        # equality, and `= false` compiles to "NOT is_archived"
+        membership["memberships__is_archived__in"] = [False]
+    qs = ShoppingList.objects.filter(**membership)
+    # ordered by the membership's mirrored created_at, not the list's: only
+    # the index's own columns avoid sorting every visible list per page
+    return (
+        qs.select_related("author")
+        .annotate(membership_created_at=F("memberships__created_at"))
+        .order_by(*MEMBERSHIP_ORDERING)
+    )
+
+
+def get_list_summaries_user_can_view(user, include_archived: bool = False):
+    """
+    Visible lists with what the index pages show per list, still in one query.
+
+    Item, status and member counts and last_activity_at are columns kept
+    current by the services, so there is nothing to GROUP BY; only
+    remaining_count (not bought yet) is computed.
+    """
+    return get_lists_user_can_view(user, include_archived).annotate(
+        remaining_count=F("need_count") + F("will_buy_count")
+    )
 
 
 def user_can_access_list(user, shoppinglist):
+    """
+    Whether user owns or is shared on the list, asked of the primary (one
+    probe on the unique (user, shopping_list) membership index) so a removed
+    collaborator is refused at once in every process, whatever the replicas
+    have caught up on.
+    """
     # extra guard is harmless even with @login_required
     if not user.is_authenticated:
         return False
+    if shoppinglist.author_id == user.id:
+        return True
     return (
-        shoppinglist.author_id == user.id
-        or shoppinglist.shared_with.filter(id=user.id).exists()
+        ListMembership.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=user.id, shopping_list_id=shoppinglist.id)
+        .exists()
     )
 
 
 def get_invites_user_can_view(user, pending_only: bool = True):
-    invites = ListInvite.objects.filter(Q(inviter=user) | Q(invitee=user)).distinct()
+    # no joins that fan out, so no DISTINCT (and no sort to deduplicate)
+    invites = ListInvite.objects.filter(Q(inviter=user) | Q(invitee=user))
     if pending_only:
         invites = invites.filter(status="pending")
     return invites.select_related("shopping_list", "inviter", "invitee").order_by(
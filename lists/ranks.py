@@ -0,0 +1,74 @@
+"""
+Ordering keys for items (Item.rank).
+
+A rank is a string of base-36 digits read as a fraction after the point
+("i" is 0.5), so there is always another key between two keys and moving
+an item rewrites only its own rank. Digits and lowercase letters compare
+the same way in the C collation and in the usual locale collations, so
+ORDER BY rank needs no special collation.
+
+Keys never end in "0": "a" and "a0" are the same fraction, and nothing
+fits between them.
+"""
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# a move that produces a longer key schedules a rebalance of its list
+REBALANCE_LENGTH = 12
+
+
+def rank_between(lower, upper):
+    """
+    Return the shortest key strictly between lower and upper.
+
+    lower "" means the start of the list, upper None the end.
+    """
+    if upper is not None and upper <= lower:
+        raise ValueError(f"{lower!r} is not below {upper!r}")
+    if upper is not None:
+        # keep the common prefix, padding lower with zeros
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else "0") == upper[n]:
+            n += 1
+        if n:
+            return upper[:n] + rank_between(lower[n:], upper[n:])
+
+    low = DIGITS.index(lower[0]) if lower else 0
+    high = DIGITS.index(upper[0]) if upper is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    # adjacent first digits
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    return DIGITS[low] + rank_between(lower[1:], None)
+
+
+def rank_after(key):
+    """
+    Return a short key after key, for appending to the end of a list.
+
+    Bumps the first digit that can be bumped, so appending stays at one
+    digit per BASE - 1 items instead of halving the gap to the end.
+    """
+    for i, digit in enumerate(key):
+        if digit != DIGITS[-1]:
+            return key[:i] + DIGITS[DIGITS.index(digit) + 1]
+    return key + DIGITS[1]
+
+
+def spread_ranks(count):
+    """Return count increasing keys spaced evenly, as short as they can be."""
+    width = 1
+    while BASE**width <= count:
+        width += 1
+    slots = BASE**width
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * slots // (count + 1)
+        digits = ""
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits = DIGITS[digit] + digits
+        ranks.append(digits.rstrip("0"))
+    return ranks
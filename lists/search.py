@@ -0,0 +1,340 @@
+# lists/search.py
+"""
+User search for the invite typeahead.
+
+Every user is indexed as a handful of normalized words in UserSearchToken:
+username, first name, last name and the local part of the email are
+case-folded, stripped of accents and split on anything that is not a letter
+or digit, in any script. A query matches users that have a token starting
+with each of its words.
+
+"Every token starting with p" is the range [p, successor(p)), where the
+successor bumps the last character's code point, so each lookup is an
+index range scan, on SQLite and Postgres alike; nothing ever scans the user
+table.
+
+Typeahead traffic repeats the same short prefixes, so candidate lists are
+kept in a small per-process PrefixCache (see search_cache). Each keystroke
+extends the previous query, and a longer query can usually be answered by
+filtering a cached shorter one without touching the database.
+"""
+
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import ListMembership, UserSearchToken
+
+TOKEN_LENGTH = 32
+MIN_QUERY_LENGTH = 2
+SEARCH_FIELDS = {"username", "first_name", "last_name", "email"}
+# ranked users kept per query: enough that 10 remain after leaving out the
+# requester and a full list's 49 collaborators plus owner
+CANDIDATES = 64
+
+# letters and digits of any script; "_" separates words like punctuation
+_WORD = re.compile(r"[^\W_]+")
+# Latin accents (U+0300-U+036F), dropped after NFKD so "José" matches "jose"
+_ACCENTS = re.compile("[\u0300-\u036f]")
+# letters with a stroke or ligature have no decomposition to strip
+_FOLD = str.maketrans(
+    {"ø": "o", "đ": "d", "ð": "d", "ł": "l", "ħ": "h", "æ": "ae", "œ": "oe", "þ": "th"}
+)
+
+
+def normalize(text):
+    """
+    Split text into case-folded words without accents:
+    "José O'Neil" -> ["jose", "o", "neil"], "Søren" -> ["soren"],
+    "Влад" -> ["влад"].
+    """
+    text = _ACCENTS.sub("", unicodedata.normalize("NFKD", text or ""))
+    # recompose what NFKD split apart without being an accent, e.g. Hangul
+    text = unicodedata.normalize("NFC", text.casefold().translate(_FOLD))
+    return [word[:TOKEN_LENGTH] for word in _WORD.findall(text)]
+
+
+def user_tokens(user):
+    """Return {token: rank} for a user, keeping the best rank per token."""
+    tokens = {}
+    local_part = (user.email or "").split("@")[0]
+    for field in (user.username, user.first_name, user.last_name, local_part):
+        for position, word in enumerate(normalize(field)):
+            rank = 0 if position == 0 else 1
+            if rank < tokens.get(word, 2):
+                tokens[word] = rank
+    return tokens
+
+
+def index_users(users, batch_size=1000):
+    """Replace the search tokens of the given users."""
+    users = list(users)
+    rows = [
+        UserSearchToken(user_id=user.id, token=token, rank=rank)
+        for user in users
+        for token, rank in user_tokens(user).items()
+    ]
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user_id__in=[u.id for u in users]).delete()
+        UserSearchToken.objects.bulk_create(rows, batch_size=batch_size)
+        # clear now and after commit, so a racing search can't re-cache the
+        # old tokens
+        search_cache.clear()
+        transaction.on_commit(search_cache.clear)
+
+
+class PrefixCache:
+    """
+    Per-process LRU of search candidates keyed by normalized query.
+
+    - holds at most max_entries queries, each for ttl seconds
+    - concurrent misses for the same query wait for one lookup instead of
+      each running their own
+    - hits, misses, narrowed (answered from a shorter cached query) and
+      coalesced (waited on another request's lookup) are counted for
+      as_dict()
+    """
+
+    def __init__(self, max_entries=2048, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.narrowed = 0
+            self.coalesced = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            # lookups already in flight read the old index; don't store them
+            self._generation += 1
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached value for key or None, without touching stats."""
+        with self._lock:
+            return self._get(key)
+
+    def get_or_compute(self, key, compute, narrow=None):
+        """
+        Return the cached value for key, else narrow() if it returns
+        anything, else compute(); the result is cached either way.
+        """
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            waiting_on = self._inflight.get(key)
+            if waiting_on is not None:
+                self.coalesced += 1
+            else:
+                future = self._inflight[key] = Future()
+                generation = self._generation
+        if waiting_on is not None:
+            return waiting_on.result()
+
+        try:
+            value = narrow() if narrow is not None else None
+            counter = "narrowed"
+            if value is None:
+                value = compute()
+                counter = "misses"
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            del self._inflight[key]
+            if generation == self._generation:
+                self._set(key, value)
+        future.set_result(value)
+        return value
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.narrowed + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "narrowed": self.narrowed,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries),
+                # share of lookups answered without querying the index
+                "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0,
+            }
+
+
+search_cache = PrefixCache(
+    max_entries=getattr(settings, "USER_SEARCH_CACHE_SIZE", 2048),
+    ttl=getattr(settings, "USER_SEARCH_CACHE_TTL", 30),
+)
+
+
+def _prefix_filter(prefix):
+    """Lookups for tokens starting with prefix, as a half-open token range."""
+    # the smallest string above every string starting with prefix
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return {"token__gte": prefix}
+    return {"token__gte": prefix, "token__lt": stem[:-1] + chr(ord(stem[-1]) + 1)}
+
+
+def _split_terms(terms):
+    # the longest word is the most selective one, so it drives the scan;
+    # the others only have to match some token of the same user
+    lead, *rest = sorted(terms, key=len, reverse=True)
+    return lead, rest
+
+
+def _best_match(tokens, prefix):
+    """(rank, token) of the best token starting with prefix, or None."""
+    matches = [
+        (rank, token) for token, rank in tokens.items() if token.startswith(prefix)
+    ]
+    return min(matches) if matches else None
+
+
+def _query_candidates(terms):
+    """
+    Rank users matching terms from the token index.
+
+    Returns (complete, candidates): candidates is a tuple of (user_id,
+    tokens) in result order, with tokens ({token: rank}) loaded only when
+    complete, i.e. when every matching user is in the tuple.
+    """
+    lead, rest = _split_terms(terms)
+    matches = UserSearchToken.objects.filter(**_prefix_filter(lead))
+    for term in rest:
+        matches = matches.filter(
+            Exists(
+                UserSearchToken.objects.filter(
+                    user_id=OuterRef("user_id"), **_prefix_filter(term)
+                )
+            )
+        )
+
+    found = []
+    complete = True
+    # a user can match through several tokens, so over-fetch a little
+    fetch = CANDIDATES * 4
+    for rank in (0, 1):
+        rows = list(
+            matches.filter(rank=rank)
+            .order_by("token", "user_id")
+            .values_list("user_id", flat=True)[:fetch]
+        )
+        for user_id in rows:
+            if user_id not in found:
+                found.append(user_id)
+        if len(found) >= CANDIDATES or len(rows) == fetch:
+            complete = False
+            break
+
+    found = found[:CANDIDATES]
+    if not complete:
+        return False, tuple((user_id, None) for user_id in found)
+
+    tokens = {user_id: {} for user_id in found}
+    for user_id, token, rank in UserSearchToken.objects.filter(
+        user_id__in=found
+    ).values_list("user_id", "token", "rank"):
+        tokens[user_id][token] = rank
+    return True, tuple((user_id, tokens[user_id]) for user_id in found)
+
+
+def _narrow_candidates(query_key, terms):
+    """
+    Answer terms from a cached shorter query, or return None.
+
+    Typing only appends characters, so every user matching "john sm" also
+    matches "john s", "john" and "joh": each of those asks for fewer or
+    shorter word prefixes. When one of them is cached with its complete
+    match set, filtering it is exact.
+    """
+    for end in range(len(query_key) - 1, MIN_QUERY_LENGTH - 1, -1):
+        cached = search_cache.get(query_key[:end].rstrip())
+        if cached is None:
+            continue
+        complete, candidates = cached
+        if not complete:
+            return None
+        lead, rest = _split_terms(terms)
+        ranked = []
+        for user_id, tokens in candidates:
+            best = _best_match(tokens, lead)
+            if best is None or any(_best_match(tokens, t) is None for t in rest):
+                continue
+            ranked.append((best, user_id, tokens))
+        ranked.sort(key=lambda match: match[:2])
+        return True, tuple((user_id, tokens) for _, user_id, tokens in ranked)
+    return None
+
+
+def search_users(query, requester, shopping_list=None, limit=10):
+    """
+    Return up to `limit` users matching every word of `query`.
+
+    Users whose match starts a field (rank 0) come before matches on later
+    words; within a rank, results are ordered by the matched token. The
+    requester and, when shopping_list is given, its owner and collaborators
+    are left out.
+    """
+    terms = normalize(query)
+    if not terms or max(len(term) for term in terms) < MIN_QUERY_LENGTH:
+        return []
+
+    # candidates don't depend on who is asking, so one entry serves everyone
+    query_key = " ".join(terms)
+    _, candidates = search_cache.get_or_compute(
+        query_key,
+        lambda: _query_candidates(terms),
+        narrow=lambda: _narrow_candidates(query_key, terms),
+    )
+
+    excluded = {requester.id}
+    if shopping_list is not None:
+        excluded.update(
+            ListMembership.objects.filter(shopping_list=shopping_list).values_list(
+                "user_id", flat=True
+            )
+        )
+    found = [user_id for user_id, _ in candidates if user_id not in excluded][:limit]
+    users = User.objects.in_bulk(found)
+    return [users[user_id] for user_id in found if user_id in users]
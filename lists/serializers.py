@@ -1,8 +1,43 @@
 # lists/serializers.py
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import ShoppingList, Item, ListInvite
 
 
+def _split_param(value):
+    return {part.strip() for part in (value or "").split(",") if part.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Opt-in sparse fieldsets for read requests:
+    - ?fields=id,name returns only the named fields
+    - ?include=items adds expandable fields back on top of ?fields
+    With neither parameter the full representation is returned.
+    """
+
+    expandable_fields = ()
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Return the set of field names asked for, or None for every field."""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, "query_params", request.GET)
+        selected = _split_param(params.get("fields"))
+        if not selected:
+            return None
+        include = _split_param(params.get("include"))
+        return selected | (include & set(cls.expandable_fields))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.requested_fields(self.context.get("request"))
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+
 class ItemSerializer(serializers.ModelSerializer):
     shopping_list = serializers.PrimaryKeyRelatedField(
         queryset=ShoppingList.objects.all(),
@@ -11,8 +46,17 @@ class ItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Item
-        fields = ["id", "name", "status", "added_by"]
-        read_only_fields = ["id", "added_by"]
+        fields = [
+            "id",
+            "name",
+            "status",
+            "added_by",
+            "shopping_list",
+            "version",
+            "updated_at",
+            "rank",
+        ]
+        read_only_fields = ["id", "added_by", "version", "updated_at", "rank"]
 
     def create(self, validated_data):
         request = self.context.get("request")
@@ -21,7 +65,86 @@ class ItemSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+class BulkItemOperationSerializer(serializers.Serializer):
+    """One create, status change or delete inside a bulk item request."""
+
+    op = serializers.ChoiceField(choices=["create", "update", "delete"])
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=150, required=False)
+    status = serializers.ChoiceField(choices=Item.STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        op = attrs["op"]
+        if op == "create" and not attrs.get("name"):
+            raise serializers.ValidationError({"name": "Required to create an item."})
+        if op in ("update", "delete") and attrs.get("id") is None:
+            raise serializers.ValidationError({"id": f"Required to {op} an item."})
+        if op == "update" and "status" not in attrs:
+            raise serializers.ValidationError({"status": "Required to update an item."})
+        return attrs
+
+
+class MoveItemSerializer(serializers.Serializer):
+    # the item to follow; null moves the item to the top of the list
+    after = serializers.IntegerField(allow_null=True)
+
+
+class RemoveCollaboratorSerializer(serializers.Serializer):
+    # the collaborator to remove, or yourself to leave the list
+    user = serializers.IntegerField()
+
+
+class BulkItemSerializer(serializers.Serializer):
+    operations = BulkItemOperationSerializer(
+        many=True, allow_empty=False, max_length=200
+    )
+
+
+class ClientMutationSerializer(serializers.Serializer):
+    """One queued offline change inside a sync upload."""
+
+    client_id = serializers.CharField(max_length=64)
+    base_version = serializers.IntegerField(min_value=0)
+    op = serializers.ChoiceField(
+        choices=["create", "update", "move", "delete", "invite"]
+    )
+    id = serializers.IntegerField(required=False)
+    # client_id of the create that made the item, for items made offline
+    ref = serializers.CharField(max_length=64, required=False)
+    name = serializers.CharField(max_length=150, required=False)
+    status = serializers.ChoiceField(choices=Item.STATUS_CHOICES, required=False)
+    after = serializers.IntegerField(required=False, allow_null=True)
+    after_ref = serializers.CharField(max_length=64, required=False)
+    invitee = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        op = attrs["op"]
+        if op == "create" and not attrs.get("name"):
+            raise serializers.ValidationError({"name": "Required to create an item."})
+        if op in ("update", "move", "delete") and not (
+            attrs.get("id") is not None or attrs.get("ref")
+        ):
+            raise serializers.ValidationError({"id": f"Required to {op} an item."})
+        if op == "update" and not {"status", "name"} & set(attrs):
+            raise serializers.ValidationError({"status": "Required to update an item."})
+        if op == "invite" and attrs.get("invitee") is None:
+            raise serializers.ValidationError({"invitee": "Required to invite."})
+        return attrs
+
+
+class SyncSerializer(serializers.Serializer):
+    mutations = ClientMutationSerializer(many=True, allow_empty=False, max_length=200)
+
+    def validate_mutations(self, mutations):
+        client_ids = [mutation["client_id"] for mutation in mutations]
+        if len(set(client_ids)) != len(client_ids):
+            raise serializers.ValidationError("Each mutation needs its own client_id.")
+        return mutations
+
+
+class ShoppingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ("items",)
+
     items = ItemSerializer(many=True, read_only=True)
     author = serializers.ReadOnlyField(source="author.username")
 
@@ -32,9 +155,23 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             "name",
             "author",
             "created_at",
+            "item_count",
+            "need_count",
+            "will_buy_count",
+            "bought_count",
+            "member_count",
             "items",
         ]
-        read_only_fields = ["author", "created_at", "shared_with"]
+        read_only_fields = [
+            "author",
+            "created_at",
+            "shared_with",
+            "item_count",
+            "need_count",
+            "will_buy_count",
+            "bought_count",
+            "member_count",
+        ]
 
     def create(self, validated_data):
         request = self.context.get("request")
@@ -51,8 +188,15 @@ class InviteSerializer(serializers.ModelSerializer):
     class Meta:
         model = ListInvite
         fields = [
+            "id",
             "shopping_list",
             "invitee",
+            "inviter",
+            "invitee_username",
+            "inviter_username",
+            "status",
+            "created_at",
+            "accepted_at",
         ]
         read_only_fields = ["id", "inviter", "created_at", "status", "accepted_at"]
 
@@ -64,3 +208,13 @@ class InviteSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated:
             validated_data["inviter"] = request.user
         return super().create(validated_data)
+
+
+class BulkInviteSerializer(serializers.Serializer):
+    shopping_list = serializers.PrimaryKeyRelatedField(
+        queryset=ShoppingList.objects.all()
+    )
+    # a list never has room for more than 49 collaborators
+    invitees = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=49
+    )
@@ -1,5 +1,5 @@
 """
-Functions: send_invite(list, inviter, invitee), accept_invite(invite, actor), decline_invite(invite, actor), cancel_invite(invite, actor).
+Functions: send_invite(list, inviter, invitee), send_invites(list, inviter, invitee_ids), accept_invite(invite, actor), decline_invite(invite, actor), cancel_invite(invite, actor).
 
 Benefits:
 - reusable logic
@@ -15,19 +15,115 @@ What do we need services for?
 
 """
 
+from collections import Counter
+
 from django.db import transaction, IntegrityError
 from django.utils import timezone
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.shortcuts import get_object_or_404
-from .models import ListInvite, Item
-from django.db.models import Q
-
+from django.contrib.auth.models import User
+from .models import (
+    ClientMutation,
+    ListInvite,
+    ListMembership,
+    Item,
+    ItemTombstone,
+    ShoppingList,
+    normalize_item_name,
+)
+from .events import publish_on_commit, item_payload
+from .permissions import user_can_access_list
+from .ranks import REBALANCE_LENGTH, rank_after, rank_between, spread_ranks
+from django.db.models import Q, F, Exists, OuterRef
+from django.db.models.functions import Greatest
 
 # Optional: define domain-specific exceptions in lists/exceptions.py and import them here
 # class DuplicatePendingInvite(Exception): ...
 # class InvalidInviteTransition(Exception): ...
 
 
+def _bump_version(shopping_list, when=None, **deltas):
+    """
+    Increment shopping_list.version, move last_activity_at to now and
+    return the new version.
+
+    Counter deltas (e.g. item_count=1, need_count=-1) are applied with F()
+    expressions in the same UPDATE, and the fresh values are copied back
+    onto shopping_list. `when` is an optional Q the row must match, used for
+    capacity checks; if it doesn't match nothing is written and None is
+    returned.
+
+    Must run inside the caller's transaction so the version moves together
+    with the change it describes. The UPDATE locks the row until commit, so
+    concurrent writers get distinct, increasing versions.
+    """
+    updates = {"version": F("version") + 1, "last_activity_at": timezone.now()}
+    for field, delta in deltas.items():
+        if delta > 0:
+            updates[field] = F(field) + delta
+        elif delta < 0:
+            # clamp so drift (rows written outside the services) can't push
+            # a counter below zero; reconcile_list_counters repairs it
+            updates[field] = Greatest(F(field) + delta, 0)
+    rows = ShoppingList.objects.filter(pk=shopping_list.pk)
+    if when is not None:
+        rows = rows.filter(when)
+    if not rows.update(**updates):
+        return None
+    fresh = ShoppingList.objects.values(*updates).get(pk=shopping_list.pk)
+    for field, value in fresh.items():
+        setattr(shopping_list, field, value)
+    return shopping_list.version
+
+
+def _status_counter(status):
+    return f"{status}_count"
+
+
+def _locked_status(item):
+    """Lock item's row for the transaction; its current status, or None if gone."""
+    return (
+        Item.objects.select_for_update()
+        .filter(pk=item.pk)
+        .values_list("status", flat=True)
+        .first()
+    )
+
+
+def _invite_state(shopping_list_id, user_id):
+    """
+    Load a list with everything invite validation needs in one query:
+    - is_member: user_id is already in shared_with
+    - member_count: the denormalized counter column
+    """
+    shares = ShoppingList.shared_with.through.objects.filter(
+        shoppinglist_id=OuterRef("pk"), user_id=user_id
+    )
+    return ShoppingList.objects.annotate(is_member=Exists(shares)).get(
+        pk=shopping_list_id
+    )
+
+
+def _insert(model, **fields):
+    """
+    INSERT that lets database constraints do the checking. Inside an outer
+    transaction it runs in a savepoint, so an IntegrityError leaves the
+    transaction usable; in autocommit the single statement is atomic already.
+    """
+    if transaction.get_connection().in_atomic_block:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    return model.objects.create(**fields)
+
+
+def _invite_conflict_message(error):
+    """Map a ListInvite IntegrityError to the matching validation message."""
+    if "no_self_invites" in str(error):
+        return "Cannot invite yourself or an existing collaborator"
+    # unique_pending_invite is the table's only other constraint
+    return "Pending invite already exists for this user"
+
+
 def send_invite(shopping_list, inviter, invitee):
     """
     Send a pending invite for a shopping list.
@@ -45,6 +141,10 @@ def send_invite(shopping_list, inviter, invitee):
     Side effects:
     - Inserts a new ListInvite(status='pending') into the database
 
+    Membership, capacity and archive state are read in one annotated query.
+    Self-invites and duplicate pending invites are left to the
+    no_self_invites and unique_pending_invite constraints.
+
     Returns:
     - The created ListInvite instance
 
@@ -53,35 +153,129 @@ def send_invite(shopping_list, inviter, invitee):
     - ValidationError: if list is archived, self-invite attempted,
                     invitee already a collaborator, or a pending invite exists
     """
-    if inviter != shopping_list.author:
+    if inviter.id != shopping_list.author_id:
         raise PermissionDenied("Only the owner can invite")
-    if shopping_list.is_archived:
+
+    state = _invite_state(shopping_list.pk, invitee.id)
+    if state.is_archived:
         raise ValidationError("This Shopping List is not active.")
-    if invitee == inviter:  # self-invite check
-        raise ValidationError("Cannot invite yourself or an existing collaborator")
-    if shopping_list.shared_with.filter(id=invitee.id).exists():
+    if state.is_member:
         raise ValidationError("This user is already invited to this list.")
-    if shopping_list.shared_with.count() >= 49:
+    if state.member_count >= 49:
         raise ValidationError(
             "This shopping list is full. You cannot send this invite."
         )
 
-    if ListInvite.objects.filter(
-        shopping_list=shopping_list, invitee=invitee, status="pending"
-    ).exists():
-        raise ValidationError("Pending invite already exists for this user")
-
-    # create
-    invite = ListInvite.objects.create(
-        shopping_list=shopping_list,
-        inviter=inviter,
-        invitee=invitee,
-        status="pending",
-        created_at=timezone.now(),
-    )
+    # create; the constraints reject self-invites and duplicate pending invites
+    try:
+        invite = _insert(
+            ListInvite,
+            shopping_list=shopping_list,
+            inviter=inviter,
+            invitee=invitee,
+            status="pending",
+            created_at=timezone.now(),
+        )
+    except IntegrityError as e:
+        raise ValidationError(_invite_conflict_message(e))
     return invite
 
 
+def send_invites(shopping_list, inviter, invitee_ids):
+    """
+    Send pending invites to many users at once.
+
+    Same rules as send_invite, checked against one snapshot:
+    - one query loads the list's archive state and member_count
+    - one query loads the invitees, annotated with is_member / has_pending
+    - the 49-member cap counts every invite in this batch, so the first
+      (49 - member_count) valid invitees are invited and the rest are told
+      the list is full
+    - the new invites go in with a single bulk_create
+
+    Returns one result per distinct invitee id, in request order:
+    - {"invitee": id, "ok": True, "invite": ListInvite}
+    - {"invitee": id, "ok": False, "error": message}
+
+    Raises:
+    - PermissionDenied: if inviter is not the list owner
+    - ValidationError: if the list is archived
+    """
+    if inviter.id != shopping_list.author_id:
+        raise PermissionDenied("Only the owner can invite")
+
+    # drop repeats but keep the caller's order for the results
+    invitee_ids = list(dict.fromkeys(invitee_ids))
+
+    with transaction.atomic():
+        sl = ShoppingList.objects.only("is_archived", "member_count").get(
+            pk=shopping_list.pk
+        )
+        if sl.is_archived:
+            raise ValidationError("This Shopping List is not active.")
+
+        shares = ShoppingList.shared_with.through.objects.filter(
+            shoppinglist_id=sl.pk, user_id=OuterRef("pk")
+        )
+        pending = ListInvite.objects.filter(
+            shopping_list_id=sl.pk, invitee_id=OuterRef("pk"), status="pending"
+        )
+        invitees = {
+            user.id: user
+            for user in User.objects.filter(id__in=invitee_ids).annotate(
+                is_member=Exists(shares), has_pending=Exists(pending)
+            )
+        }
+
+        slots = max(49 - sl.member_count, 0)
+        results = []
+        to_create = []
+        for invitee_id in invitee_ids:
+            invitee = invitees.get(invitee_id)
+            if invitee is None:
+                error = "User not found."
+            elif invitee.id == inviter.id:
+                error = "Cannot invite yourself or an existing collaborator"
+            elif invitee.is_member:
+                error = "This user is already invited to this list."
+            elif invitee.has_pending:
+                error = "Pending invite already exists for this user"
+            elif len(to_create) >= slots:
+                error = "This shopping list is full. You cannot send this invite."
+            else:
+                invite = ListInvite(
+                    shopping_list=shopping_list,
+                    inviter=inviter,
+                    invitee=invitee,
+                    status="pending",
+                    created_at=timezone.now(),
+                )
+                to_create.append(invite)
+                results.append({"invitee": invitee_id, "ok": True, "invite": invite})
+                continue
+            results.append({"invitee": invitee_id, "ok": False, "error": error})
+
+        try:
+            with transaction.atomic():
+                ListInvite.objects.bulk_create(to_create)
+        except IntegrityError:
+            # a concurrent send_invite won the race for one of these users;
+            # retry row by row so only the conflicting invitees fail
+            for result in results:
+                if not result["ok"]:
+                    continue
+                invite = result["invite"]
+                try:
+                    with transaction.atomic():
+                        invite.save()
+                except IntegrityError as e:
+                    result.pop("invite")
+                    result["ok"] = False
+                    result["error"] = _invite_conflict_message(e)
+
+    return results
+
+
 def accept_invite(invite, actor):
     """
     Accept a pending invite.
@@ -93,38 +287,67 @@ def accept_invite(invite, actor):
 
     Side effects (atomic):
     - Sets invite.status='accepted', invite.accepted_at=now
-    - Adds actor to invite.shopping_list.shared_with
+    - Adds actor to invite.shopping_list.shared_with and ListMembership
     - Saves invite
+    - Bumps the list version
+
+    Membership, capacity and archive state are read in one annotated query;
+    the status flip is conditional on the row still being pending, and the
+    member_count increment is conditional on the list still having room.
 
     Raises:
     - PermissionDenied if actor != invitee
     - InvalidInviteTransition if status != 'pending'
     - ValidationError if list is archived or actor already a collaborator (edge)
     """
-    if actor != invite.invitee:
+    if actor.id != invite.invitee_id:
         raise PermissionDenied("You cannot accept this invite.")
     if invite.status != "pending":
         raise ValidationError("This invite cannot be accepted.")
 
-    sl = invite.shopping_list
+    sl = _invite_state(invite.shopping_list_id, actor.id)
+    invite.shopping_list = sl
 
     if sl.is_archived:
         raise ValidationError(
             "This invite cannot be accepted because the shopping list is archived."
         )
-    if sl.shared_with.filter(id=actor.id).exists():
+    if sl.is_member:
         raise ValidationError("You have already been added to this list.")
-    if sl.shared_with.count() >= 49:
+    if sl.member_count >= 49:
         raise ValidationError(
             "This shopping list is full. You cannot accept this invite."
         )
 
     with transaction.atomic():
+        accepted_at = timezone.now()
+        if not ListInvite.objects.filter(pk=invite.pk, status="pending").update(
+            status="accepted", accepted_at=accepted_at
+        ):
+            raise ValidationError("This invite cannot be accepted.")
+        invite.status = "accepted"
+        invite.accepted_at = accepted_at
+
+        version = _bump_version(sl, when=Q(member_count__lt=49), member_count=1)
+        if version is None:
+            raise ValidationError(
+                "This shopping list is full. You cannot accept this invite."
+            )
         sl.shared_with.add(actor)
+        ListMembership.objects.create(
+            user=actor,
+            shopping_list=sl,
+            role="member",
+            is_archived=sl.is_archived,
+            created_at=sl.created_at,
+        )
 
-        invite.status = "accepted"
-        invite.accepted_at = timezone.now()
-        invite.save(update_fields=["status", "accepted_at"])
+        publish_on_commit(
+            sl.id,
+            "member.joined",
+            version,
+            user={"id": actor.id, "username": actor.username},
+        )
 
     return invite
 
@@ -145,7 +368,7 @@ def decline_invite(invite, actor):
     - PermissionDenied if actor != invite.invitee
     - ValidationError if invite is not pending
     """
-    if actor != invite.invitee:
+    if actor.id != invite.invitee_id:
         raise PermissionDenied("You cannot respond to this invite.")
     if invite.status != "pending":
         raise ValidationError("This invite cannot be declined.")
@@ -172,7 +395,7 @@ def cancel_invite(invite, actor):
     - PermissionDenied if actor is not the list author
     - InvalidInviteTransition if status != 'pending'
     """
-    if actor != invite.shopping_list.author:
+    if actor.id != invite.shopping_list.author_id:
         raise PermissionDenied("You cannot cancel this invite.")
     if invite.status != "pending":
         raise ValidationError("This invite cannot be cancelled.")
@@ -185,6 +408,67 @@ def cancel_invite(invite, actor):
 
 
 # ----- List services ----------
+def create_list(author, name):
+    """
+    Create a shopping list owned by author, with its owner ListMembership row.
+    """
+    with transaction.atomic():
+        shopping_list = ShoppingList.objects.create(author=author, name=name)
+        ListMembership.objects.create(
+            user=author,
+            shopping_list=shopping_list,
+            role="owner",
+            created_at=shopping_list.created_at,
+        )
+    return shopping_list
+
+
+def delete_list(shopping_list, actor):
+    """
+    Delete a shopping list (owner action).
+
+    Raises:
+    - PermissionDenied if actor is not the list author
+    """
+    if actor != shopping_list.author:
+        raise PermissionDenied("You do not have permission to delete this list.")
+
+    with transaction.atomic():
+        shopping_list.delete()
+
+
+def remove_collaborator(shopping_list, actor, user):
+    """
+    Remove user from shopping_list.shared_with.
+
+    Preconditions:
+    - actor is the list author, or actor is user (leaving the list)
+    - user is currently a collaborator
+
+    Side effects (atomic):
+    - Removes user from shared_with and ListMembership and bumps the list
+      version
+
+    Raises:
+    - PermissionDenied if actor is neither the author nor user
+    - ValidationError if user is not a collaborator
+    """
+    if actor != shopping_list.author and actor != user:
+        raise PermissionDenied("Only the owner can remove collaborators.")
+    if not shopping_list.shared_with.filter(id=user.id).exists():
+        raise ValidationError("This user is not a collaborator on this list.")
+
+    with transaction.atomic():
+        shopping_list.shared_with.remove(user)
+        ListMembership.objects.filter(shopping_list=shopping_list, user=user).delete()
+        publish_on_commit(
+            shopping_list.id,
+            "member.left",
+            _bump_version(shopping_list, member_count=-1),
+            user={"id": user.id, "username": user.username},
+        )
+
+
 def archive_list(shopping_list, actor):
     """
     BusinessLogic: allows List Owner to archive list
@@ -197,57 +481,108 @@ def archive_list(shopping_list, actor):
     with transaction.atomic():
         shopping_list.is_archived = True
         shopping_list.save(update_fields=["is_archived"])
+        ListMembership.objects.filter(shopping_list=shopping_list).update(
+            is_archived=True
+        )
+        publish_on_commit(
+            shopping_list.id, "list.archived", _bump_version(shopping_list)
+        )
+
+    return shopping_list
+
+
+def rename_list(shopping_list, actor, name):
+    """
+    Rename a list the actor owns or is shared on.
+
+    Bumps the list version like any other change, so list pages revalidate
+    (their ETag is built from the version) and /changes/ reports the new
+    name under a new version. Publishes list.renamed.
+    """
+    if not user_can_access_list(actor, shopping_list):
+        raise PermissionDenied("You cannot rename this list.")
+    if shopping_list.is_archived:
+        raise ValidationError("This Shopping List is not active.")
+    if name == shopping_list.name:
+        return shopping_list
 
+    with transaction.atomic():
+        shopping_list.name = name
+        shopping_list.save(update_fields=["name"])
+        publish_on_commit(
+            shopping_list.id, "list.renamed", _bump_version(shopping_list), name=name
+        )
     return shopping_list
 
 
 # ------ item services ------
 
+DUPLICATE_ITEM_MESSAGE = "This item has already been added to the Shopping List."
+
 
-def add_item(shopping_list, actor, name):
+def add_item(shopping_list, actor, name, status="need"):
     """
     allows actor to add item to shopping list
     - list must be active
     - item cannot already be on list
+    - bumps the list version and stamps it on the new item
     """
     # Permission check
-    if (
-        actor != shopping_list.author
-        and not shopping_list.shared_with.filter(id=actor.id).exists()
-    ):
+    if not user_can_access_list(actor, shopping_list):
         raise PermissionDenied("You are not allowed to add items to this list.")
     # List must be active
     if shopping_list.is_archived:
         raise ValidationError("This Shopping List is not active.")
-    # No duplicates
-    if shopping_list.items.filter(name__iexact=name).exists():
-        raise ValidationError("This item has already been added to the Shopping List.")
 
-    # max item count
-    if shopping_list.items.count() > 99:
-        raise ValidationError("List cannot have more than 99 items.")
     with transaction.atomic():
-        new_item = Item.objects.create(
-            shopping_list=shopping_list,
-            name=name,
-            status="need",
-            added_by=actor,
+        # max item count, enforced by the same UPDATE that bumps the counters
+        version = _bump_version(
+            shopping_list,
+            when=Q(item_count__lte=99),
+            item_count=1,
+            **{_status_counter(status): 1},
+        )
+        if version is None:
+            raise ValidationError("List cannot have more than 99 items.")
+        # new items go last; the bump above serializes concurrent adds
+        last_rank = (
+            shopping_list.items.order_by("-rank").values_list("rank", flat=True).first()
+        )
+        # no duplicates: unique_item_name_key_per_list does the checking,
+        # and raising undoes the version bump
+        try:
+            new_item = _insert(
+                Item,
+                shopping_list=shopping_list,
+                name=name,
+                status=status,
+                added_by=actor,
+                version=version,
+                rank=rank_after(last_rank or ""),
+            )
+        except IntegrityError:
+            raise ValidationError(DUPLICATE_ITEM_MESSAGE)
+        publish_on_commit(
+            shopping_list.id,
+            "item.added",
+            new_item.version,
+            item=item_payload(new_item),
         )
 
     return new_item
 
 
 def update_item(item, actor, **changes):
-    """ """
-    if (
-        actor != item.shopping_list.author
-        and not item.shopping_list.shared_with.filter(id=actor.id).exists()
-    ):
+    """
+    Apply status and/or name changes to an item.
+    - any member can change status, only item.added_by can rename
+    - bumps the list version and stamps it on the item
+    """
+    if not user_can_access_list(actor, item.shopping_list):
         raise PermissionDenied("You cannot update this item.")
 
     changed_fields = []
     if "status" in changes:
-        item.status = changes["status"]
         changed_fields.append("status")
     if "name" in changes:
         if actor != item.added_by:
@@ -257,7 +592,27 @@ def update_item(item, actor, **changes):
     if not changed_fields:
         return item
     with transaction.atomic():
-        item.save(update_fields=changed_fields)
+        counters = {}
+        if "status" in changes:
+            # the counters move from the status as of this lock, not as
+            # `item` was read: a concurrent update may have committed since
+            current = _locked_status(item)
+            if current is None:
+                raise ValidationError("This item has been deleted.")
+            if changes["status"] != current:
+                counters[_status_counter(current)] = -1
+                counters[_status_counter(changes["status"])] = 1
+            item.status = changes["status"]
+        item.version = _bump_version(item.shopping_list, **counters)
+        try:
+            # a rename can collide with another item's name_key
+            with transaction.atomic():
+                item.save(update_fields=changed_fields + ["version", "updated_at"])
+        except IntegrityError:
+            raise ValidationError(DUPLICATE_ITEM_MESSAGE)
+        publish_on_commit(
+            item.shopping_list_id, "item.updated", item.version, item=item_payload(item)
+        )
     return item
 
 
@@ -267,20 +622,477 @@ def delete_item(actor, item):
     Preconditions:
     - actor == item.added_by or ==list.author
     - list not archived
+
+    Side effects (atomic):
+    - Deletes the item and leaves an ItemTombstone at the new list version
     """
     if actor != item.added_by and actor != item.shopping_list.author:
         raise PermissionDenied("You cannot delete this item.")
     if item.shopping_list.is_archived:
         raise ValidationError("Cannot delete items from an archived list.")
-    item.delete()
+    item_id = item.id  # delete() clears it
+    with transaction.atomic():
+        status = _locked_status(item)
+        deleted, _ = item.delete()
+        if not deleted:
+            # a concurrent delete already moved the counters and left the
+            # tombstone
+            return
+        tombstone = ItemTombstone.objects.create(
+            shopping_list=item.shopping_list,
+            item_id=item_id,
+            version=_bump_version(
+                item.shopping_list,
+                item_count=-1,
+                **{_status_counter(status): -1},
+            ),
+        )
+        publish_on_commit(
+            tombstone.shopping_list_id,
+            "item.deleted",
+            tombstone.version,
+            item={"id": tombstone.item_id},
+        )
     return
 
 
+def _neighbour_ranks(item, after):
+    """Ranks of the items item will sit between: after and the one following it."""
+    others = item.shopping_list.items.exclude(pk=item.pk).order_by("rank", "id")
+    if after is None:
+        return "", others.values_list("rank", flat=True).first()
+    lower = Item.objects.values_list("rank", flat=True).get(pk=after.pk)
+    upper = (
+        others.filter(Q(rank__gt=lower) | Q(rank=lower, id__gt=after.pk))
+        .values_list("rank", flat=True)
+        .first()
+    )
+    return lower, upper
+
+
+def move_item(item, actor, after=None):
+    """
+    Move item to just after `after` (another item on its list), or to the
+    top of the list when after is None.
+
+    Only the moved item is written: its new rank is a key between its new
+    neighbours' (lists/ranks.py). If that key gets longer than
+    REBALANCE_LENGTH, the list's ranks are respaced once this transaction
+    commits.
+
+    Raises:
+    - PermissionDenied: if actor is not the owner or a collaborator
+    - ValidationError: if the list is archived or after is on another list
+    """
+    shopping_list = item.shopping_list
+    if not user_can_access_list(actor, shopping_list):
+        raise PermissionDenied("You cannot move this item.")
+    if shopping_list.is_archived:
+        raise ValidationError("This Shopping List is not active.")
+    if after is not None and after.shopping_list_id != shopping_list.id:
+        raise ValidationError("This item is not on the Shopping List.")
+    if after is not None and after.pk == item.pk:
+        raise ValidationError("An item cannot be moved after itself.")
+
+    with transaction.atomic():
+        # locks the list row: concurrent moves can't pick the same gap
+        item.version = _bump_version(shopping_list)
+        lower, upper = _neighbour_ranks(item, after)
+        if upper is not None and upper <= lower:
+            # tied ranks (rows written outside the services): respace first
+            _rebalance_ranks(shopping_list, item.version)
+            lower, upper = _neighbour_ranks(item, after)
+        item.rank = rank_between(lower, upper)
+        item.save(update_fields=["rank", "version", "updated_at"])
+        if len(item.rank) > REBALANCE_LENGTH:
+            transaction.on_commit(lambda: rebalance_item_ranks(shopping_list.id))
+        publish_on_commit(
+            shopping_list.id, "item.updated", item.version, item=item_payload(item)
+        )
+    return item
+
+
+def _rebalance_ranks(shopping_list, version):
+    items = list(shopping_list.items.select_for_update().order_by("rank", "id"))
+    for item, rank in zip(items, spread_ranks(len(items))):
+        item.rank = rank
+        item.version = version
+    Item.objects.bulk_update(items, ["rank", "version"])
+    return items
+
+
+def rebalance_item_ranks(shopping_list_id):
+    """
+    Respace a list's item ranks evenly, keeping their order, so keys are
+    short again. Bumps the list version and publishes every item.
+    """
+    with transaction.atomic():
+        shopping_list = ShoppingList.objects.filter(pk=shopping_list_id).first()
+        if shopping_list is None:
+            return  # deleted before the rebalance ran
+        version = _bump_version(shopping_list)
+        for item in _rebalance_ranks(shopping_list, version):
+            publish_on_commit(
+                shopping_list.id, "item.updated", version, item=item_payload(item)
+            )
+
+
+def apply_item_operations(shopping_list, actor, operations):
+    """
+    Apply a batch of item creates, status changes and deletes in one transaction.
+
+    Each operation is a dict:
+    - {"op": "create", "name": ..., "status": ...} (status defaults to "need")
+    - {"op": "update", "id": ..., "status": ...}
+    - {"op": "delete", "id": ...}
+
+    Permission and archive state are checked once for the whole batch.
+    Duplicates, the item cap and per-item delete rights are checked against
+    an in-memory snapshot of the list, so a failing operation is reported
+    without stopping the others. Writes go out as one delete, one
+    bulk_update and one bulk_create, all stamped with a single version bump.
+
+    Returns:
+    - A list of results in operation order:
+      {"op", "ok", "item"} on success, {"op", "ok", "id", "error"} on failure
+
+    Raises:
+    - PermissionDenied: if actor is not the owner or a collaborator
+    - ValidationError: if the list is archived
+    """
+    if not user_can_access_list(actor, shopping_list):
+        raise PermissionDenied("You are not allowed to add items to this list.")
+    if shopping_list.is_archived:
+        raise ValidationError("This Shopping List is not active.")
+
+    results = []
+    to_create = []
+    to_update = {}
+    to_delete = set()
+
+    def fail(op, message):
+        results.append(
+            {"op": op["op"], "ok": False, "id": op.get("id"), "error": message}
+        )
+
+    with transaction.atomic():
+        items = {item.id: item for item in shopping_list.items.select_for_update()}
+        original_status = {item_id: item.status for item_id, item in items.items()}
+        # name_key -> item id (None for items created in this batch)
+        names = {item.name_key: item.id for item in items.values()}
+
+        for op in operations:
+            kind = op["op"]
+            if kind == "create":
+                name = op["name"]
+                name_key = normalize_item_name(name)
+                if name_key in names:
+                    fail(op, DUPLICATE_ITEM_MESSAGE)
+                    continue
+                if len(names) > 99:
+                    fail(op, "List cannot have more than 99 items.")
+                    continue
+                item = Item(
+                    shopping_list=shopping_list,
+                    name=name,
+                    name_key=name_key,
+                    status=op.get("status", "need"),
+                    added_by=actor,
+                )
+                names[name_key] = None
+                to_create.append(item)
+                results.append({"op": kind, "ok": True, "item": item})
+                continue
+
+            item = items.get(op["id"])
+            if item is None or item.id in to_delete:
+                fail(op, "This item is not on the Shopping List.")
+                continue
+
+            if kind == "update":
+                item.status = op["status"]
+                to_update[item.id] = item
+                results.append({"op": kind, "ok": True, "item": item})
+            elif kind == "delete":
+                if actor.id != item.added_by_id and actor != shopping_list.author:
+                    fail(op, "You cannot delete this item.")
+                    continue
+                to_delete.add(item.id)
+                to_update.pop(item.id, None)
+                names.pop(item.name_key, None)
+                results.append({"op": kind, "ok": True, "id": item.id, "item": None})
+
+        if not (to_delete or to_update or to_create):
+            return results
+
+        counters = Counter(item_count=len(to_create) - len(to_delete))
+        for item in to_create:
+            counters[_status_counter(item.status)] += 1
+        for item_id in to_delete:
+            counters[_status_counter(original_status[item_id])] -= 1
+        for item in to_update.values():
+            counters[_status_counter(original_status[item.id])] -= 1
+            counters[_status_counter(item.status)] += 1
+        version = _bump_version(shopping_list, **counters)
+        now = timezone.now()
+
+        # deletes first so a name freed in this batch can be re-created
+        if to_delete:
+            ItemTombstone.objects.bulk_create(
+                ItemTombstone(
+                    shopping_list=shopping_list, item_id=item_id, version=version
+                )
+                for item_id in to_delete
+            )
+            Item.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            for item in to_update.values():
+                item.version = version
+                item.updated_at = now
+            Item.objects.bulk_update(
+                to_update.values(), ["status", "version", "updated_at"]
+            )
+        if to_create:
+            # appended in operation order after the last surviving item
+            rank = max(
+                (item.rank for item in items.values() if item.id not in to_delete),
+                default="",
+            )
+            for item in to_create:
+                rank = rank_after(rank)
+                item.rank = rank
+                item.version = version
+            Item.objects.bulk_create(to_create)
+
+        for item_id in to_delete:
+            publish_on_commit(
+                shopping_list.id, "item.deleted", version, item={"id": item_id}
+            )
+        for item in to_update.values():
+            publish_on_commit(
+                shopping_list.id, "item.updated", version, item=item_payload(item)
+            )
+        for item in to_create:
+            publish_on_commit(
+                shopping_list.id, "item.added", version, item=item_payload(item)
+            )
+
+    return results
+
+
+def apply_client_mutations(shopping_list, actor, mutations):
+    """
+    Replay a client's offline mutation log on one list, in order, in one
+    transaction.
+
+    Each mutation is a dict with a client-generated "client_id", the list
+    "base_version" the client had synced when it made the change, and:
+    - {"op": "create", "name": ..., "status": ...}
+    - {"op": "update", "id": ..., "status": ..., "name": ...}
+    - {"op": "move", "id": ..., "after": ...}
+    - {"op": "delete", "id": ...}
+    - {"op": "invite", "invitee": <user id>}
+    Items created offline have no id yet: "ref" (and "after_ref") name them
+    by the client_id of their create instead.
+
+    Every change goes through the item and invite services above. An
+    update, move or delete of an item someone else changed after
+    base_version is not applied and comes back as a conflict, as does a
+    create whose name another member added meanwhile. Outcomes are saved
+    as ClientMutations per list, so a retried upload replays the saved
+    results instead of applying anything twice.
+
+    Returns:
+    - A list of results in mutation order: {"client_id", "op", "ok"}, plus
+      "error" and "conflict" when not applied, "replayed" when answered
+      from an earlier upload, and the item ("item", None once deleted) or
+      "invite" the mutation is about, in its state after the whole log
+
+    Raises:
+    - PermissionDenied: if actor is not the owner or a collaborator
+    - ValidationError: if the list is archived
+    """
+    if not user_can_access_list(actor, shopping_list):
+        raise PermissionDenied("You are not allowed to change this list.")
+    if shopping_list.is_archived:
+        raise ValidationError("This Shopping List is not active.")
+
+    results = []
+    log = []
+
+    with transaction.atomic():
+        # locked up front: a concurrent retry of the same log waits here,
+        # then finds this one's ClientMutations
+        items = {item.id: item for item in shopping_list.items.select_for_update()}
+        client_ids = set()
+        for mutation in mutations:
+            client_ids.add(mutation["client_id"])
+            client_ids.update(
+                mutation[field] for field in ("ref", "after_ref") if mutation.get(field)
+            )
+        done = {
+            m.client_id: m.result
+            for m in ClientMutation.objects.filter(
+                user=actor, shopping_list_id=shopping_list.id, client_id__in=client_ids
+            )
+        }
+        # client_id of a create -> id of its item
+        refs = {
+            client_id: result["item_id"]
+            for client_id, result in done.items()
+            if result["op"] == "create" and result.get("item_id")
+        }
+        # versions written by this log (or its earlier uploads): not conflicts
+        ours = {result["version"] for result in done.values() if "version" in result}
+
+        def find(mutation, id_field, ref_field):
+            if mutation.get(ref_field):
+                return items.get(refs.get(mutation[ref_field]))
+            return items.get(mutation.get(id_field))
+
+        def apply(mutation, result):
+            kind = mutation["op"]
+            if kind == "invite":
+                invitee = User.objects.filter(pk=mutation["invitee"]).first()
+                if invitee is None:
+                    raise ValidationError("User not found.")
+                result["invite_id"] = send_invite(shopping_list, actor, invitee).id
+                return
+            if kind == "create":
+                try:
+                    item = add_item(
+                        shopping_list,
+                        actor,
+                        mutation["name"],
+                        mutation.get("status", "need"),
+                    )
+                except ValidationError as e:
+                    if e.messages != [DUPLICATE_ITEM_MESSAGE]:
+                        raise
+                    # added by someone else while offline: point at theirs
+                    item = shopping_list.items.filter(
+                        name_key=normalize_item_name(mutation["name"])
+                    ).first()
+                    result.update(conflict=True, error=DUPLICATE_ITEM_MESSAGE)
+                else:
+                    ours.add(item.version)
+                    result["version"] = item.version
+                if item is not None:
+                    items[item.id] = item
+                    refs[mutation["client_id"]] = item.id
+                    result["item_id"] = item.id
+                return
+
+            item = find(mutation, "id", "ref")
+            result["item_id"] = item.id if item else mutation.get("id")
+            if item is None:
+                if kind != "delete":  # deleting it again is a no-op
+                    result.update(conflict=True, error="This item has been deleted.")
+                return
+            if item.version > mutation["base_version"] and item.version not in ours:
+                result.update(
+                    conflict=True, error="This item was changed by someone else."
+                )
+                return
+            try:
+                if kind == "update":
+                    fields = ("status", "name")
+                    update_item(
+                        item, actor, **{f: mutation[f] for f in fields if f in mutation}
+                    )
+                elif kind == "move":
+                    after = None
+                    if mutation.get("after_ref") or mutation.get("after") is not None:
+                        after = find(mutation, "after", "after_ref")
+                        if after is None:
+                            result.update(
+                                conflict=True,
+                                error="The item to move after has been deleted.",
+                            )
+                            return
+                    move_item(item, actor, after)
+                else:
+                    item_id = item.id  # delete_item clears it
+                    delete_item(actor, item)
+                    del items[item_id]
+                    return
+            except (ValidationError, PermissionDenied):
+                # the services change the instance before they can fail
+                item.refresh_from_db()
+                raise
+            ours.add(item.version)
+            result["version"] = item.version
+
+        for mutation in mutations:
+            client_id = mutation["client_id"]
+            if client_id in done:
+                results.append({"client_id": client_id, **done[client_id]})
+                results[-1]["replayed"] = True
+                continue
+            result = {"op": mutation["op"], "ok": False}
+            try:
+                apply(mutation, result)
+                result["ok"] = not result.get("conflict")
+            except (ValidationError, PermissionDenied) as e:
+                result["error"] = " ".join(getattr(e, "messages", None) or [str(e)])
+            log.append(
+                ClientMutation(
+                    user=actor,
+                    shopping_list_id=shopping_list.id,
+                    client_id=client_id,
+                    result=dict(result),
+                )
+            )
+            results.append({"client_id": client_id, **result})
+
+        try:
+            with transaction.atomic():
+                ClientMutation.objects.bulk_create(log)
+        except IntegrityError:
+            # a concurrent upload got there first; undo and let the retry replay
+            raise ValidationError("These mutations are already being applied.")
+
+        invites = ListInvite.objects.in_bulk(
+            [r["invite_id"] for r in results if r.get("invite_id")]
+        )
+    # failed mutations roll back their version bumps, but not the copies
+    # _bump_version left on shopping_list
+    shopping_list.refresh_from_db()
+
+    for result in results:
+        result.pop("version", None)
+        if "item_id" in result:
+            result["item"] = items.get(result.pop("item_id"))
+        if "invite_id" in result:
+            result["invite"] = invites.get(result.pop("invite_id"))
+    return results
+
+
+def get_changes_since(shopping_list, since):
+    """
+    Return what changed on a list after version `since`.
+
+    Returns:
+    - (items, deleted_ids): items stamped with a newer version, and ids of
+      items deleted since then. With since=0 every item is returned and no
+      tombstones are read.
+    """
+    items = shopping_list.items.filter(version__gt=since).order_by("version", "id")
+    if since <= 0:
+        return items, []
+    deleted_ids = list(
+        shopping_list.tombstones.filter(version__gt=since)
+        .order_by("version")
+        .values_list("item_id", flat=True)
+    )
+    return items, deleted_ids
+
+
 def get_item_user_can_edit(user, item_id):
     """Return item user is allowed to edit or return 404"""
     return get_object_or_404(
         Item.objects.select_related("shopping_list").filter(
-            Q(shopping_list__author=user) | Q(shopping_list__shared_with=user)
+            shopping_list__memberships__user=user
         ),
         id=item_id,
     )
@@ -0,0 +1,15 @@
+# lists/signals.py
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .search import SEARCH_FIELDS, index_users
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_user_for_search(sender, instance, update_fields=None, **kwargs):
+    """Keep a user's search tokens in step with their names and email."""
+    # e.g. login only saves last_login
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    index_users([instance])
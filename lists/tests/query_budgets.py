@@ -0,0 +1,68 @@
+"""
+Query budgets: the most SQL statements each endpoint may run per request.
+
+tests_query_budgets.py requests every route at several data sizes and
+fails when an endpoint exceeds its budget here or when its query count
+changes with the amount of data. Every route in lists/urls.py and every
+viewset action in shoppinglist/urls.py must have an entry, so a new
+endpoint can't land without one.
+
+Counts are for a logged-in user with cold caches and include the session
+and user lookups (2 queries) every authenticated request starts with;
+savepoints are not counted. Raising a budget should come with a reason
+in the review.
+"""
+
+QUERY_BUDGETS = {
+    # lists/urls.py: (URL name, method)
+    ("lists:shoppinglist-index", "GET"): 3,
+    ("lists:create-list", "GET"): 2,
+    ("lists:create-list", "POST"): 4,
+    ("lists:shoppinglist-detail", "GET"): 4,
+    ("lists:add-item", "GET"): 4,
+    ("lists:add-item", "POST"): 8,
+    ("lists:list-events", "GET"): 3,
+    ("lists:edit-item", "GET"): 3,
+    ("lists:edit-item", "POST"): 7,
+    ("lists:shoppinglist-modern", "GET"): 3,
+    ("lists:invites-dashboard", "GET"): 4,
+    ("lists:search-users", "GET"): 7,
+    ("lists:cache-stats", "GET"): 2,
+    ("lists:delete-list", "GET"): 4,
+    ("lists:delete-list", "POST"): 10,
+    ("lists:delete-item", "POST"): 10,
+    ("lists:send-invite", "GET"): 3,
+    ("lists:send-invite", "POST"): 6,
+    ("lists:accept-invite", "POST"): 9,
+    ("lists:cancel-invite", "POST"): 5,
+    ("lists:decline-invite", "POST"): 5,
+    ("lists:invite-detail", "GET"): 6,
+    ("lists:select-invitee", "POST"): 3,
+    # shoppinglist/urls.py router: (URL name, method)
+    ("api-root", "GET"): 2,
+    ("shoppinglist-list", "GET"): 4,
+    ("shoppinglist-list", "POST"): 5,
+    ("shoppinglist-detail", "GET"): 4,
+    ("shoppinglist-detail", "PUT"): 7,
+    ("shoppinglist-detail", "PATCH"): 7,
+    ("shoppinglist-detail", "DELETE"): 9,
+    ("shoppinglist-archive", "POST"): 8,
+    ("shoppinglist-remove-collaborator", "POST"): 9,
+    ("shoppinglist-bulk-items", "POST"): 10,
+    ("shoppinglist-changes", "GET"): 4,
+    ("shoppinglist-sync", "POST"): 20,
+    ("item-list", "GET"): 3,
+    ("item-list", "POST"): 7,
+    ("item-detail", "GET"): 3,
+    ("item-detail", "PUT"): 10,
+    ("item-detail", "PATCH"): 8,
+    ("item-detail", "DELETE"): 9,
+    ("item-move", "POST"): 9,
+    ("invite-list", "GET"): 3,
+    ("invite-list", "POST"): 7,
+    ("invite-detail", "GET"): 3,
+    ("invite-detail", "PUT"): 6,
+    ("invite-detail", "PATCH"): 4,
+    ("invite-detail", "DELETE"): 4,
+    ("invite-bulk", "POST"): 6,
+}
@@ -0,0 +1,420 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from lists.models import ShoppingList, ListInvite, ListMembership, Item
+from lists import services
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_shoppinglists_are_paginated_by_cursor(self):
+        for i in range(5):
+            services.create_list(self.owner, f"List {i}")
+
+        response = self.client.get("/api/shoppinglists/", {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        seen = [row["id"] for row in response.data["results"]]
+        next_url = response.data["next"]
+        while next_url:
+            response = self.client.get(next_url)
+            seen += [row["id"] for row in response.data["results"]]
+            next_url = response.data["next"]
+
+        expected = list(
+            ShoppingList.objects.order_by("-created_at", "id").values_list(
+                "id", flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+
+    def test_shoppinglist_pages_follow_the_membership_index(self):
+        friend = User.objects.create_user(username="bob")
+        for i in range(3):
+            services.create_list(self.owner, f"List {i}")
+        shared = services.create_list(friend, "Shared")
+        invite = services.send_invite(shared, friend, self.owner)
+        services.accept_invite(invite, self.owner)
+        # lists created in the same instant are still paged without gaps
+        same_instant = ShoppingList.objects.first().created_at
+        ShoppingList.objects.update(created_at=same_instant)
+        ListMembership.objects.update(created_at=same_instant)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/shoppinglists/", {"page_size": 2})
+        page_sql = next(q["sql"] for q in ctx if "membership_created_at" in q["sql"])
+        seen = [row["id"] for row in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        seen += [row["id"] for row in response.data["results"]]
+        self.assertEqual(
+            seen, sorted(ShoppingList.objects.values_list("id", flat=True))
+        )
+
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {page_sql}")
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+            self.assertIn("membership_user_visible_idx", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_invites_include_sent_and_received(self):
+        friend = User.objects.create_user(username="bob")
+        sl = ShoppingList.objects.create(author=self.owner, name="Groceries")
+        other = ShoppingList.objects.create(author=friend, name="Hardware")
+        ListInvite.objects.create(shopping_list=sl, inviter=self.owner, invitee=friend)
+        ListInvite.objects.create(
+            shopping_list=other, inviter=friend, invitee=self.owner, status="declined"
+        )
+
+        response = self.client.get("/api/invites/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 2)
+
+
+class ShoppingListQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def _create_lists(self, count):
+        for i in range(count):
+            sl = services.create_list(
+                self.owner, f"List {ShoppingList.objects.count()}"
+            )
+            Item.objects.create(shopping_list=sl, name="Milk", added_by=self.owner)
+            Item.objects.create(shopping_list=sl, name="Eggs", added_by=self.owner)
+
+    def _count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/shoppinglists/", params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_query_count_is_flat_as_lists_grow(self):
+        self._create_lists(2)
+        small, response = self._count_queries()
+        self.assertEqual(len(response.data["results"][0]["items"]), 2)
+
+        self._create_lists(20)
+        large, response = self._count_queries()
+        self.assertEqual(len(response.data["results"]), 22)
+        self.assertEqual(small, large)
+
+    def test_sparse_fieldset_skips_items(self):
+        self._create_lists(3)
+        self._count_queries()  # warm the accessible-list cache
+        sparse, response = self._count_queries({"fields": "id,name"})
+        full, _ = self._count_queries()
+
+        self.assertEqual(set(response.data["results"][0]), {"id", "name"})
+        self.assertEqual(sparse, full - 1)
+
+    def test_include_adds_items_to_sparse_fieldset(self):
+        self._create_lists(1)
+        _, response = self._count_queries({"fields": "id", "include": "items"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "items"})
+
+
+class BulkItemTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        self.url = f"/api/shoppinglists/{self.shopping_list.id}/items/bulk/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.friend)
+
+    def test_applies_mixed_operations_with_per_operation_results(self):
+        eggs = services.add_item(self.shopping_list, self.friend, "Eggs")
+        response = self.client.post(
+            self.url,
+            {
+                "operations": [
+                    {"op": "create", "name": "Bread"},
+                    {"op": "create", "name": "MILK"},
+                    {"op": "update", "id": self.milk.id, "status": "bought"},
+                    {"op": "delete", "id": self.milk.id},
+                    {"op": "delete", "id": eggs.id},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["ok"] for r in results], [True, False, True, False, True])
+        self.assertIn("already been added", results[1]["error"])
+        self.assertEqual(results[3]["error"], "You cannot delete this item.")
+
+        self.milk.refresh_from_db()
+        self.assertEqual(self.milk.status, "bought")
+        self.assertFalse(Item.objects.filter(id=eggs.id).exists())
+        self.assertTrue(Item.objects.filter(id=results[0]["item"]["id"]).exists())
+
+    def test_deleted_name_can_be_recreated_in_same_batch(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            self.url,
+            {
+                "operations": [
+                    {"op": "delete", "id": self.milk.id},
+                    {"op": "create", "name": "milk"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual([r["ok"] for r in response.data["results"]], [True, True])
+        self.assertEqual(
+            list(self.shopping_list.items.values_list("name", flat=True)), ["milk"]
+        )
+
+    def test_archived_list_is_not_found(self):
+        services.archive_list(self.shopping_list, self.owner)
+        self.client.force_authenticate(self.owner)
+
+        response = self.client.post(
+            f"/api/shoppinglists/{self.shopping_list.id}/items/bulk/",
+            {"operations": [{"op": "create", "name": "Bread"}]},
+            format="json",
+        )
+        # archived lists are hidden from the viewset queryset
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.shopping_list.items.count(), 1)
+
+
+class ChangesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.url = f"/api/shoppinglists/{self.shopping_list.id}/changes/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_changes_returns_only_items_after_version(self):
+        milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        eggs = services.add_item(self.shopping_list, self.owner, "Eggs")
+        since = self.shopping_list.version
+        eggs_id = eggs.id
+
+        services.update_item(milk, self.owner, status="bought")
+        services.delete_item(self.owner, eggs)
+        bread = services.add_item(self.shopping_list, self.owner, "Bread")
+
+        response = self.client.get(self.url, {"since": since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["version"], since + 3)
+        self.assertEqual([i["id"] for i in response.data["items"]], [milk.id, bread.id])
+        self.assertEqual(response.data["deleted"], [eggs_id])
+
+        response = self.client.get(self.url, {"since": response.data["version"]})
+        self.assertEqual(response.data["items"], [])
+        self.assertEqual(response.data["deleted"], [])
+
+    def test_accepting_invite_bumps_version(self):
+        friend = User.objects.create_user(username="bob")
+        invite = services.send_invite(self.shopping_list, self.owner, friend)
+
+        services.accept_invite(invite, friend)
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.version, 1)
+
+    def test_item_api_delete_leaves_tombstone(self):
+        milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        response = self.client.delete(f"/api/items/{milk.id}/")
+        self.assertEqual(response.status_code, 204)
+
+        response = self.client.get(self.url, {"since": milk.version})
+        self.assertEqual(response.data["deleted"], [milk.id])
+        self.assertFalse(Item.objects.filter(id=milk.id).exists())
+
+
+class RemoveCollaboratorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.url = f"/api/shoppinglists/{self.shopping_list.id}/remove-collaborator/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_removes_the_collaborator(self):
+        response = self.client.post(self.url, {"user": self.friend.id}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.shopping_list.shared_with.exists())
+
+    def test_malformed_user_is_rejected(self):
+        for data in ({"user": "abc"}, {}):
+            response = self.client.post(self.url, data, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("user", response.data)
+        self.assertTrue(self.shopping_list.shared_with.exists())
+
+
+class BulkInviteTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="alice")
+        self.friends = [
+            User.objects.create_user(username=name) for name in ("bob", "carol")
+        ]
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_bulk_invite_returns_per_invitee_results(self):
+        response = self.client.post(
+            "/api/invites/bulk/",
+            {
+                "shopping_list": self.shopping_list.id,
+                "invitees": [u.id for u in self.friends] + [self.owner.id],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["ok"] for r in results], [True, True, False])
+        self.assertEqual(results[0]["invite"]["invitee_username"], "bob")
+        self.assertEqual(
+            ListInvite.objects.filter(shopping_list=self.shopping_list).count(), 2
+        )
+
+    def test_non_owner_is_forbidden(self):
+        self.client.force_authenticate(self.friends[0])
+        response = self.client.post(
+            "/api/invites/bulk/",
+            {"shopping_list": self.shopping_list.id, "invitees": [self.friends[1].id]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ListInvite.objects.exists())
+
+
+class MoveItemTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.milk, self.eggs, self.bread = (
+            services.add_item(self.shopping_list, self.owner, name)
+            for name in ("Milk", "Eggs", "Bread")
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def item_names(self):
+        response = self.client.get(f"/api/shoppinglists/{self.shopping_list.id}/")
+        return [item["name"] for item in response.data["items"]]
+
+    def test_move_reorders_the_list(self):
+        response = self.client.post(
+            f"/api/items/{self.bread.id}/move/", {"after": None}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.item_names(), ["Bread", "Milk", "Eggs"])
+
+        response = self.client.post(
+            f"/api/items/{self.milk.id}/move/", {"after": self.eggs.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["rank"], Item.objects.get(pk=self.milk.id).rank)
+        self.assertEqual(self.item_names(), ["Bread", "Eggs", "Milk"])
+
+    def test_move_after_an_item_on_another_list_is_rejected(self):
+        other = services.create_list(self.owner, "Party")
+        chips = services.add_item(other, self.owner, "Chips")
+
+        response = self.client.post(
+            f"/api/items/{self.milk.id}/move/", {"after": chips.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            f"/api/items/{self.milk.id}/move/", {"after": 10**6}, format="json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.item_names(), ["Milk", "Eggs", "Bread"])
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        self.shopping_list.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def sync(self, mutations):
+        return self.client.post(
+            f"/api/shoppinglists/{self.shopping_list.id}/sync/",
+            {"mutations": mutations},
+            format="json",
+        )
+
+    def test_sync_returns_results_and_resolved_state(self):
+        base = self.shopping_list.version
+        mutations = [
+            {"client_id": "c1", "base_version": base, "op": "create", "name": "Eggs"},
+            {
+                "client_id": "c2",
+                "base_version": base,
+                "op": "update",
+                "id": self.milk.id,
+                "status": "bought",
+            },
+        ]
+
+        response = self.sync(mutations)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["ok"] for r in response.data["results"]], [True, True])
+        self.assertEqual(response.data["results"][0]["item"]["name"], "Eggs")
+        self.assertEqual(response.data["version"], base + 2)
+        self.assertEqual(
+            {item["name"] for item in response.data["items"]}, {"Milk", "Eggs"}
+        )
+
+        # a retry after a lost response changes nothing
+        response = self.sync(mutations)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(r["replayed"] for r in response.data["results"]))
+        self.assertEqual(response.data["version"], base + 2)
+        self.assertEqual(Item.objects.count(), 2)
+
+    def test_sync_rejects_malformed_logs(self):
+        response = self.sync(
+            [
+                {"client_id": "c1", "base_version": 0, "op": "delete"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.sync(
+            [
+                {"client_id": "c1", "base_version": 0, "op": "create", "name": "A"},
+                {"client_id": "c1", "base_version": 0, "op": "create", "name": "B"},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Item.objects.count(), 1)
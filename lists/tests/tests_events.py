@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from lists import events, services
+from lists.models import ShoppingList
+
+
+class RecordingBroker(events.BaseBroker):
+    def __init__(self):
+        self.published = []
+
+    def publish(self, list_id, event):
+        self.published.append((list_id, event))
+
+
+class PublishFromServicesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = ShoppingList.objects.create(
+            author=self.owner, name="Groceries"
+        )
+        self.broker = RecordingBroker()
+        self._previous, events._broker = events._broker, self.broker
+
+    def tearDown(self):
+        events._broker = self._previous
+
+    def test_item_events_are_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            milk = services.add_item(self.shopping_list, self.owner, "Milk")
+            self.assertEqual(self.broker.published, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.update_item(milk, self.owner, status="bought")
+            services.delete_item(self.owner, milk)
+
+        types = [event["type"] for _, event in self.broker.published]
+        self.assertEqual(types, ["item.added", "item.updated", "item.deleted"])
+        self.assertEqual([e["version"] for _, e in self.broker.published], [1, 2, 3])
+
+    def test_accepting_invite_publishes_member_joined(self):
+        friend = User.objects.create_user(username="bob")
+        invite = services.send_invite(self.shopping_list, self.owner, friend)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.accept_invite(invite, friend)
+
+        list_id, event = self.broker.published[0]
+        self.assertEqual(list_id, self.shopping_list.id)
+        self.assertEqual(event["type"], "member.joined")
+        self.assertEqual(event["user"]["username"], "bob")
+
+
+class InProcessBrokerTests(TestCase):
+    def test_publish_from_another_thread_reaches_subscriber(self):
+        broker = events.InProcessBroker()
+
+        async def listen():
+            subscription = broker.subscribe(7)
+            publisher = threading.Thread(
+                target=broker.publish, args=(7, {"type": "item.added"})
+            )
+            publisher.start()
+            event = await asyncio.wait_for(subscription.get(), timeout=1)
+            subscription.close()
+            publisher.join()
+            return event
+
+        self.assertEqual(asyncio.run(listen()), {"type": "item.added"})
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+class ListEventsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.stranger = User.objects.create_user(username="mallory")
+        self.shopping_list = ShoppingList.objects.create(
+            author=self.owner, name="Groceries"
+        )
+        self.url = f"/lists/{self.shopping_list.id}/events/"
+
+    async def test_stream_delivers_published_events(self):
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        events.get_broker().publish(
+            self.shopping_list.id, {"type": "item.added", "version": 4}
+        )
+        chunk = await asyncio.wait_for(anext(stream), timeout=1)
+        self.assertIn(b"event: item.added", chunk)
+        self.assertIn(b"id: 4", chunk)
+        await stream.aclose()
+
+    async def test_stream_requires_access(self):
+        await self.async_client.aforce_login(self.stranger)
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(LIST_EVENTS_HEARTBEAT=0.05, LIST_EVENTS_ACCESS_RECHECK=0)
+    async def test_stream_ends_when_access_is_removed(self):
+        friend = await User.objects.acreate(username="bob")
+        invite = await sync_to_async(services.send_invite)(
+            self.shopping_list, self.owner, friend
+        )
+        await sync_to_async(services.accept_invite)(invite, friend)
+        await self.async_client.aforce_login(friend)
+        response = await self.async_client.get(self.url)
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        await sync_to_async(services.remove_collaborator)(
+            self.shopping_list, self.owner, friend
+        )
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(stream), timeout=1)
+
+    def test_wsgi_is_refused(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 501)
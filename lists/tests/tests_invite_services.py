@@ -1,4 +1,6 @@
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError, PermissionDenied
 
@@ -124,4 +126,115 @@ def test_accept_invite_adds_user_to_shared_with():
     assert invitee in result.shopping_list.shared_with.all()
     assert result.status == "accepted"
     assert result.accepted_at is not None
-'''
\ No newline at end of file
+'''
+
+class InviteConstraintTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="alice")
+        self.invitee = User.objects.create_user(username="charlie")
+        self.shopping_list = services.create_list(self.owner, "Test List")
+
+    def test_send_invite_validates_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            services.send_invite(self.shopping_list, self.owner, self.invitee)
+
+        # TestCase runs inside a transaction, so the insert gets a savepoint
+        statements = [
+            q["sql"].split()[0]
+            for q in ctx
+            if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+        self.assertEqual(statements, ["SELECT", "INSERT"])
+
+    def test_duplicate_pending_invite_maps_to_validation_error(self):
+        services.send_invite(self.shopping_list, self.owner, self.invitee)
+        with self.assertRaises(ValidationError) as context:
+            services.send_invite(self.shopping_list, self.owner, self.invitee)
+        self.assertIn("Pending invite already exists", str(context.exception))
+
+    def test_self_invite_maps_to_validation_error(self):
+        with self.assertRaises(ValidationError) as context:
+            services.send_invite(self.shopping_list, self.owner, self.owner)
+        self.assertIn("Cannot invite yourself", str(context.exception))
+
+    def test_constraint_failure_leaves_outer_transaction_usable(self):
+        services.send_invite(self.shopping_list, self.owner, self.invitee)
+        with transaction.atomic():
+            with self.assertRaises(ValidationError):
+                services.send_invite(self.shopping_list, self.owner, self.invitee)
+            self.assertEqual(ListInvite.objects.count(), 1)
+
+    def test_accept_invite_twice_raises(self):
+        invite = services.send_invite(self.shopping_list, self.owner, self.invitee)
+        stale = ListInvite.objects.get(pk=invite.pk)
+        services.accept_invite(invite, self.invitee)
+
+        with self.assertRaises(ValidationError):
+            services.accept_invite(stale, self.invitee)
+
+
+class SendInvitesTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="alice")
+        self.bob = User.objects.create_user(username="bob")
+        self.charlie = User.objects.create_user(username="charlie")
+        self.shopping_list = services.create_list(self.owner, "Test List")
+
+    def test_reports_outcome_per_invitee(self):
+        services.send_invite(self.shopping_list, self.owner, self.bob)
+
+        results = services.send_invites(
+            self.shopping_list,
+            self.owner,
+            [self.bob.id, self.charlie.id, self.owner.id, 999999, self.charlie.id],
+        )
+
+        self.assertEqual(
+            [(r["invitee"], r["ok"]) for r in results],
+            [
+                (self.bob.id, False),
+                (self.charlie.id, True),
+                (self.owner.id, False),
+                (999999, False),
+            ],
+        )
+        self.assertIn("Pending invite already exists", results[0]["error"])
+        self.assertEqual(results[1]["invite"].invitee, self.charlie)
+        self.assertIsNotNone(results[1]["invite"].pk)
+        self.assertEqual(results[3]["error"], "User not found.")
+
+    def test_validates_batch_in_constant_queries(self):
+        users = [User.objects.create_user(username=f"user{i}") for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            results = services.send_invites(
+                self.shopping_list, self.owner, [u.id for u in users]
+            )
+
+        self.assertTrue(all(r["ok"] for r in results))
+        statements = [
+            q["sql"].split()[0]
+            for q in ctx
+            if not q["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+        self.assertEqual(statements, ["SELECT", "SELECT", "INSERT"])
+
+    def test_member_cap_applies_across_the_batch(self):
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(member_count=48)
+
+        results = services.send_invites(
+            self.shopping_list, self.owner, [self.bob.id, self.charlie.id]
+        )
+
+        self.assertEqual([r["ok"] for r in results], [True, False])
+        self.assertIn("full", results[1]["error"])
+        self.assertEqual(ListInvite.objects.count(), 1)
+
+    def test_non_owner_cannot_send_invites(self):
+        with self.assertRaises(PermissionDenied):
+            services.send_invites(self.shopping_list, self.bob, [self.charlie.id])
+
+    def test_archived_list_rejects_whole_batch(self):
+        services.archive_list(self.shopping_list, self.owner)
+        with self.assertRaises(ValidationError):
+            services.send_invites(self.shopping_list, self.owner, [self.bob.id])
+        self.assertFalse(ListInvite.objects.exists())
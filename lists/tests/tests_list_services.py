@@ -0,0 +1,207 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.base import CommandError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lists import services
+from lists.models import Item, ListInvite, ListMembership, ShoppingList
+
+
+class ListCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+
+    def assertCounters(self, **expected):
+        self.shopping_list.refresh_from_db()
+        actual = {field: getattr(self.shopping_list, field) for field in expected}
+        self.assertEqual(actual, expected)
+
+    def test_item_services_maintain_counters(self):
+        milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        eggs = services.add_item(self.shopping_list, self.owner, "Eggs")
+        services.update_item(milk, self.owner, status="bought")
+        services.delete_item(self.owner, eggs)
+
+        self.assertCounters(item_count=1, need_count=0, bought_count=1)
+
+    def test_stale_instances_do_not_skew_counters(self):
+        # two requests that both loaded the item before either wrote
+        services.add_item(self.shopping_list, self.owner, "Milk")
+        first, second = Item.objects.get(), Item.objects.get()
+
+        services.update_item(first, self.owner, status="bought")
+        services.update_item(second, self.owner, status="bought")
+        self.assertCounters(item_count=1, need_count=0, bought_count=1)
+
+        first, second = Item.objects.get(), Item.objects.get()
+        services.delete_item(self.owner, first)
+        services.delete_item(self.owner, second)
+        self.assertCounters(item_count=0, bought_count=0)
+        self.assertEqual(self.shopping_list.tombstones.count(), 1)
+        with self.assertRaises(ValidationError):
+            services.update_item(second, self.owner, status="need")
+
+    def test_bulk_operations_maintain_counters(self):
+        milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        eggs = services.add_item(self.shopping_list, self.owner, "Eggs")
+        services.apply_item_operations(
+            self.shopping_list,
+            self.owner,
+            [
+                {"op": "update", "id": milk.id, "status": "will_buy"},
+                {"op": "update", "id": eggs.id, "status": "bought"},
+                {"op": "delete", "id": eggs.id},
+                {"op": "create", "name": "Bread"},
+                {"op": "create", "name": "Jam", "status": "bought"},
+            ],
+        )
+
+        self.assertCounters(
+            item_count=3, need_count=1, will_buy_count=1, bought_count=1
+        )
+        self.assertEqual(Item.objects.get(name="Jam").status, "bought")
+
+    def test_membership_services_maintain_member_count(self):
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.assertCounters(member_count=1)
+
+        services.remove_collaborator(self.shopping_list, self.owner, self.friend)
+        self.assertCounters(member_count=0)
+
+    def test_item_cap_reads_the_counter(self):
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(item_count=100)
+
+        with CaptureQueriesContext(connection) as ctx:
+            with self.assertRaises(ValidationError) as context:
+                services.add_item(self.shopping_list, self.owner, "Milk")
+        self.assertIn("99 items", str(context.exception))
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx))
+
+    def test_member_cap_reads_the_counter(self):
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(member_count=49)
+
+        with self.assertRaises(ValidationError) as context:
+            services.accept_invite(invite, self.friend)
+        self.assertIn("full", str(context.exception))
+
+    def test_reconcile_command_repairs_drift(self):
+        services.add_item(self.shopping_list, self.owner, "Milk")
+        Item.objects.create(
+            shopping_list=self.shopping_list, name="Eggs", status="bought"
+        )
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(member_count=7)
+
+        out = StringIO()
+        call_command("reconcile_list_counters", stdout=out)
+
+        self.assertIn("Fixed 1", out.getvalue())
+        self.assertCounters(item_count=2, need_count=1, bought_count=1, member_count=0)
+
+
+class ItemNameKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.milk = services.add_item(self.shopping_list, self.owner, "Milk")
+
+    def test_normalized_duplicates_are_rejected_by_the_constraint(self):
+        self.shopping_list.refresh_from_db()
+        version = self.shopping_list.version
+
+        for name in ("MILK", "  milk ", "Ｍｉｌｋ"):
+            with CaptureQueriesContext(connection) as ctx:
+                with self.assertRaises(ValidationError) as context:
+                    services.add_item(self.shopping_list, self.owner, name)
+            self.assertIn("already been added", str(context.exception))
+            # no lookup before the INSERT
+            self.assertFalse(
+                any(
+                    q["sql"].startswith('SELECT 1 AS "a" FROM "lists_item"')
+                    for q in ctx
+                )
+            )
+
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.version, version)
+        self.assertEqual(self.shopping_list.item_count, 1)
+
+    def test_rename_updates_the_key_and_rejects_duplicates(self):
+        eggs = services.add_item(self.shopping_list, self.owner, "Eggs")
+
+        services.update_item(eggs, self.owner, name="Free-range Eggs")
+        eggs.refresh_from_db()
+        self.assertEqual(eggs.name_key, "free-range eggs")
+
+        with self.assertRaises(ValidationError):
+            services.update_item(eggs, self.owner, name="milk")
+        self.assertEqual(Item.objects.get(pk=eggs.pk).name, "Free-range Eggs")
+
+
+class GenerateScaleDataTests(TestCase):
+    def generate(self, **options):
+        out = StringIO()
+        call_command(
+            "generate_scale_data",
+            seed=1,
+            skip_search_index=True,
+            stdout=out,
+            **options,
+        )
+        return out.getvalue()
+
+    def test_generated_data_is_consistent(self):
+        output = self.generate(users=30, lists=40, items=1500, members=3)
+
+        self.assertIn("30 users, 40 lists", output)
+        self.assertEqual(Item.objects.count(), 1500)
+        self.assertEqual(User.objects.count(), 30)
+        # counters match the rows, so the services' caps and summaries hold
+        out = StringIO()
+        call_command("reconcile_list_counters", dry_run=True, stdout=out)
+        self.assertIn("Found 0 with drift", out.getvalue())
+        self.assertLessEqual(
+            max(sl.item_count for sl in ShoppingList.objects.all()), 99
+        )
+
+        for sl in ShoppingList.objects.prefetch_related("shared_with", "memberships"):
+            members = {u.id for u in sl.shared_with.all()}
+            self.assertNotIn(sl.author_id, members)
+            self.assertEqual(
+                {(m.user_id, m.role) for m in sl.memberships.all()},
+                {(sl.author_id, "owner")} | {(u, "member") for u in members},
+            )
+            accepted = set(
+                ListInvite.objects.filter(
+                    shopping_list=sl, status="accepted"
+                ).values_list("invitee_id", flat=True)
+            )
+            self.assertEqual(accepted, members)
+        self.assertEqual(
+            ListMembership.objects.filter(role="owner").count(),
+            ShoppingList.objects.count(),
+        )
+        self.assertEqual(
+            set(ListInvite.objects.values_list("status", flat=True)),
+            {"pending", "accepted", "declined", "canceled"},
+        )
+
+    def test_can_run_twice(self):
+        self.generate(users=5, lists=5, items=20)
+        self.generate(users=5, lists=5, items=20)
+        self.assertEqual(User.objects.count(), 10)
+
+    def test_rejects_more_items_than_fit(self):
+        with self.assertRaises(CommandError):
+            self.generate(users=5, lists=2, items=199)
@@ -0,0 +1,172 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lists import services
+from lists.models import ListMembership, ShoppingList
+from lists.permissions import (
+    get_list_summaries_user_can_view,
+    get_lists_user_can_view,
+    user_can_access_list,
+)
+
+
+class ListAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+
+    def _share_with(self, user):
+        invite = services.send_invite(self.shopping_list, self.owner, user)
+        services.accept_invite(invite, user)
+
+    def test_removed_collaborator_is_refused_at_once(self):
+        self._share_with(self.friend)
+        self.client.force_login(self.friend)
+        self.client.get("/api/items/")
+
+        services.remove_collaborator(self.shopping_list, self.owner, self.friend)
+
+        self.assertFalse(user_can_access_list(self.friend, self.shopping_list))
+        self.client.force_login(self.friend)
+        item = services.add_item(self.shopping_list, self.owner, "Milk")
+        response = self.client.get(f"/api/items/{item.id}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_accepting_and_removing_share_changes_access(self):
+        self.assertFalse(user_can_access_list(self.friend, self.shopping_list))
+
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.assertTrue(user_can_access_list(self.friend, self.shopping_list))
+
+        services.remove_collaborator(self.shopping_list, self.owner, self.friend)
+        self.assertFalse(user_can_access_list(self.friend, self.shopping_list))
+
+    def test_archive_and_create_change_visible_lists(self):
+        self.assertEqual(
+            list(get_lists_user_can_view(self.owner)), [self.shopping_list]
+        )
+
+        services.archive_list(self.shopping_list, self.owner)
+        self.assertEqual(list(get_lists_user_can_view(self.owner)), [])
+        self.assertEqual(
+            list(get_lists_user_can_view(self.owner, include_archived=True)),
+            [self.shopping_list],
+        )
+
+        other = services.create_list(self.owner, "Hardware")
+        self.assertEqual(list(get_lists_user_can_view(self.owner)), [other])
+
+    def test_deleting_list_removes_access(self):
+        self._share_with(self.friend)
+        self.assertTrue(get_lists_user_can_view(self.friend).exists())
+
+        services.delete_list(self.shopping_list, self.owner)
+        self.assertFalse(get_lists_user_can_view(self.friend).exists())
+
+
+class ListMembershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+
+    def test_services_keep_memberships_in_sync(self):
+        self.assertEqual(
+            list(self.shopping_list.memberships.values_list("user", "role")),
+            [(self.owner.id, "owner")],
+        )
+
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.assertEqual(self.shopping_list.memberships.count(), 2)
+
+        services.archive_list(self.shopping_list, self.owner)
+        self.assertFalse(
+            self.shopping_list.memberships.filter(is_archived=False).exists()
+        )
+
+        services.remove_collaborator(self.shopping_list, self.friend, self.friend)
+        self.assertEqual(self.shopping_list.memberships.count(), 1)
+
+    def test_visibility_is_a_single_query_without_distinct(self):
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+
+        with CaptureQueriesContext(connection) as ctx:
+            lists = list(get_lists_user_can_view(self.friend))
+
+        self.assertEqual(lists, [self.shopping_list])
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn("DISTINCT", ctx[0]["sql"])
+        self.assertNotIn(" OR ", ctx[0]["sql"])
+
+    def test_get_item_user_can_edit_uses_membership(self):
+        item = services.add_item(self.shopping_list, self.owner, "Milk")
+        self.assertEqual(services.get_item_user_can_edit(self.owner, item.id), item)
+        with self.assertRaises(Http404):
+            services.get_item_user_can_edit(self.friend, item.id)
+
+
+class ListSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.client.force_login(self.owner)
+
+    def _create_lists(self, count):
+        lists = ShoppingList.objects.bulk_create(
+            ShoppingList(author=self.owner, name=f"List {i}") for i in range(count)
+        )
+        ListMembership.objects.bulk_create(
+            ListMembership(
+                user=self.owner,
+                shopping_list=sl,
+                role="owner",
+                created_at=sl.created_at,
+            )
+            for sl in lists
+        )
+
+    def test_summary_fields(self):
+        sl = services.create_list(self.owner, "Groceries")
+        created_activity = sl.last_activity_at
+        services.add_item(sl, self.owner, "Milk")
+        services.add_item(sl, self.owner, "Eggs", status="bought")
+        services.add_item(sl, self.owner, "Bread", status="will_buy")
+        invite = services.send_invite(sl, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+
+        (summary,) = get_list_summaries_user_can_view(self.owner)
+        self.assertEqual(
+            (summary.item_count, summary.bought_count, summary.remaining_count),
+            (3, 1, 2),
+        )
+        self.assertEqual(summary.member_count, 1)
+        self.assertGreater(summary.last_activity_at, created_activity)
+
+    def test_index_pages_use_constant_queries(self):
+        counts = {}
+        created = 0
+        for total in (1, 10, 1000):
+            self._create_lists(total - created)
+            created = total
+            for name in ("lists:shoppinglist-index", "lists:shoppinglist-modern"):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(reverse(name))
+                self.assertEqual(len(response.context["lists"]), total)
+                counts.setdefault(name, set()).add(len(ctx))
+
+        self.assertEqual(
+            {name: len(seen) for name, seen in counts.items()},
+            {"lists:shoppinglist-index": 1, "lists:shoppinglist-modern": 1},
+        )
@@ -0,0 +1,243 @@
+import json
+from collections import defaultdict
+from types import SimpleNamespace
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lists import services
+from lists.search import search_cache
+from lists.tests.query_budgets import QUERY_BUDGETS
+from lists.urls import urlpatterns as list_urlpatterns
+from shoppinglist.urls import router
+
+# every endpoint is measured at each size and must run the same queries
+SIZES = (1, 5, 20)
+
+
+def seed(size):
+    """
+    A requester with `size` of everything: lists (each with `size` items),
+    collaborators on the main list, lists shared with them, incoming and
+    outgoing pending invites.
+    """
+    user = User.objects.create_user(username="alice", is_staff=True)
+    others = [User.objects.create_user(username=f"user{i}") for i in range(size)]
+    strangers = [User.objects.create_user(username=f"stranger{i}") for i in range(size)]
+    newcomer = User.objects.create_user(username="newcomer")
+
+    lists = [services.create_list(user, f"List {i}") for i in range(size)]
+    for shopping_list in lists:
+        for i in range(size):
+            services.add_item(shopping_list, user, f"Item {i}")
+    main = lists[0]
+    services.add_item(main, user, "Spare")
+
+    incoming = []
+    for other in others:
+        invite = services.send_invite(main, user, other)
+        services.accept_invite(invite, other)
+
+        shared = services.create_list(other, f"{other.username}'s list")
+        services.add_item(shared, other, "Bread")
+        services.accept_invite(services.send_invite(shared, other, user), user)
+        pending = services.create_list(other, f"{other.username}'s party")
+        incoming.append(services.send_invite(pending, other, user))
+    outgoing = [services.send_invite(main, user, s) for s in strangers]
+
+    items = list(main.items.order_by("id"))
+    return SimpleNamespace(
+        user=user,
+        main=main,
+        item=items[0],
+        spare=items[-1],
+        collaborator=others[0],
+        newcomer=newcomer,
+        incoming=incoming[0],
+        outgoing=outgoing[0],
+    )
+
+
+# (URL name, method) -> f(fixture) -> (URL args, request data)
+REQUESTS = {
+    ("lists:shoppinglist-index", "GET"): lambda f: ([], None),
+    ("lists:create-list", "GET"): lambda f: ([], None),
+    ("lists:create-list", "POST"): lambda f: ([], {"name": "Party"}),
+    ("lists:shoppinglist-detail", "GET"): lambda f: ([f.main.id], None),
+    ("lists:add-item", "GET"): lambda f: ([f.main.id], None),
+    ("lists:add-item", "POST"): lambda f: (
+        [f.main.id],
+        {"name": "Butter", "status": "need"},
+    ),
+    ("lists:list-events", "GET"): lambda f: ([f.main.id], None),
+    ("lists:edit-item", "GET"): lambda f: ([f.item.id], None),
+    ("lists:edit-item", "POST"): lambda f: (
+        [f.item.id],
+        {"name": f.item.name, "status": "bought"},
+    ),
+    ("lists:shoppinglist-modern", "GET"): lambda f: ([], None),
+    ("lists:invites-dashboard", "GET"): lambda f: ([], None),
+    ("lists:search-users", "GET"): lambda f: ([], {"q": "us", "list": f.main.id}),
+    ("lists:cache-stats", "GET"): lambda f: ([], None),
+    ("lists:delete-list", "GET"): lambda f: ([f.main.id], None),
+    ("lists:delete-list", "POST"): lambda f: ([f.main.id], {}),
+    ("lists:delete-item", "POST"): lambda f: ([f.item.id], {}),
+    ("lists:send-invite", "GET"): lambda f: ([f.main.id], None),
+    ("lists:send-invite", "POST"): lambda f: (
+        [f.main.id],
+        {"invitee_id": f.newcomer.id},
+    ),
+    ("lists:accept-invite", "POST"): lambda f: ([f.incoming.id], {}),
+    ("lists:cancel-invite", "POST"): lambda f: ([f.outgoing.id], {}),
+    ("lists:decline-invite", "POST"): lambda f: ([f.incoming.id], {}),
+    ("lists:invite-detail", "GET"): lambda f: ([f.incoming.id], None),
+    ("lists:select-invitee", "POST"): lambda f: ([], {"user_id": f.newcomer.id}),
+    ("api-root", "GET"): lambda f: ([], None),
+    ("shoppinglist-list", "GET"): lambda f: ([], None),
+    ("shoppinglist-list", "POST"): lambda f: ([], {"name": "Party"}),
+    ("shoppinglist-detail", "GET"): lambda f: ([f.main.id], None),
+    ("shoppinglist-detail", "PUT"): lambda f: ([f.main.id], {"name": "Renamed"}),
+    ("shoppinglist-detail", "PATCH"): lambda f: ([f.main.id], {"name": "Renamed"}),
+    ("shoppinglist-detail", "DELETE"): lambda f: ([f.main.id], None),
+    ("shoppinglist-archive", "POST"): lambda f: ([f.main.id], {}),
+    ("shoppinglist-remove-collaborator", "POST"): lambda f: (
+        [f.main.id],
+        {"user": f.collaborator.id},
+    ),
+    ("shoppinglist-bulk-items", "POST"): lambda f: (
+        [f.main.id],
+        {
+            "operations": [
+                {"op": "create", "name": "Butter"},
+                {"op": "update", "id": f.item.id, "status": "bought"},
+                {"op": "delete", "id": f.spare.id},
+            ]
+        },
+    ),
+    ("shoppinglist-changes", "GET"): lambda f: ([f.main.id], {"since": 0}),
+    ("shoppinglist-sync", "POST"): lambda f: (
+        [f.main.id],
+        {
+            "mutations": [
+                {"client_id": "c1", "base_version": 0, "op": "create", "name": "Tea"},
+                {
+                    "client_id": "c2",
+                    "base_version": f.main.version,
+                    "op": "update",
+                    "id": f.item.id,
+                    "status": "bought",
+                },
+                {
+                    "client_id": "c3",
+                    "base_version": f.main.version,
+                    "op": "move",
+                    "ref": "c1",
+                    "after": None,
+                },
+            ]
+        },
+    ),
+    ("item-list", "GET"): lambda f: ([], None),
+    ("item-list", "POST"): lambda f: (
+        [],
+        {"shopping_list": f.main.id, "name": "Butter"},
+    ),
+    ("item-detail", "GET"): lambda f: ([f.item.id], None),
+    ("item-detail", "PUT"): lambda f: (
+        [f.item.id],
+        {"shopping_list": f.main.id, "name": f.item.name, "status": "bought"},
+    ),
+    ("item-detail", "PATCH"): lambda f: ([f.item.id], {"status": "bought"}),
+    ("item-detail", "DELETE"): lambda f: ([f.item.id], None),
+    ("item-move", "POST"): lambda f: ([f.item.id], {"after": f.spare.id}),
+    ("invite-list", "GET"): lambda f: ([], None),
+    ("invite-list", "POST"): lambda f: (
+        [],
+        {"shopping_list": f.main.id, "invitee": f.newcomer.id},
+    ),
+    ("invite-detail", "GET"): lambda f: ([f.outgoing.id], None),
+    ("invite-detail", "PUT"): lambda f: (
+        [f.outgoing.id],
+        {"shopping_list": f.main.id, "invitee": f.outgoing.invitee_id},
+    ),
+    ("invite-detail", "PATCH"): lambda f: ([f.outgoing.id], {}),
+    ("invite-detail", "DELETE"): lambda f: ([f.outgoing.id], None),
+    ("invite-bulk", "POST"): lambda f: (
+        [],
+        {"shopping_list": f.main.id, "invitees": [f.newcomer.id]},
+    ),
+}
+
+# answered 501 under WSGI, so measured through the ASGI handler
+ASGI_ONLY = {("lists:list-events", "GET")}
+
+
+def routes():
+    """(URL name, method or None) for every route the budgets must cover."""
+    found = {(f"lists:{p.name}", None) for p in list_urlpatterns}
+    for pattern in router.urls:
+        # the API root is a plain view; viewset routes list their actions
+        actions = getattr(pattern.callback, "actions", None) or {"get": None}
+        found.update(
+            (pattern.name, method.upper()) for method in actions if method != "head"
+        )
+    return found
+
+
+class QueryBudgetTests(TestCase):
+    def test_every_route_has_a_budget(self):
+        budgeted = set(QUERY_BUDGETS)
+        budgeted_names = {name for name, _ in budgeted}
+        for name, method in routes():
+            if method is None:
+                self.assertIn(name, budgeted_names, "no query budget for this route")
+            else:
+                self.assertIn((name, method), budgeted, "no query budget")
+        self.assertEqual(set(REQUESTS), budgeted)
+
+    def _count_queries(self, key, fixture):
+        name, method = key
+        args, data = REQUESTS[key](fixture)
+        url = reverse(name, args=args)
+        if name.startswith("lists:") or method in ("GET", "DELETE"):
+            kwargs = {"data": data}
+        else:
+            kwargs = {"data": json.dumps(data), "content_type": "application/json"}
+        cache.clear()
+        search_cache.clear()
+        send = getattr(self.client, method.lower())
+        if key in ASGI_ONLY:
+            self.async_client.cookies = self.client.cookies
+            send = async_to_sync(getattr(self.async_client, method.lower()))
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                response = send(url, **kwargs)
+            response.close()
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f"{method} {url}")
+        return [q["sql"] for q in ctx if "SAVEPOINT" not in q["sql"]]
+
+    def test_endpoints_stay_within_budget_at_every_size(self):
+        counts = defaultdict(dict)
+        for size in SIZES:
+            with transaction.atomic():
+                fixture = seed(size)
+                self.client.force_login(fixture.user)
+                for key in REQUESTS:
+                    counts[key][size] = len(self._count_queries(key, fixture))
+                transaction.set_rollback(True)
+
+        failures = []
+        for (name, method), by_size in counts.items():
+            budget = QUERY_BUDGETS[name, method]
+            if max(by_size.values()) > budget:
+                failures.append(f"{method} {name}: {by_size}, budget {budget}")
+            elif len(set(by_size.values())) > 1:
+                failures.append(f"{method} {name}: {by_size} grows with data")
+        self.assertFalse(failures, "\n" + "\n".join(failures))
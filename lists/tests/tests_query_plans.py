@@ -0,0 +1,43 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from lists.management.commands import audit_query_plans
+from lists.models import ShoppingList
+
+
+class AuditQueryPlansTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("audit_query_plans", stdout=out)
+
+        self.assertIn("No full table scans", out.getvalue())
+        # the workload is rolled back
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(ShoppingList.objects.exists())
+
+    def test_full_scans_are_reported(self):
+        plan = [
+            "SEARCH lists_listmembership USING INDEX x (user_id=?)",
+            "SCAN lists_item",
+            "SCAN CONSTANT ROW",
+            "SCAN U0 USING COVERING INDEX item_list_status_idx",
+        ]
+        self.assertEqual(audit_query_plans.full_scans(plan), ["lists_item", "U0"])
+
+    def test_command_fails_on_a_full_scan(self):
+        out = StringIO()
+        with mock.patch.object(
+            audit_query_plans, "explain", return_value=["SCAN lists_item"]
+        ):
+            with self.assertRaisesMessage(CommandError, "scan a whole table"):
+                call_command("audit_query_plans", stdout=out)
+        self.assertIn("full scan of lists_item", out.getvalue())
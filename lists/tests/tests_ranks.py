@@ -0,0 +1,145 @@
+import random
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lists import services
+from lists.models import Item
+from lists.ranks import REBALANCE_LENGTH, rank_after, rank_between, spread_ranks
+
+
+class RankTests(TestCase):
+    def test_rank_between_stays_between(self):
+        rng = random.Random(1)
+        ranks = ["i"]
+        for _ in range(500):
+            i = rng.randrange(len(ranks) + 1)
+            lower = ranks[i - 1] if i else ""
+            upper = ranks[i] if i < len(ranks) else None
+            rank = rank_between(lower, upper)
+            self.assertGreater(rank, lower)
+            if upper is not None:
+                self.assertLess(rank, upper)
+            self.assertFalse(rank.endswith("0"))
+            ranks.insert(i, rank)
+        self.assertEqual(ranks, sorted(ranks))
+
+    def test_rank_between_rejects_unordered_bounds(self):
+        with self.assertRaises(ValueError):
+            rank_between("b", "a")
+
+    def test_appending_keeps_keys_short(self):
+        rank = ""
+        for _ in range(99):
+            following = rank_after(rank)
+            self.assertGreater(following, rank)
+            rank = following
+        self.assertLessEqual(len(rank), 3)
+
+    def test_spread_ranks(self):
+        for count in (0, 1, 35, 36, 99, 2000):
+            ranks = spread_ranks(count)
+            self.assertEqual(len(ranks), count)
+            self.assertEqual(ranks, sorted(set(ranks)))
+            self.assertNotIn("", ranks)
+
+
+class MoveItemTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.stranger = User.objects.create_user(username="mallory")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.milk, self.eggs, self.bread = (
+            services.add_item(self.shopping_list, self.owner, name)
+            for name in ("Milk", "Eggs", "Bread")
+        )
+
+    def names(self):
+        return list(
+            self.shopping_list.items.order_by("rank", "id").values_list(
+                "name", flat=True
+            )
+        )
+
+    def test_added_items_go_last(self):
+        self.assertEqual(self.names(), ["Milk", "Eggs", "Bread"])
+
+    def test_move_writes_only_the_moved_item(self):
+        others = dict(
+            self.shopping_list.items.exclude(pk=self.bread.pk).values_list("id", "rank")
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            services.move_item(self.bread, self.owner, self.milk)
+        item_updates = [q for q in ctx if q["sql"].startswith('UPDATE "lists_item"')]
+        self.assertEqual(len(item_updates), 1)
+
+        self.assertEqual(self.names(), ["Milk", "Bread", "Eggs"])
+        services.move_item(self.eggs, self.owner)
+        self.assertEqual(self.names(), ["Eggs", "Milk", "Bread"])
+        self.assertEqual(others[self.milk.pk], Item.objects.get(pk=self.milk.pk).rank)
+
+    def test_move_bumps_the_version(self):
+        self.shopping_list.refresh_from_db()
+        version = self.shopping_list.version
+
+        services.move_item(self.milk, self.owner, self.bread)
+
+        self.milk.refresh_from_db()
+        self.assertEqual(self.milk.version, version + 1)
+
+    def test_move_is_checked(self):
+        other = services.create_list(self.owner, "Party")
+        chips = services.add_item(other, self.owner, "Chips")
+
+        with self.assertRaises(PermissionDenied):
+            services.move_item(self.milk, self.stranger, self.eggs)
+        with self.assertRaises(ValidationError):
+            services.move_item(self.milk, self.owner, chips)
+        with self.assertRaises(ValidationError):
+            services.move_item(self.milk, self.owner, self.milk)
+
+    def test_tied_ranks_are_respaced_before_moving(self):
+        Item.objects.filter(shopping_list=self.shopping_list).update(rank="i")
+
+        services.move_item(self.milk, self.owner, self.eggs)
+
+        self.assertEqual(self.names(), ["Eggs", "Milk", "Bread"])
+        ranks = list(self.shopping_list.items.values_list("rank", flat=True))
+        self.assertEqual(len(set(ranks)), 3)
+
+    def test_long_keys_are_rebalanced_after_commit(self):
+        # keep moving bread between milk and eggs, halving the same gap
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(REBALANCE_LENGTH * 6):
+                services.move_item(self.bread, self.owner, self.milk)
+                services.move_item(self.eggs, self.owner, self.milk)
+
+        self.assertEqual(self.names(), ["Milk", "Eggs", "Bread"])
+        ranks = self.shopping_list.items.values_list("rank", flat=True)
+        self.assertLessEqual(max(len(rank) for rank in ranks), REBALANCE_LENGTH + 1)
+
+    def test_rebalance_command_sweeps_long_and_tied_ranks(self):
+        long_rank = self.milk.rank + "h" * REBALANCE_LENGTH
+        Item.objects.filter(pk=self.eggs.pk).update(rank=long_rank)
+        other = services.create_list(self.owner, "Party")
+        services.add_item(other, self.owner, "Chips")
+        services.add_item(other, self.owner, "Dip")
+        Item.objects.filter(shopping_list=other).update(rank="")
+
+        out = StringIO()
+        call_command("rebalance_item_ranks", dry_run=True, stdout=out)
+        self.assertIn("Found 2 lists", out.getvalue())
+
+        call_command("rebalance_item_ranks", stdout=out)
+        self.assertEqual(self.names(), ["Milk", "Eggs", "Bread"])
+        out = StringIO()
+        call_command("rebalance_item_ranks", dry_run=True, stdout=out)
+        self.assertIn("Found 0 lists", out.getvalue())
@@ -0,0 +1,94 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+
+from lists import services
+from lists.models import Item
+from lists.permissions import user_can_access_list
+from shoppinglist.middleware import PIN_COOKIE, replica_routing_middleware
+from shoppinglist.routers import ReplicaRouter, read_from_replicas
+
+
+def read_alias_view(request):
+    return HttpResponse(ReplicaRouter().db_for_read(Item))
+
+
+async def async_read_alias_view(request):
+    return HttpResponse(ReplicaRouter().db_for_read(Item))
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = replica_routing_middleware(read_alias_view)
+
+    def test_reads_use_primary_outside_requests(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Item), "default")
+        with read_from_replicas():
+            self.assertEqual(router.db_for_read(Item), "replica_1")
+            self.assertEqual(router.db_for_write(Item), "default")
+        self.assertEqual(router.db_for_read(Item), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_means_primary(self):
+        with read_from_replicas():
+            self.assertEqual(ReplicaRouter().db_for_read(Item), "default")
+
+    def test_safe_requests_read_from_replica(self):
+        response = self.middleware(self.factory.get("/lists/"))
+        self.assertEqual(response.content, b"replica_1")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_the_user_to_primary(self):
+        response = self.middleware(self.factory.post("/lists/1/add/"))
+        self.assertEqual(response.content, b"default")
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 10)
+
+        request = self.factory.get("/lists/1/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(self.middleware(request).content, b"default")
+
+    def test_async_requests_are_routed_too(self):
+        middleware = replica_routing_middleware(async_read_alias_view)
+        response = asyncio.run(middleware(self.factory.get("/lists/1/events/")))
+        self.assertEqual(response.content, b"replica_1")
+
+    @override_settings(DATABASE_REPLICAS=["replica_1", "replica_2", "replica_3"])
+    def test_one_replica_per_block(self):
+        router = ReplicaRouter()
+        for _ in range(10):
+            with read_from_replicas():
+                aliases = {router.db_for_read(Item) for _ in range(20)}
+            self.assertEqual(len(aliases), 1)
+
+
+# an alias with no connection: any read routed to it raises. Not a TestCase,
+# whose wrapping transaction would keep every read on the primary anyway.
+@override_settings(DATABASE_REPLICAS=["missing_replica"])
+class PrimaryReadTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+
+    def test_reads_inside_transactions_use_primary(self):
+        with read_from_replicas():
+            self.assertEqual(ReplicaRouter().db_for_read(Item), "missing_replica")
+            with transaction.atomic():
+                self.assertEqual(ReplicaRouter().db_for_read(Item), "default")
+                services.add_item(self.shopping_list, self.owner, "Milk")
+
+    def test_access_checks_read_primary(self):
+        with read_from_replicas():
+            self.assertTrue(user_can_access_list(self.owner, self.shopping_list))
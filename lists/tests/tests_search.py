@@ -0,0 +1,189 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from lists import search, services
+from lists.models import UserSearchToken
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        search.search_cache.clear()
+        search.search_cache.reset_stats()
+        self.owner = User.objects.create_user(username="alice")
+        self.john = User.objects.create_user(
+            username="jsmith", first_name="John", last_name="Smith"
+        )
+        self.mary = User.objects.create_user(
+            username="mary", last_name="Johansson", email="mj@example.com"
+        )
+        self.jose = User.objects.create_user(
+            username="jose99", first_name="José", email="pepe.garcia@example.com"
+        )
+
+    def usernames(self, query, **kwargs):
+        return [
+            user.username for user in search.search_users(query, self.owner, **kwargs)
+        ]
+
+    def test_tokens_cover_username_names_and_email(self):
+        self.assertEqual(
+            search.user_tokens(self.jose),
+            {"jose99": 0, "jose": 0, "pepe": 0, "garcia": 1},
+        )
+
+    def test_field_start_matches_rank_first(self):
+        UserSearchToken.objects.filter(user=self.mary, token="johansson").update(rank=1)
+        self.assertEqual(self.usernames("joh"), ["jsmith", "mary"])
+
+    def test_matches_accents_and_email_local_part(self):
+        self.assertEqual(self.usernames("Jos"), ["jose99"])
+        self.assertEqual(self.usernames("garc"), ["jose99"])
+        self.assertEqual(self.usernames("example"), [])
+
+    def test_matches_names_in_any_script(self):
+        User.objects.create_user(username="vlad", first_name="Влад")
+        User.objects.create_user(username="fang", first_name="王芳")
+        User.objects.create_user(username="soren", first_name="Søren", last_name="Øst")
+        User.objects.create_user(username="john_doe")
+
+        self.assertEqual(self.usernames("вла"), ["vlad"])
+        self.assertEqual(self.usernames("ВЛАД"), ["vlad"])
+        self.assertEqual(self.usernames("王芳"), ["fang"])
+        self.assertEqual(self.usernames("sør"), ["soren"])
+        self.assertEqual(self.usernames("ost"), ["soren"])
+        self.assertEqual(self.usernames("doe"), ["john_doe"])
+
+    def test_prefix_range_covers_every_continuation(self):
+        lookups = search._prefix_filter("вла")
+        self.assertEqual(lookups, {"token__gte": "вла", "token__lt": "влб"})
+        for token in ("вла", "влад", "вла\U0010ffff"):
+            self.assertTrue(lookups["token__gte"] <= token < lookups["token__lt"])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.usernames("john sm"), ["jsmith"])
+        self.assertEqual(self.usernames("john ga"), [])
+
+    def test_short_queries_return_nothing(self):
+        self.assertEqual(self.usernames("j"), [])
+
+    def test_excludes_requester_and_collaborators(self):
+        shopping_list = services.create_list(self.owner, "Groceries")
+        invite = services.send_invite(shopping_list, self.owner, self.john)
+        services.accept_invite(invite, self.john)
+
+        self.assertEqual(self.usernames("al"), [])
+        self.assertEqual(self.usernames("jo"), ["mary", "jsmith", "jose99"])
+        self.assertEqual(
+            self.usernames("jo", shopping_list=shopping_list), ["mary", "jose99"]
+        )
+
+    def test_saving_a_user_reindexes_them(self):
+        self.john.first_name = "Jonathan"
+        self.john.save()
+        self.assertTrue(self.john.search_tokens.filter(token="jonathan").exists())
+        self.assertFalse(self.john.search_tokens.filter(token="john").exists())
+
+    def test_search_view_uses_index(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse("lists:search-users"), {"q": "smi"})
+        self.assertContains(response, "(jsmith)")
+        self.assertNotContains(response, "(mary)")
+
+    def test_longer_query_is_narrowed_from_cached_prefix(self):
+        self.assertEqual(self.usernames("jo"), ["mary", "jsmith", "jose99"])
+
+        # only each search's final in_bulk lookup hits the database
+        with self.assertNumQueries(2):
+            self.assertEqual(self.usernames("joh"), ["mary", "jsmith"])
+            self.assertEqual(self.usernames("john s"), ["jsmith"])
+        stats = search.search_cache.as_dict()
+        self.assertEqual((stats["misses"], stats["narrowed"]), (1, 2))
+
+    def test_cached_candidates_still_exclude_per_request(self):
+        self.usernames("jo")
+        shopping_list = services.create_list(self.owner, "Groceries")
+        ListMembership = shopping_list.memberships.model
+        ListMembership.objects.create(
+            user=self.mary,
+            shopping_list=shopping_list,
+            created_at=shopping_list.created_at,
+        )
+
+        self.assertEqual(
+            self.usernames("jo", shopping_list=shopping_list), ["jsmith", "jose99"]
+        )
+        self.assertEqual(search.search_cache.as_dict()["hits"], 1)
+
+    def test_renaming_a_user_clears_cached_results(self):
+        self.assertEqual(self.usernames("smi"), ["jsmith"])
+        self.john.last_name = "Jones"
+        self.john.username = "jjones"
+        self.john.save()
+        self.assertEqual(self.usernames("smi"), [])
+
+
+class PrefixCacheTests(SimpleTestCase):
+    def test_entries_expire_after_ttl(self):
+        cache = search.PrefixCache(ttl=0)
+        cache.get_or_compute("jo", lambda: "first")
+        self.assertEqual(cache.get_or_compute("jo", lambda: "second"), "second")
+        self.assertEqual(cache.as_dict()["misses"], 2)
+
+    def test_size_is_bounded_least_recently_used_first(self):
+        cache = search.PrefixCache(max_entries=2)
+        cache.get_or_compute("ab", lambda: 1)
+        cache.get_or_compute("cd", lambda: 2)
+        cache.get_or_compute("ab", lambda: 1)
+        cache.get_or_compute("ef", lambda: 3)
+
+        self.assertIsNone(cache.get("cd"))
+        self.assertEqual(cache.get("ab"), 1)
+        self.assertEqual(cache.as_dict()["entries"], 2)
+
+    def test_concurrent_misses_are_coalesced(self):
+        cache = search.PrefixCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        owner = threading.Thread(
+            target=lambda: results.append(cache.get_or_compute("jo", compute))
+        )
+        owner.start()
+        started.wait(5)
+        waiters = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_compute("jo", compute))
+            )
+            for _ in range(3)
+        ]
+        for thread in waiters:
+            thread.start()
+        while cache.as_dict()["coalesced"] < 3:
+            pass
+        release.set()
+        for thread in [owner, *waiters]:
+            thread.join(5)
+
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.as_dict()["hit_rate"], 0.75)
+
+    def test_clear_discards_lookups_in_flight(self):
+        cache = search.PrefixCache()
+
+        def compute():
+            cache.clear()
+            return "stale"
+
+        self.assertEqual(cache.get_or_compute("jo", compute), "stale")
+        self.assertIsNone(cache.get("jo"))
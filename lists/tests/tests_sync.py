@@ -0,0 +1,174 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from lists import services
+from lists.models import ClientMutation, Item, ListInvite
+
+
+class ApplyClientMutationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.stranger = User.objects.create_user(username="mallory")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.milk = services.add_item(self.shopping_list, self.owner, "Milk")
+        self.eggs = services.add_item(self.shopping_list, self.owner, "Eggs")
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        self.shopping_list.refresh_from_db()
+        self.base = self.shopping_list.version
+
+    def sync(self, mutations, actor=None):
+        for mutation in mutations:
+            mutation.setdefault("base_version", self.base)
+        return services.apply_client_mutations(
+            self.shopping_list, actor or self.owner, mutations
+        )
+
+    def test_offline_log_is_applied_in_order(self):
+        results = self.sync(
+            [
+                {"client_id": "c1", "op": "create", "name": "Bread"},
+                {"client_id": "c2", "op": "update", "ref": "c1", "status": "bought"},
+                {"client_id": "c3", "op": "move", "ref": "c1", "after": None},
+                {"client_id": "c4", "op": "update", "id": self.milk.id, "name": "Oat"},
+                {"client_id": "c5", "op": "delete", "id": self.eggs.id},
+                {"client_id": "c6", "op": "invite", "invitee": self.stranger.id},
+            ]
+        )
+
+        self.assertEqual([r["ok"] for r in results], [True] * 6)
+        bread = results[0]["item"]
+        self.assertEqual(bread.status, "bought")
+        self.assertIsNone(results[4]["item"])
+        self.assertEqual(results[5]["invite"].invitee, self.stranger)
+        self.assertEqual(
+            list(
+                self.shopping_list.items.order_by("rank").values_list("name", flat=True)
+            ),
+            ["Bread", "Oat"],
+        )
+        self.assertEqual(self.shopping_list.item_count, 2)
+        self.assertEqual(ClientMutation.objects.count(), 6)
+
+    def test_retried_upload_is_replayed_not_reapplied(self):
+        log = [
+            {"client_id": "c1", "op": "create", "name": "Bread"},
+            {"client_id": "c2", "op": "update", "id": self.milk.id, "status": "bought"},
+        ]
+        self.sync(log)
+        self.shopping_list.refresh_from_db()
+        version = self.shopping_list.version
+
+        results = self.sync(
+            [dict(m) for m in log] + [{"client_id": "c3", "op": "delete", "ref": "c1"}]
+        )
+
+        self.assertEqual([r.get("replayed") for r in results], [True, True, None])
+        self.assertIsNone(results[0]["item"])  # deleted by c3
+        self.assertEqual(results[1]["item"].status, "bought")
+        self.assertEqual(self.shopping_list.version, version + 1)
+        self.assertFalse(Item.objects.filter(name="Bread").exists())
+
+    def test_client_ids_are_scoped_to_the_list(self):
+        self.sync([{"client_id": "c1", "op": "create", "name": "Bread"}])
+        other = services.create_list(self.owner, "Party")
+
+        results = services.apply_client_mutations(
+            other,
+            self.owner,
+            [{"client_id": "c1", "base_version": 0, "op": "create", "name": "Chips"}],
+        )
+
+        self.assertTrue(results[0]["ok"])
+        self.assertIsNone(results[0].get("replayed"))
+        self.assertEqual(results[0]["item"].shopping_list, other)
+        self.assertEqual(ClientMutation.objects.filter(client_id="c1").count(), 2)
+
+    def test_old_mutations_are_pruned(self):
+        self.sync(
+            [
+                {"client_id": "c1", "op": "create", "name": "Bread"},
+                {"client_id": "c2", "op": "create", "name": "Jam"},
+            ]
+        )
+        ClientMutation.objects.filter(client_id="c1").update(
+            created_at=timezone.now() - timedelta(days=31)
+        )
+
+        out = StringIO()
+        call_command("prune_client_mutations", days=30, stdout=out)
+
+        self.assertIn("Deleted 1 mutations", out.getvalue())
+        self.assertEqual(
+            list(ClientMutation.objects.values_list("client_id", flat=True)), ["c2"]
+        )
+
+    def test_changes_made_meanwhile_are_conflicts(self):
+        services.update_item(self.milk, self.friend, status="bought")
+        services.delete_item(self.owner, self.eggs)
+        services.add_item(self.shopping_list, self.friend, "Bread")
+
+        results = self.sync(
+            [
+                {
+                    "client_id": "c1",
+                    "op": "update",
+                    "id": self.milk.id,
+                    "status": "need",
+                },
+                {"client_id": "c2", "op": "move", "id": self.eggs.id, "after": None},
+                {"client_id": "c3", "op": "delete", "id": self.eggs.id},
+                {"client_id": "c4", "op": "create", "name": "bread "},
+            ]
+        )
+
+        self.assertEqual([r["ok"] for r in results], [False, False, True, False])
+        self.assertEqual([r.get("conflict") for r in results], [True, True, None, True])
+        self.assertEqual(results[0]["item"].status, "bought")
+        self.assertIsNone(results[1]["item"])
+        self.assertEqual(results[3]["item"].added_by, self.friend)
+        self.milk.refresh_from_db()
+        self.assertEqual(self.milk.status, "bought")
+
+    def test_failed_mutations_do_not_stop_the_log(self):
+        bread = services.add_item(self.shopping_list, self.friend, "Bread")
+        self.shopping_list.refresh_from_db()
+        self.base = self.shopping_list.version
+
+        results = self.sync(
+            [
+                # only the author can rename, only the owner can invite
+                {"client_id": "c1", "op": "update", "id": bread.id, "name": "Rye"},
+                {"client_id": "c2", "op": "invite", "invitee": self.stranger.id},
+                {"client_id": "c3", "op": "update", "id": bread.id, "status": "bought"},
+            ],
+            actor=self.owner,
+        )
+        self.assertEqual([r["ok"] for r in results], [False, True, True])
+        self.assertIn("author", results[0]["error"])
+        self.assertEqual(results[2]["item"].name, "Bread")
+
+        results = self.sync(
+            [{"client_id": "c4", "op": "invite", "invitee": self.stranger.id}],
+            actor=self.friend,
+        )
+        self.assertFalse(results[0]["ok"])
+        self.assertEqual(ListInvite.objects.filter(invitee=self.stranger).count(), 1)
+        self.assertEqual(self.shopping_list.bought_count, 1)
+
+    def test_strangers_cannot_sync(self):
+        with self.assertRaises(PermissionDenied):
+            self.sync(
+                [{"client_id": "c1", "op": "create", "name": "Bread"}],
+                actor=self.stranger,
+            )
+        self.assertFalse(ClientMutation.objects.exists())
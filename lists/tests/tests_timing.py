@@ -0,0 +1,88 @@
+import asyncio
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from lists import services
+from lists.models import Item
+from shoppinglist.middleware import request_timing_middleware
+from shoppinglist.timing import current_timings
+
+
+def timing_fields(logs):
+    [record] = logs.records
+    return record.request_timing
+
+
+def n_plus_one_view(request):
+    items = Item.objects.order_by("id")
+    return HttpResponse(",".join(Item.objects.get(pk=item.pk).name for item in items))
+
+
+async def async_view(request):
+    return HttpResponse("ok")
+
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.user, "Groceries")
+        for name in ("Milk", "Eggs", "Bread", "Jam", "Tea"):
+            services.add_item(self.shopping_list, self.user, name)
+        self.client.force_login(self.user)
+
+    def test_page_reports_queries_and_template_time(self):
+        url = reverse("lists:shoppinglist-detail", args=[self.shopping_list.id])
+        with self.assertLogs("shoppinglist.requests", "INFO") as logs:
+            response = self.client.get(url)
+
+        fields = timing_fields(logs)
+        self.assertEqual(fields["view"], "lists:shoppinglist-detail")
+        self.assertEqual(fields["status"], 200)
+        self.assertGreater(fields["queries"], 0)
+        self.assertGreater(fields["template_ms"], 0)
+        self.assertNotIn("repeated", fields)
+        metrics = [m.split(";")[0] for m in response["Server-Timing"].split(", ")]
+        self.assertEqual(metrics, ["db", "tpl", "view", "total"])
+        self.assertIn(f'desc="{fields["queries"]} queries"', response["Server-Timing"])
+
+    def test_api_requests_are_tagged_with_the_action(self):
+        url = reverse("shoppinglist-detail", args=[self.shopping_list.id])
+        with self.assertLogs("shoppinglist.requests", "INFO") as logs:
+            self.client.get(url)
+
+        fields = timing_fields(logs)
+        self.assertEqual(fields["view"], "shoppinglist-detail")
+        self.assertEqual(fields["action"], "retrieve")
+        self.assertEqual(fields["template_ms"], 0)
+
+    @override_settings(QUERY_REPEAT_THRESHOLD=5)
+    def test_repeated_statements_are_logged_as_warnings(self):
+        middleware = request_timing_middleware(n_plus_one_view)
+        with self.assertLogs("shoppinglist.requests", "INFO") as logs:
+            middleware(RequestFactory().get("/n-plus-one/"))
+
+        [record] = logs.records
+        self.assertEqual(record.levelname, "WARNING")
+        fields = record.request_timing
+        self.assertEqual(fields["queries"], 6)
+        self.assertEqual(fields["repeated"], 5)
+        self.assertIn('"lists_item"."name"', fields["repeated_sql"])
+        # same statement, different parameters: repeated but not duplicated
+        self.assertEqual(fields["duplicates"], 0)
+
+    def test_nothing_is_recorded_outside_requests(self):
+        Item.objects.count()
+        self.assertIsNone(current_timings())
+
+    def test_async_requests_are_timed(self):
+        middleware = request_timing_middleware(async_view)
+        with self.assertLogs("shoppinglist.requests", "INFO") as logs:
+            response = asyncio.run(middleware(RequestFactory().get("/async/")))
+
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertEqual(timing_fields(logs)["queries"], 0)
@@ -0,0 +1,118 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from lists import services
+
+
+class ListDetailCachingTests(TestCase):
+    def setUp(self):
+        # list ids and versions repeat between tests
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.friend = User.objects.create_user(username="bob")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        invite = services.send_invite(self.shopping_list, self.owner, self.friend)
+        services.accept_invite(invite, self.friend)
+        services.add_item(self.shopping_list, self.owner, "Milk")
+        self.url = reverse("lists:shoppinglist-detail", args=[self.shopping_list.id])
+
+    def _get(self, user, **headers):
+        if int(self.client.session.get("_auth_user_id", 0)) != user.id:
+            self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, headers=headers)
+        item_queries = [q for q in ctx if 'FROM "lists_item"' in q["sql"]]
+        return response, item_queries
+
+    def test_item_fragment_is_cached_until_the_list_changes(self):
+        response, item_queries = self._get(self.owner)
+        self.assertContains(response, "Milk")
+        self.assertEqual(len(item_queries), 1)
+
+        response, item_queries = self._get(self.owner)
+        self.assertContains(response, "Milk")
+        self.assertEqual(item_queries, [])
+
+        services.add_item(self.shopping_list, self.friend, "Eggs")
+        response, item_queries = self._get(self.owner)
+        self.assertContains(response, "Eggs")
+        self.assertEqual(len(item_queries), 1)
+
+    def test_owner_controls_are_cached_per_role(self):
+        owner_page, _ = self._get(self.owner)
+        friend_page, item_queries = self._get(self.friend)
+
+        self.assertContains(owner_page, "Delete ❌")
+        self.assertNotContains(friend_page, "Delete ❌")
+        self.assertEqual(len(item_queries), 1)
+
+    def test_unchanged_page_revalidates_with_etag(self):
+        response, _ = self._get(self.owner)
+        etag = response.headers["ETag"]
+        self.assertIn("private", response.headers["Cache-Control"])
+
+        response, _ = self._get(self.owner, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # other users and later versions get their own etag
+        response, _ = self._get(self.friend, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        services.add_item(self.shopping_list, self.owner, "Eggs")
+        response, _ = self._get(self.owner, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_rename_through_the_api_changes_the_etag(self):
+        response, _ = self._get(self.owner)
+        etag = response.headers["ETag"]
+
+        response = self.client.patch(
+            f"/api/shoppinglists/{self.shopping_list.id}/",
+            {"name": "Weekly shop"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response, _ = self._get(self.owner, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Weekly shop")
+        self.shopping_list.refresh_from_db()
+        response = self.client.get(
+            f"/api/shoppinglists/{self.shopping_list.id}/changes/",
+            {"since": self.shopping_list.version - 1},
+        )
+        self.assertEqual(response.data["name"], "Weekly shop")
+
+    def test_delete_button_posts_through_shared_form(self):
+        item = self.shopping_list.items.get()
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse("lists:delete-item", args=[item.id]))
+
+        self.assertRedirects(response, self.url)
+        self.assertFalse(self.shopping_list.items.exists())
+
+
+class EditItemViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="alice")
+        self.shopping_list = services.create_list(self.owner, "Groceries")
+        self.item = services.add_item(self.shopping_list, self.owner, "Milk")
+        self.client.force_login(self.owner)
+
+    def test_status_change_moves_the_counters(self):
+        response = self.client.post(
+            reverse("lists:edit-item", args=[self.item.id]),
+            {"name": "Oat milk", "status": "bought"},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.status), ("Oat milk", "bought"))
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(
+            (self.shopping_list.need_count, self.shopping_list.bought_count), (0, 1)
+        )
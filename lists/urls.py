@@ -9,6 +9,9 @@ urlpatterns = [
     path("new/", views.create_list, name="create-list"),  # /lists/new/
     path("<int:list_id>/", views.list_detail, name="shoppinglist-detail"),  # /lists/42/
     path("<int:list_id>/add/", views.add_item, name="add-item"),  # /lists/42/add/
+    path(
+        "<int:list_id>/events/", views.list_events, name="list-events"
+    ),  # /lists/42/events/ (SSE)
     path(
         "items/<int:item_id>/edit/", views.edit_item, name="edit-item"
     ),  # /lists/items/123/edit/
@@ -17,6 +20,7 @@ urlpatterns = [
         "invites/", views.invites_dashboard, name="invites-dashboard"
     ),  # /lists/invites/
     path("search_users/", views.search_users, name="search-users"),
+    path("cache-stats/", views.cache_stats, name="cache-stats"),
     path("<int:list_id>/delete/", views.delete_list, name="delete-list"),
     path("items/<int:item_id>/delete/", views.delete_item, name="delete-item"),
     path("<int:list_id>/invite/", views.send_invite, name="send-invite"),
@@ -1,14 +1,28 @@
+import asyncio
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db.models import Q
-from django.shortcuts import render, get_object_or_404, redirect
+from django.core.handlers.asgi import ASGIRequest
+from django.middleware.csrf import get_token
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.urls import reverse
-from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag, url_has_allowed_host_and_scheme
 from .models import ShoppingList, Item, ListInvite
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.decorators import login_required
-from .permissions import get_lists_user_can_view, get_invites_user_can_view
+from django.contrib.admin.views.decorators import staff_member_required
+from .permissions import (
+    get_list_summaries_user_can_view,
+    get_lists_user_can_view,
+    get_invites_user_can_view,
+    user_can_access_list,
+)
 from .forms import (
     CreateListForm,
     AddItemForm,
@@ -17,12 +31,12 @@ from .forms import (
     InviteForm,
 )
 from .serializers import ShoppingListSerializer, ItemSerializer, InviteSerializer
-from . import services
+from . import services, events, search
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,8 +81,7 @@ def signup_view(request):
 
 @login_required
 def index(request):
-    lists = get_lists_user_can_view(request.user)
-    print("DEBUG lists:", lists)
+    lists = get_list_summaries_user_can_view(request.user)
     return render(request, "lists/index.html", {"lists": lists})
 
 
@@ -78,7 +91,7 @@ def delete_list(request, list_id):
     if sl.author != request.user:
         raise PermissionDenied("You do not have permission to delete this list.")
     if request.method == "POST":
-        sl.delete()
+        services.delete_list(sl, request.user)
         return redirect("lists:shoppinglist-index")
     else:
         return render(request, "lists/confirm_delete.html", {"shoppinglist": sl})
@@ -180,12 +193,21 @@ def invite_detail(request, invite_id):
 @login_required
 def search_users(request):
     q = request.GET.get("q", "").strip()
-    results = []
-    if len(q) >= 2:
-        results = User.objects.filter(first_name__icontains=q)[:10]
+    # the invite form sends its list so current collaborators are left out
+    shopping_list = None
+    list_id = request.GET.get("list")
+    if list_id and list_id.isdigit():
+        shopping_list = get_lists_user_can_view(request.user).filter(id=list_id).first()
+    results = search.search_users(q, request.user, shopping_list)
     return render(request, "invites/_user_results.html", {"results": results})
 
 
+@staff_member_required
+def cache_stats(request):
+    """Hit rates of this worker's in-process caches, for staff."""
+    return JsonResponse({"user_search": search.search_cache.as_dict()})
+
+
 @login_required
 def select_invitee(request):
     if request.method != "POST":
@@ -200,8 +222,8 @@ def select_invitee(request):
 @login_required
 def shoppinglist_modern(request):
     """Return a modernized version of the list (HTMX partial)."""
-    lists = get_lists_user_can_view(request.user)
-    return render(request, "lists/modern_list.html", {"lists": lists})
+    lists = get_list_summaries_user_can_view(request.user)
+    return render(request, "lists/modern_index.html", {"lists": lists})
 
 
 @login_required
@@ -211,9 +233,7 @@ def create_list(request):
         # create form instance and populate with data from the request
         form = CreateListForm(request.POST)
         if form.is_valid():
-            shoppinglist = form.save(commit=False)
-            shoppinglist.author = request.user
-            shoppinglist.save()
+            services.create_list(request.user, form.cleaned_data["name"])
             return redirect("lists:shoppinglist-index")
 
     else:
@@ -222,25 +242,53 @@ def create_list(request):
     return render(request, "lists/create_shoppinglist.html", {"form": form})
 
 
+def _list_page_etag(request, shoppinglist):
+    """
+    The page only changes with the list's version and who is looking at it;
+    the CSRF secret is included so a page holding an old token is never
+    revalidated after the user logs in again.
+    """
+    get_token(request)  # make sure the secret exists before hashing it
+    key = (
+        f"{shoppinglist.id}:{shoppinglist.version}:{request.user.id}:"
+        f"{request.META['CSRF_COOKIE']}"
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
 @login_required
 def list_detail(request, list_id):
     shoppinglist = get_object_or_404(get_lists_user_can_view(request.user), id=list_id)
-    items = shoppinglist.items.all()
-    return render(
-        request,
-        "lists/list_detail.html",
-        {"shoppinglist": shoppinglist, "items": items},
-    )
+    etag = quote_etag(_list_page_etag(request, shoppinglist))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        # lazy: only runs when the cached item fragment is missing; read in
+        # display order straight off the (shopping_list, rank, id) index
+        items = shoppinglist.items.order_by("rank", "id")
+        response = render(
+            request,
+            "lists/list_detail.html",
+            {
+                "shoppinglist": shoppinglist,
+                "items": items,
+                "is_owner": shoppinglist.author_id == request.user.id,
+            },
+        )
+    response.headers["ETag"] = etag
+    # per user, and always revalidated
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
 def add_item(request, list_id):
     shoppinglist = get_object_or_404(get_lists_user_can_view(request.user), id=list_id)
 
-    items = shoppinglist.items.all()
+    items = shoppinglist.items.order_by("rank", "id")
 
     if request.method == "POST":
-        form = AddItemForm(request.POST)
+        # clean_name checks for duplicates on the instance's list
+        form = AddItemForm(request.POST, instance=Item(shopping_list=shoppinglist))
 
         if form.is_valid():
             name = form.cleaned_data["name"]
@@ -265,20 +313,22 @@ def add_item(request, list_id):
 
 @login_required
 def edit_item(request, item_id):
-    item = get_object_or_404(
-        Item.objects.select_related("shopping_list").filter(
-            Q(shopping_list__author=request.user)
-            | Q(shopping_list__shared_with=request.user)
-        ),
-        id=item_id,
-    )
+    item = services.get_item_user_can_edit(request.user, item_id)
 
     if request.method == "POST":
         form = EditItemForm(request.POST, instance=item)
 
         if form.is_valid():
-            form.save()
-            return redirect(item.shopping_list)
+            changes = {field: form.cleaned_data[field] for field in form.changed_data}
+            # is_valid() copied the new values onto item; put the stored ones
+            # back so update_item sees the change and moves the counters
+            for field in form.changed_data:
+                setattr(item, field, form.initial[field])
+            try:
+                services.update_item(item, request.user, **changes)
+                return redirect(item.shopping_list)
+            except (PermissionDenied, ValidationError) as e:
+                messages.error(request, str(e))
     else:
         form = EditItemForm(instance=item)
 
@@ -303,3 +353,64 @@ def delete_item(request, item_id):
 
         return redirect("lists:shoppinglist-detail", list_id=shoppinglist.id)
     return redirect(shoppinglist)
+
+
+# --------------- LIVE UPDATES ----------------
+
+
+async def _event_stream(shoppinglist, user):
+    heartbeat = getattr(settings, "LIST_EVENTS_HEARTBEAT", 15)
+    recheck = getattr(settings, "LIST_EVENTS_ACCESS_RECHECK", 30)
+    loop = asyncio.get_running_loop()
+    checked_at = loop.time()
+    subscription = events.get_broker().subscribe(shoppinglist.id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            if loop.time() - checked_at >= recheck:
+                # removed from the list (or the list deleted): end the stream;
+                # the browser's reconnect then gets a 403
+                if not await sync_to_async(user_can_access_list)(user, shoppinglist):
+                    return
+                checked_at = loop.time()
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield (
+                f"id: {event['version']}\n"
+                f"event: {event['type']}\n"
+                f"data: {json.dumps(event)}\n\n"
+            )
+    finally:
+        subscription.close()
+
+
+@login_required
+async def list_events(request, list_id):
+    """
+    Server-Sent Events stream of item and membership changes on one list.
+
+    Only served through the ASGI entry point (shoppinglist/asgi.py): under
+    WSGI Django drains the whole stream before sending anything, holding a
+    worker forever, so it answers 501 there. Access is checked again every
+    LIST_EVENTS_ACCESS_RECHECK seconds. Each event id is the list version,
+    so a reconnecting client can fetch anything it missed from
+    /api/shoppinglists/{id}/changes/?since=<last id>.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "Live updates need the ASGI server.", status=501, content_type="text/plain"
+        )
+    user = await request.auser()
+    shoppinglist = await aget_object_or_404(ShoppingList, id=list_id)
+    if not await sync_to_async(user_can_access_list)(user, shoppinglist):
+        raise PermissionDenied("You do not have access to this list.")
+
+    response = StreamingHttpResponse(
+        _event_stream(shoppinglist, user), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -2,6 +2,8 @@
 ASGI config for shoppinglists project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through this entry point (e.g. ``uvicorn shoppinglist.asgi:application``)
+to hold the long-lived list event streams at /lists/<id>/events/.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
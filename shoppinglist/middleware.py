@@ -0,0 +1,153 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .routers import read_from_replicas
+from .timing import (
+    RequestTimings,
+    current_timings,
+    instrument_connections,
+    record_timings,
+)
+
+logger = logging.getLogger("shoppinglist.requests")
+
+PIN_COOKIE = "pin_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """
+    Let safe-method requests read from replicas, except for a user's own
+    reads right after they wrote: any unsafe request sets a short-lived
+    cookie that pins their reads to the primary for
+    REPLICA_STICKY_SECONDS, so a freshly added item never disappears
+    behind replication lag.
+    """
+
+    def use_replicas(request):
+        return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+    def pin(request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            with read_from_replicas(use_replicas(request)):
+                response = await get_response(request)
+            return pin(request, response)
+
+    else:
+
+        def middleware(request):
+            with read_from_replicas(use_replicas(request)):
+                response = get_response(request)
+            return pin(request, response)
+
+    return middleware
+
+
+def _view_label(request):
+    """URL name of the matched route, plus the DRF action for viewsets."""
+    match = request.resolver_match
+    if match is None:
+        return None, None
+    actions = getattr(match.func, "actions", None) or {}
+    return match.view_name, actions.get(request.method.lower())
+
+
+def _report(request, response, timings):
+    finished = time.perf_counter()
+    total = finished - timings.started
+    view = finished - timings.view_started if timings.view_started else 0.0
+    metrics = [
+        f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries"',
+        f"tpl;dur={timings.template_time * 1000:.2f}",
+        f"view;dur={view * 1000:.2f}",
+        f"total;dur={total * 1000:.2f}",
+    ]
+    response["Server-Timing"] = ", ".join(metrics)
+
+    view_name, action = _view_label(request)
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "view": view_name,
+        "action": action,
+        "status": response.status_code,
+        "queries": timings.queries,
+        "duplicates": timings.duplicates,
+        "db_ms": round(timings.db_time * 1000, 2),
+        "template_ms": round(timings.template_time * 1000, 2),
+        "view_ms": round(view * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+    }
+    level = logging.INFO
+    repeated = timings.repeated(settings.QUERY_REPEAT_THRESHOLD)
+    if repeated:
+        # the same statement in a loop is almost always an N+1
+        level = logging.WARNING
+        sql, count = repeated[0]
+        fields["repeated"] = count
+        fields["repeated_sql"] = sql[:200]
+    logger.log(
+        level,
+        "request %s",
+        " ".join(
+            f"{key}={value}" for key, value in fields.items() if value is not None
+        ),
+        extra={"request_timing": fields},
+    )
+    return response
+
+
+@sync_and_async_middleware
+def request_timing_middleware(get_response):
+    """
+    Time every request and report it twice: as a Server-Timing header
+    (db, tpl, view and total, in milliseconds, readable in the browser's
+    network panel) and as one log line on the "shoppinglist.requests"
+    logger. Requests that run a statement QUERY_REPEAT_THRESHOLD times or
+    more are logged as warnings with that statement.
+    """
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            with record_timings(RequestTimings()) as timings:
+                response = await get_response(request)
+            return _report(request, response, timings)
+
+        async def process_view(request, view_func, view_args, view_kwargs):
+            timings = current_timings()
+            if timings is not None:
+                timings.view_started = time.perf_counter()
+
+    else:
+
+        def middleware(request):
+            instrument_connections()
+            with record_timings(RequestTimings()) as timings:
+                response = get_response(request)
+            return _report(request, response, timings)
+
+        def process_view(request, view_func, view_args, view_kwargs):
+            timings = current_timings()
+            if timings is not None:
+                timings.view_started = time.perf_counter()
+
+    middleware.process_view = process_view
+    return middleware
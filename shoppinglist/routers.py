@@ -0,0 +1,47 @@
+"""
+Read-replica routing.
+
+Writes always go to "default". Reads go to a replica only while
+read_from_replicas() is active, which ReplicaRoutingMiddleware does for
+safe-method requests from users who haven't written recently; everything
+else (unsafe requests, management commands, shell, tests) reads from the
+primary. Each block sticks to one replica, so a request never mixes rows
+from replicas that lag by different amounts, and reads inside a
+transaction on the primary stay on the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# the replica alias picked for the current block, or None for the primary
+_replica = ContextVar("replica", default=None)
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    """Route reads made inside the block to one replica, if any are configured."""
+    replicas = settings.DATABASE_REPLICAS
+    token = _replica.set(random.choice(replicas) if enabled and replicas else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
@@ -0,0 +1,116 @@
+"""
+Per-request timing: query count, database time and template render time.
+
+request_timing_middleware starts a RequestTimings for each request and
+makes it current; while it is, every query on every connection and every
+top-level template render is added to it. Outside requests (management
+commands, shell) nothing is recorded.
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        # statements by SQL text, and by SQL text plus parameters
+        self._statements = Counter()
+        self._executions = Counter()
+
+    def add_query(self, sql, params, duration):
+        self.queries += 1
+        self.db_time += duration
+        self._statements[sql] += 1
+        self._executions[sql, repr(params)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries that repeated an earlier one exactly, parameters included."""
+        return sum(count - 1 for count in self._executions.values())
+
+    def repeated(self, threshold):
+        """[(sql, count)] for statements run at least threshold times, e.g. N+1 loops."""
+        return [
+            (sql, count)
+            for sql, count in self._statements.most_common()
+            if count >= threshold
+        ]
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def record_timings(timings):
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, params, time.perf_counter() - started)
+
+
+def instrument(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def instrument_connections():
+    """Instrument this thread's connections that already exist."""
+    for connection in connections.all(initialized_only=True):
+        instrument(connection)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    DjangoTemplates that times every render of a top-level template;
+    {% include %} and {% extends %} are part of their parent's time.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)